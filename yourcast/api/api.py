@@ -1,22 +1,60 @@
+import asyncio
+import hashlib
+import importlib
+import json
+import logging
 import os
 import tempfile
-import uuid
-from typing import List, Optional
-
-import openai
-from fastapi import FastAPI, HTTPException, Query
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from io import BytesIO
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from gtts import gTTS
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
-from yourcast.parser.episode_parser import BulletPoint, BulletPointMetadata, initialise_pinecone_index
-from yourcast.tools.helpers import load_json, make_id
-from yourcast.tools.llm_helpers import OpenaiModelNames, get_llm_completion
+from yourcast.api.audio_jobs import AUDIO_JOBS_PATH, AudioJob, AudioJobQueue
+from yourcast.api.audio_store import AudioStore
+from yourcast.api.audio_stream import split_sentences, stream_speech
+from yourcast.api.search_cache import SearchCache
+from yourcast.parser.models import BulletPoint, BulletPointMetadata
+from yourcast.tools.embeddings import get_embedding_provider
+from yourcast.tools.helpers import make_id
+from yourcast.tools.llm_helpers import OpenaiModelNames, get_llm_completion_async, stream_llm_completion_async
+from yourcast.tools.metadata_store import get_metadata_store
+from yourcast.tools.metrics import metrics
+from yourcast.tools.vector_store import IndexVersion, VectorStore, get_vector_store
+
+logger = logging.getLogger(__name__)
 
 MODEL = OpenaiModelNames.gpt4o_mini
 
-app = FastAPI(title="YourCast API", description="API for querying podcast bulletpoints")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Only the small audio job database is opened before the server accepts requests, in a thread. Nothing else waits
+    # for the network or the disk, /readyz tells when the resources are warm
+    global audio_jobs
+    audio_jobs = await asyncio.to_thread(
+        AudioJobQueue,
+        _run_audio_job,
+        path=os.getenv("YOURCAST_AUDIO_JOBS_PATH", AUDIO_JOBS_PATH),
+        workers=int(os.getenv("YOURCAST_AUDIO_JOB_WORKERS", "4")),
+    )
+    await audio_jobs.start()
+    warm_up_task = asyncio.create_task(warm_up())
+    metadata_version_task = asyncio.create_task(refresh_metadata_version())
+    yield
+    warm_up_task.cancel()
+    metadata_version_task.cancel()
+    await audio_jobs.stop()
+
+
+app = FastAPI(title="YourCast API", description="API for querying podcast bulletpoints", lifespan=lifespan)
 
 # Allow CORS for http://localhost:8080
 app.add_middleware(
@@ -27,10 +65,103 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Pinecone index
-index_name = os.environ.get("PINECONE_INDEX_NAME", "yourpod")
-pinecone_index = initialise_pinecone_index(index_name)
-episode_summaries = load_json("yourcast/assets/episode_summaries")
+# Queries have to be embedded by the same model as the indexed bullet points
+embedding_provider = get_embedding_provider()
+
+index_name = os.environ.get("PINECONE_INDEX_NAME", embedding_provider.default_index_name)
+
+# The vector store and the metadata store are opened on first use or by the warm-up after startup, so importing the
+# API does no I/O and workers boot even when Pinecone is unreachable
+_vector_store: Optional[VectorStore] = None
+_resources_lock = threading.Lock()
+# Warm-up steps that completed, /readyz answers 200 once all of them did
+readiness = {"vector_store": False, "metadata_store": False, "audio_store": False, "openai_client": False}
+
+
+def get_index() -> VectorStore:
+    """Vector store of the index, Pinecone or the local store depending on YOURCAST_VECTOR_STORE."""
+    global _vector_store
+    with _resources_lock:
+        if _vector_store is None:
+            # The API only reads, it never creates a missing index
+            _vector_store = get_vector_store(index_name, embedding_provider.dimension, create=False)
+    _vector_store.connect()
+    return _vector_store
+
+
+# Concurrent calls per upstream service. Requests beyond the limit wait here instead of piling up on one dependency,
+# and a slow upstream only delays the requests that need it
+openai_semaphore = asyncio.Semaphore(int(os.getenv("YOURCAST_OPENAI_CONCURRENCY", "16")))
+embedding_semaphore = asyncio.Semaphore(int(os.getenv("YOURCAST_EMBEDDING_CONCURRENCY", "32")))
+vector_store_semaphore = asyncio.Semaphore(int(os.getenv("YOURCAST_VECTOR_STORE_CONCURRENCY", "32")))
+# gTTS blocks on HTTP requests to Google, it gets its own small pool so it never starves the default executor
+tts_executor = ThreadPoolExecutor(max_workers=int(os.getenv("YOURCAST_TTS_WORKERS", "4")), thread_name_prefix="tts")
+# Sentences of one streamed summary that are synthesized ahead of the one being sent
+tts_lookahead = int(os.getenv("YOURCAST_TTS_LOOKAHEAD", "2"))
+# Generated summaries and synthesized sentences, identical requests are served from disk
+audio_store = AudioStore(
+    os.getenv("YOURCAST_AUDIO_STORE_DIR", "yourcast/assets/cache/audio"),
+    max_bytes=int(os.getenv("YOURCAST_AUDIO_STORE_MAX_MB", "1024")) * 1024 * 1024,
+)
+# Summaries being generated by key, concurrent identical requests wait for the same generation
+summary_tasks: dict[str, asyncio.Task] = {}
+
+
+def remove_legacy_summary_files():
+    # Summaries used to be written to temporary files that were never deleted
+    tmp_dir = tempfile.gettempdir()
+    for name in os.listdir(tmp_dir):
+        if name.startswith("yourcast_summary_") and name.endswith(".mp3"):
+            try:
+                os.remove(os.path.join(tmp_dir, name))
+            except FileNotFoundError:
+                # Removed by another worker starting at the same time
+                pass
+
+
+async def warm_up():
+    """Opens the resources the first requests would otherwise wait for, every step on its own so one failing doesn't
+    block the others. The vector store is retried by /readyz."""
+    steps = {
+        "vector_store": get_index,
+        "metadata_store": get_metadata_store,
+        "audio_store": lambda: (remove_legacy_summary_files(), audio_store.cleanup()),
+        # Importing openai takes most of a second, done in a thread the event loop keeps serving meanwhile
+        "openai_client": lambda: importlib.import_module("openai"),
+    }
+    for name, step in steps.items():
+        try:
+            await asyncio.to_thread(step)
+            readiness[name] = True
+        except Exception as e:
+            logger.error(f"Warming up {name} failed: {e}")
+
+
+# Version of the metadata store as of the last refresh, /search compares it without a query on the event loop
+metadata_version = 0
+METADATA_VERSION_REFRESH_SECONDS = 1.0
+
+
+async def refresh_metadata_version():
+    """Reads the version of the metadata store in a thread every second, the first read opens and migrates the store."""
+    global metadata_version
+    while True:
+        try:
+            metadata_version = await asyncio.to_thread(lambda: get_metadata_store().version())
+        except Exception as e:
+            logger.warning(f"Reading the metadata store version failed: {e}")
+        await asyncio.sleep(METADATA_VERSION_REFRESH_SECONDS)
+
+
+# Serialized /search responses, dropped whenever the ingestion or a reindex bumps the version of the index, or a new
+# episode summary is stored. YOURCAST_SEARCH_CACHE_SIZE=0 disables the cache
+search_cache = SearchCache(
+    IndexVersion(index_name),
+    metadata_version=lambda: metadata_version,
+    max_size=int(os.getenv("YOURCAST_SEARCH_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("YOURCAST_SEARCH_CACHE_TTL", "600")),
+    similarity_threshold=float(os.getenv("YOURCAST_SEARCH_CACHE_SIMILARITY", "0.95")),
+)
 
 
 class PodcastData(BaseModel):
@@ -66,23 +197,121 @@ class SearchResponse(BaseModel):
     results: List[Episode]
 
 
+@app.get("/healthz", response_model=dict)
+async def healthz():
+    """Liveness, the process serves requests. Doesn't depend on any upstream service."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", response_model=dict)
+async def readyz():
+    """Readiness, the resources are warm and the vector store is reachable. 503 until then."""
+    if not readiness["vector_store"]:
+        try:
+            await asyncio.wait_for(asyncio.to_thread(get_index), timeout=5)
+            readiness["vector_store"] = True
+        except Exception as e:
+            logger.warning(f"Vector store not reachable: {e}")
+    ready = all(readiness.values())
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, **readiness})
+
+
 @app.get("/", response_model=dict)
 async def root():
     return {"message": "Welcome to YourCast API. Use /search endpoint to query bulletpoints."}
 
 
+def synthesize_speech_bytes(text: str) -> bytes:
+    # Imported on first use, gTTS pulls in requests which is slow to import
+    from gtts import gTTS
+
+    # MP3 frames are self-contained, the chunks of consecutive sentences can be sent one after the other
+    fp = BytesIO()
+    gTTS(text=text, lang="en").write_to_fp(fp)
+    return fp.getvalue()
+
+
+def synthesize_segment(text: str) -> bytes:
+    # Overlapping summaries share sentences, each sentence is only synthesized once
+    key = hashlib.sha256(json.dumps(["en", text]).encode()).hexdigest()
+    audio = audio_store.read("segments", key)
+    if audio is None:
+        with metrics.span("tts"):
+            audio = synthesize_speech_bytes(text)
+        audio_store.put("segments", key, audio)
+    return audio
+
+
+def summary_key(system_prompt: str, user_prompt: str) -> str:
+    # The prompts contain the takeaways, length, tone and style, everything else in the request doesn't change the audio
+    return hashlib.sha256(json.dumps([MODEL.value, "en", system_prompt, user_prompt]).encode()).hexdigest()
+
+
+def audio_file_response(path: str, key: str, http_request: Request) -> Optional[Response]:
+    """None if the file was evicted since it was looked up, callers generate it again or answer 404."""
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    # FileResponse answers Range requests and sets an ETag from the mtime and size, revalidations are answered here
+    response = FileResponse(path=path, media_type="audio/mpeg", filename=f"podcast_summary_{key[:16]}.mp3", stat_result=stat_result)
+    if http_request.headers.get("if-none-match") == response.headers["etag"]:
+        return Response(status_code=304, headers={"etag": response.headers["etag"]})
+    return response
+
+
+def summary_prompts(request: PodcastRequest) -> tuple[str, str]:
+    # Flatten the bullet-points, pd.keyTakeaways is List[str]
+    all_bullets = []
+    for pd in request.data_sample:
+        all_bullets.extend(pd.keyTakeaways)
+
+    bullet_list = "\n".join(f"- {b}" for b in all_bullets)
+    system_prompt = (
+        f"You are a creative podcast scriptwriter. "
+        f"Given a list of key takeaways from a podcast episode, your task is to write a natural, engaging dialogue between two hosts. "
+        f"The conversation should cover all the key points, flow smoothly, and sound like a real discussion. "
+        f"Make sure the dialogue is {request.length}, has a {request.tone} tone, and is written in a {request.style} style. "
+        "Feel free to add questions, reactions, and transitions to make the dialogue lively and authentic."
+    )
+
+    user_prompt = (
+        f"Here are the key takeaways from the episode:\n{bullet_list}\n\n"
+        "Please write a dialogue between Host 1 and Host 2 that covers all these points."
+        "Don't add asterisks or host 1 or host 2"
+    )
+    return system_prompt, user_prompt
+
+
 @app.get("/search", response_model=SearchResponse)
 async def search_bulletpoints(
     query: str = Query(..., description="Natural language query to search for relevant bulletpoints"),
     limit: int = Query(10, description="Maximum number of results to return", ge=1, le=100),
 ):
     try:
-        # Generate embedding for the query
-        response = openai.embeddings.create(input=query, model="text-embedding-3-small")
-        query_embedding = response.data[0].embedding
+        use_cache = search_cache.max_size > 0
+        if use_cache and (cached := search_cache.get(query, limit)) is not None:
+            return Response(content=cached, media_type="application/json")
 
-        # Query Pinecone
-        query_results = pinecone_index.query(vector=query_embedding, top_k=limit, include_metadata=True)
+        start = time.perf_counter()
+        # Generate embedding for the query
+        async with embedding_semaphore:
+            with metrics.span("search_embedding"):
+                query_embedding = await embedding_provider.embed_query_async(query)
+
+        # A cached answer to a differently phrased but near identical query saves the vector query
+        if use_cache and (cached := search_cache.get_similar(query_embedding, limit)) is not None:
+            return Response(content=cached, media_type="application/json")
+
+        # Query the vector store, the clients are synchronous so the query runs in a thread. So does connecting, in
+        # case this is the first request
+        async with vector_store_semaphore:
+            with metrics.span("search_vector_query"):
+                query_results = await asyncio.to_thread(lambda: get_index().query(vector=query_embedding, top_k=limit, include_metadata=True))
+        # Summaries are read per request, so the ones ingestion stores meanwhile show up without a restart
+        episode_names = [match.metadata["episode_name"] for match in query_results.matches]
+        with metrics.span("search_summaries"):
+            episode_summaries = await asyncio.to_thread(get_metadata_store().get_summaries, episode_names)
 
         episodes = {}
         for match in query_results.matches:
@@ -95,7 +324,7 @@ async def search_bulletpoints(
                     title=metadata.episode_name,
                     host=metadata.source_podcast_name,
                     hostId=make_id(metadata.source_podcast_name),
-                    summary=episode_summaries[metadata.episode_name],
+                    summary=episode_summaries.get(metadata.episode_name, ""),
                     date=metadata.published_date,
                     image=metadata.image,
                     keyTakeaways=[bulletpoint],
@@ -103,59 +332,228 @@ async def search_bulletpoints(
             else:
                 episodes[metadata.episode_name].keyTakeaways.append(bulletpoint)
 
-        return SearchResponse(results=episodes.values())
+        content = SearchResponse(results=list(episodes.values())).model_dump_json().encode()
+        metrics.observe("yourcast_stage_duration_seconds", time.perf_counter() - start, stage="search")
+        if use_cache:
+            search_cache.put(query, limit, query_embedding, content, time.perf_counter() - start)
+        return Response(content=content, media_type="application/json")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing search: {str(e)}")
 
 
+@app.get("/search/cache_stats", response_model=dict)
+async def search_cache_stats():
+    return {**search_cache.stats.model_dump(), "hit_rate": search_cache.stats.hit_rate}
+
+
 @app.post(
     "/summary_audio",
     summary="Generate an MP3 audio summary from given podcast keyTakeaways",
     response_class=FileResponse,
     responses={200: {"content": {"audio/mpeg": {}}}},
 )
-async def generate_summary_audio(request: PodcastRequest):
+async def generate_summary_audio(request: PodcastRequest, http_request: Request):
     """
     1. Flattens all keyTakeaways from the payload into one prompt.
-    2. Uses OpenAI ChatCompletion to produce a cohesive summary.
-    3. Converts the summary to speech (MP3) via gTTS.
+    2. Serves the MP3 from the audio store if the same summary was generated before.
+    3. Otherwise uses OpenAI ChatCompletion to produce a cohesive summary and converts it to speech (MP3) via gTTS.
     4. Returns the MP3 as a FileResponse.
     """
-    # 1. Flatten the bullet-points
-    all_bullets = []
-    for pd in request.data_sample:
-        # pd.keyTakeaways is List[str]
-        all_bullets.extend(pd.keyTakeaways)
+    # 1. Flatten the bullet-points into the prompts
+    system_prompt, user_prompt = summary_prompts(request)
+    key = summary_key(system_prompt, user_prompt)
 
-    bullet_list = "\n".join(f"- {b}" for b in all_bullets)
-    system_prompt = (
-        f"You are a creative podcast scriptwriter. "
-        f"Given a list of key takeaways from a podcast episode, your task is to write a natural, engaging dialogue between two hosts. "
-        f"The conversation should cover all the key points, flow smoothly, and sound like a real discussion. "
-        f"Make sure the dialogue is {request.length}, has a {request.tone} tone, and is written in a {request.style} style. "
-        "Feel free to add questions, reactions, and transitions to make the dialogue lively and authentic."
-    )
+    # A file evicted between the lookup and the response is generated once more
+    for _ in range(2):
+        # 2. Look up the store, the file system calls are cheap enough to stay on the event loop
+        path = audio_store.get("summaries", key)
+        if path is None:
+            task = summary_tasks.get(key)
+            if task is None:
+                task = asyncio.create_task(_generate_summary_file(system_prompt, user_prompt, key))
+                summary_tasks[key] = task
+                task.add_done_callback(lambda _: summary_tasks.pop(key, None))
+            # 3. Shielded, a client that gives up doesn't cancel the generation other requests wait for
+            path = await asyncio.shield(task)
 
-    user_prompt = (
-        f"Here are the key takeaways from the episode:\n{bullet_list}\n\n"
-        "Please write a dialogue between Host 1 and Host 2 that covers all these points."
-        "Don't add asterisks or host 1 or host 2"
+        # 4. Return the MP3 file
+        if (response := audio_file_response(path, key, http_request)) is not None:
+            return response
+    raise HTTPException(status_code=404, detail="The summary audio was evicted before it could be sent, request it again")
+
+
+async def _generate_summary_file(system_prompt: str, user_prompt: str, key: str, on_progress: Optional[Callable[[str, float], Awaitable[None]]] = None) -> str:
+    async with openai_semaphore:
+        with metrics.span("summary_llm"):
+            chat_resp = await get_llm_completion_async(system_prompt, user_prompt, MODEL)
+
+    async def text():
+        yield chat_resp.content
+
+    sentences = [sentence async for sentence in split_sentences(text())]
+
+    async def iterate_sentences():
+        for sentence in sentences:
+            yield sentence
+
+    # Synthesized sentence by sentence, reusing the ones stored already and synthesizing the others in parallel
+    chunks = []
+    async for chunk in stream_speech(iterate_sentences(), synthesize_segment, tts_executor, lookahead=tts_lookahead):
+        chunks.append(chunk)
+        if on_progress:
+            await on_progress("speech", len(chunks) / len(sentences))
+    return await asyncio.to_thread(audio_store.put, "summaries", key, b"".join(chunks))
+
+
+async def _run_audio_job(job: AudioJob, on_progress: Callable[[str, float], Awaitable[None]]) -> str:
+    system_prompt, user_prompt = summary_prompts(PodcastRequest.model_validate_json(job.request))
+    key = summary_key(system_prompt, user_prompt)
+    if (path := audio_store.get("summaries", key)) is not None:
+        return path
+    return await _generate_summary_file(system_prompt, user_prompt, key, on_progress)
+
+
+# Audio generated in the background, clients poll or subscribe to the job instead of holding a request open.
+# Created and started by the lifespan of the app, importing the API opens no database
+audio_jobs: Optional[AudioJobQueue] = None
+
+
+def get_audio_jobs() -> AudioJobQueue:
+    if audio_jobs is None:
+        raise HTTPException(status_code=503, detail="The audio job queue is not started")
+    return audio_jobs
+
+
+class AudioJobStatus(BaseModel):
+    id: str
+    status: str
+    stage: str
+    progress: float
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    audio_url: Optional[str] = None
+
+
+def audio_job_status(job: AudioJob) -> AudioJobStatus:
+    return AudioJobStatus(
+        **job.model_dump(exclude={"request", "path"}),
+        audio_url=f"/summary_audio/jobs/{job.id}/audio" if job.status == "done" else None,
     )
 
-    # 2. Call OpenAI to get the text summary
-    chat_resp = get_llm_completion(system_prompt, user_prompt, MODEL)
 
-    # 3. Convert text summary to an MP3 file
-    tts = gTTS(text=chat_resp.content, lang="en")
-    # Use a temp file so we don't collide in concurrent requests
-    tmp = tempfile.NamedTemporaryFile(prefix="yourcast_summary_", suffix=".mp3", delete=False)
-    tmp_path = tmp.name
-    tmp.close()
-    tts.save(tmp_path)
+async def get_audio_job(job_id: str) -> AudioJob:
+    job = await get_audio_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+
+@app.post("/summary_audio/jobs", response_model=AudioJobStatus, status_code=202)
+async def submit_summary_audio_job(request: PodcastRequest):
+    """Queues the generation of the same MP3 as /summary_audio and returns the job right away."""
+    return audio_job_status(await get_audio_jobs().submit(request.model_dump_json()))
+
+
+@app.get("/summary_audio/jobs/stats", response_model=dict)
+async def summary_audio_job_stats():
+    return (await get_audio_jobs().stats_async()).model_dump()
+
+
+@app.get("/summary_audio/jobs/{job_id}", response_model=AudioJobStatus)
+async def summary_audio_job(job_id: str):
+    return audio_job_status(await get_audio_job(job_id))
+
+
+@app.get("/summary_audio/jobs/{job_id}/events", response_class=StreamingResponse, responses={200: {"content": {"text/event-stream": {}}}})
+async def summary_audio_job_events(job_id: str):
+    """Server-sent events with the status of the job after every change, the stream ends once the job is done or failed."""
+    await get_audio_job(job_id)
+
+    async def events():
+        async for job in get_audio_jobs().events(job_id):
+            yield f"event: {job.status}\ndata: {audio_job_status(job).model_dump_json()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/summary_audio/jobs/{job_id}/audio", response_class=FileResponse, responses={200: {"content": {"audio/mpeg": {}}}})
+async def summary_audio_job_audio(job_id: str, http_request: Request):
+    job = await get_audio_job(job_id)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+    response = audio_file_response(job.path, os.path.splitext(os.path.basename(job.path))[0], http_request)
+    if response is None:
+        raise HTTPException(status_code=410, detail=f"The audio of job {job_id} was evicted, submit it again")
+    return response
+
+
+async def _summary_text_stream(system_prompt: str, user_prompt: str):
+    # The semaphore is held while tokens arrive, the connection to OpenAI stays open until the completion is done
+    async with openai_semaphore:
+        async for text in stream_llm_completion_async(system_prompt, user_prompt, MODEL):
+            yield text
+
+
+@app.post(
+    "/summary_audio/stream",
+    summary="Stream an MP3 audio summary while it is being generated",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"audio/mpeg": {}}}},
+)
+async def stream_summary_audio(request: PodcastRequest, http_request: Request):
+    """
+    Same summary as /summary_audio, but every sentence of the generated dialogue is converted to speech as soon as the
+    LLM completed it and sent right away, so playback starts after the first sentence instead of the whole dialogue.
+    A summary that was generated before is served from the audio store.
+    """
+    system_prompt, user_prompt = summary_prompts(request)
+    key = summary_key(system_prompt, user_prompt)
+    if (path := audio_store.get("summaries", key)) is not None and (response := audio_file_response(path, key, http_request)) is not None:
+        return response
+
+    sentences = split_sentences(_summary_text_stream(system_prompt, user_prompt))
+    chunks = stream_speech(sentences, synthesize_segment, tts_executor, lookahead=tts_lookahead)
+
+    # Failures before the first chunk still get a proper error status, later ones can only end the stream early
+    try:
+        first_chunk = await anext(chunks)
+    except StopAsyncIteration:
+        raise HTTPException(status_code=502, detail="The summary came back empty")
+    except Exception as e:
+        await chunks.aclose()
+        raise HTTPException(status_code=502, detail=f"Error generating summary audio: {str(e)}")
+
+    async def body():
+        sent = [first_chunk]
+        yield first_chunk
+        async for chunk in chunks:
+            sent.append(chunk)
+            yield chunk
+        # Only complete summaries are stored, a client that disconnects early stops the generator before this
+        await asyncio.to_thread(audio_store.put, "summaries", key, b"".join(sent))
+
+    return StreamingResponse(body(), media_type="audio/mpeg")
+
+
+@app.get("/audio_store/stats", response_model=dict)
+async def audio_store_stats():
+    return {**audio_store.stats.model_dump(), "hit_rate": audio_store.stats.hit_rate}
+
+
+# The stats the endpoints above serve are exported as gauges next to the stage timings and LLM usage counters
+metrics.register_collector("search_cache", lambda: search_cache.stats.model_dump())
+metrics.register_collector("audio_store", lambda: audio_store.stats.model_dump())
+metrics.register_collector("audio_jobs", lambda: audio_jobs.stats().model_dump() if audio_jobs is not None else {})
+
 
-    # 4. Return the MP3 file
-    return FileResponse(path=tmp_path, media_type="audio/mpeg", filename=f"podcast_summary_{uuid.uuid4().hex}.mp3")
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage timings, LLM tokens and costs and the cache stats in the Prometheus text format."""
+    # In a thread, the audio job collector reads the database, which other processes can hold locked
+    return PlainTextResponse(await asyncio.to_thread(metrics.render_prometheus), media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
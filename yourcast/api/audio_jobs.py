@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+AUDIO_JOBS_PATH = "yourcast/assets/cache/audio_jobs.sqlite"
+TERMINAL_STATUSES = ("done", "failed")
+# Every process refreshes the heartbeat of its running jobs this often, a running job whose heartbeat is older than
+# STALE_SECONDS belongs to a process that died and is queued again
+HEARTBEAT_SECONDS = 10.0
+STALE_SECONDS = 60.0
+# Idle workers and event subscribers look at the database this often, for jobs submitted and changed by other processes
+POLL_SECONDS = 1.0
+
+
+class AudioJob(BaseModel):
+    id: str
+    request: str
+    # queued, running, done or failed
+    status: str
+    # What a running job is doing: script while the LLM writes the dialogue, speech while it is synthesized
+    stage: str
+    progress: float = 0.0
+    path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class AudioJobStats(BaseModel):
+    queued: int = 0
+    running: int = 0
+    done: int = 0
+    failed: int = 0
+    workers: int = 0
+    oldest_queued_seconds: float = 0.0
+    # Over the most recent finished jobs
+    mean_wait_seconds: float = 0.0
+    p95_wait_seconds: float = 0.0
+    mean_run_seconds: float = 0.0
+    p95_run_seconds: float = 0.0
+
+
+def _p95(values: list[float]) -> float:
+    return statistics.quantiles(values, n=20)[-1] if len(values) > 1 else (values[0] if values else 0.0)
+
+
+class AudioJobQueue:
+    """Persistent queue of audio generation jobs, worked off by a fixed number of asyncio workers.
+
+    Jobs live in a SQLite database shared by all API processes, so they survive a restart of the API. A worker claims a
+    queued job with an update that only succeeds if the job is still queued, so every job runs in one process only.
+    Running jobs carry the owner of the process and a heartbeat, jobs of a process that stopped (on `stop`) or died
+    (heartbeat older than STALE_SECONDS) are queued again. Changes of a job in this process wake up its `events`
+    subscribers right away, changes in other processes are seen within POLL_SECONDS.
+
+    :param run: Coroutine function generating the audio of a job, it gets the job and a progress callback
+        `(stage, progress)` and returns the path of the audio file
+    :param workers: Jobs generated at the same time, the others wait in the queue
+    """
+
+    def __init__(self, run: Callable[[AudioJob, Callable[[str, float], Awaitable[None]]], Awaitable[str]], path: str = AUDIO_JOBS_PATH, workers: int = 4):
+        self.run = run
+        self.path = path
+        self.n_workers = workers
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS audio_jobs (
+                    id TEXT PRIMARY KEY,
+                    request TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    progress REAL NOT NULL,
+                    path TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS audio_jobs_status ON audio_jobs (status, created_at)")
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(audio_jobs)")}
+            # Databases written before jobs were claimed across processes
+            for column, definition in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE audio_jobs ADD COLUMN {column} {definition}")
+        # Process and instance, the running jobs of a queue that stopped are told apart from the ones of a new queue
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._submitted = asyncio.Event()
+        # Events of the `events` subscribers by job id
+        self._subscribers: dict[str, set[asyncio.Event]] = {}
+        self._workers: list[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # The database is shared with other API processes and a statement can wait for their write lock, so statements
+        # run in threads and never on the event loop. sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> int:
+        """Run one write statement in its own transaction and return the number of rows it changed."""
+        with self._connection() as connection:
+            return connection.execute(sql, parameters).rowcount
+
+    async def start(self, retention_seconds: float = 24 * 3600):
+        """Requeue the jobs of processes that died and start the workers, must be called from the event loop."""
+        await asyncio.to_thread(self._execute, "DELETE FROM audio_jobs WHERE finished_at < ?", (time.time() - retention_seconds,))
+        n_resumed = await asyncio.to_thread(self._requeue_stale)
+        if n_resumed:
+            logger.info(f"Resumed {n_resumed} audio jobs that were interrupted while running")
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.n_workers)]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        tasks = self._workers + ([self._heartbeat_task] if self._heartbeat_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat_task = None
+        # Interrupted jobs are queued again right away for the other processes, or the next start of this one
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE audio_jobs SET status = 'queued', stage = 'queued', progress = 0, owner = NULL WHERE status = 'running' AND owner = ?",
+            (self.owner,),
+        )
+
+    def _requeue_stale(self) -> int:
+        return self._execute(
+            "UPDATE audio_jobs SET status = 'queued', stage = 'queued', progress = 0, owner = NULL "
+            "WHERE status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+            (time.time() - STALE_SECONDS,),
+        )
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                await asyncio.to_thread(
+                    self._execute, "UPDATE audio_jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ?", (time.time(), self.owner)
+                )
+                if await asyncio.to_thread(self._requeue_stale):
+                    self._submitted.set()
+            except sqlite3.Error as e:
+                logger.warning(f"Audio job heartbeat failed: {e}")
+
+    async def submit(self, request: str) -> AudioJob:
+        job = AudioJob(id=uuid.uuid4().hex, request=request, status="queued", stage="queued", created_at=time.time())
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO audio_jobs (id, request, status, stage, progress, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job.id, job.request, job.status, job.stage, job.progress, job.created_at),
+        )
+        self._submitted.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[AudioJob]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[AudioJob]:
+        row = self._connection().execute("SELECT * FROM audio_jobs WHERE id = ?", (job_id,)).fetchone()
+        return AudioJob(**{name: row[name] for name in AudioJob.model_fields}) if row is not None else None
+
+    async def events(self, job_id: str) -> AsyncIterator[AudioJob]:
+        """Yields the job now and after every change, until it is done or failed."""
+        changed = asyncio.Event()
+        self._subscribers.setdefault(job_id, set()).add(changed)
+        try:
+            last = None
+            while (job := await self.get(job_id)) is not None:
+                if job != last:
+                    yield job
+                    if job.status in TERMINAL_STATUSES:
+                        return
+                    last = job
+                # Woken by changes in this process, changes by workers of other processes are polled for
+                try:
+                    await asyncio.wait_for(changed.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                changed.clear()
+        finally:
+            self._subscribers[job_id].discard(changed)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    async def stats_async(self, window: int = 1000) -> AudioJobStats:
+        return await asyncio.to_thread(self.stats, window)
+
+    def stats(self, window: int = 1000) -> AudioJobStats:
+        """Blocks on the database, use `stats_async` on the event loop."""
+        connection = self._connection()
+        counts = {status: count for status, count in connection.execute("SELECT status, COUNT(*) FROM audio_jobs GROUP BY status")}
+        rows = connection.execute(
+            "SELECT started_at - created_at, finished_at - started_at FROM audio_jobs WHERE finished_at IS NOT NULL AND started_at IS NOT NULL "
+            "ORDER BY finished_at DESC LIMIT ?",
+            (window,),
+        ).fetchall()
+        oldest_queued = connection.execute("SELECT MIN(created_at) FROM audio_jobs WHERE status = 'queued'").fetchone()[0]
+        waits = [wait for wait, _ in rows]
+        runs = [run for _, run in rows]
+        return AudioJobStats(
+            queued=counts.get("queued", 0),
+            running=counts.get("running", 0),
+            done=counts.get("done", 0),
+            failed=counts.get("failed", 0),
+            workers=len(self._workers),
+            oldest_queued_seconds=time.time() - oldest_queued if oldest_queued is not None else 0.0,
+            mean_wait_seconds=statistics.mean(waits) if waits else 0.0,
+            p95_wait_seconds=_p95(waits),
+            mean_run_seconds=statistics.mean(runs) if runs else 0.0,
+            p95_run_seconds=_p95(runs),
+        )
+
+    async def _update(self, job_id: str, **fields):
+        # Only while this process owns the job, a job requeued as stale may be running somewhere else by now
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        await asyncio.to_thread(self._execute, f"UPDATE audio_jobs SET {assignments} WHERE id = ? AND owner = ?", (*fields.values(), job_id, self.owner))
+        for changed in self._subscribers.get(job_id, ()):
+            changed.set()
+
+    def _claim_next(self) -> Optional[AudioJob]:
+        """The oldest queued job, marked as running by this process. None if no job is queued."""
+        while True:
+            row = self._connection().execute("SELECT id FROM audio_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            claimed = self._execute(
+                "UPDATE audio_jobs SET status = 'running', stage = 'script', started_at = ?, owner = ?, heartbeat_at = ? WHERE id = ? AND status = 'queued'",
+                (now, self.owner, now, row["id"]),
+            )
+            # Otherwise a worker of another process claimed it in between
+            if claimed:
+                return self._get(row["id"])
+
+    async def _work(self):
+        while True:
+            self._submitted.clear()
+            job = await asyncio.to_thread(self._claim_next)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._submitted.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for changed in self._subscribers.get(job.id, ()):
+                changed.set()
+
+            async def on_progress(stage: str, progress: float):
+                await self._update(job.id, stage=stage, progress=progress)
+
+            try:
+                path = await self.run(job, on_progress)
+                await self._update(job.id, status="done", stage="done", progress=1.0, path=path, finished_at=time.time())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Audio job {job.id} failed: {e}")
+                await self._update(job.id, status="failed", stage="failed", error=str(e), finished_at=time.time())
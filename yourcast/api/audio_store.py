@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+AUDIO_STORE_DIR = "yourcast/assets/cache/audio"
+# Temporary files older than this are leftovers of interrupted writes, younger ones can belong to a write in progress of
+# another process sharing the directory
+STALE_TMP_SECONDS = 3600
+
+
+class AudioStoreStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    entries: int = 0
+    bytes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class AudioStore:
+    """Size-bounded store of generated MP3 files, one sub directory per kind of artifact (whole summaries, sentences).
+
+    Files are addressed by a key the caller derives from everything that determines the audio, so identical requests
+    share one file. The least recently used files are deleted once the total size exceeds `max_bytes`. Accesses are
+    written to the file access times, so the order survives restarts. Files of earlier runs are only known after
+    `cleanup`, which the API runs once after startup.
+    """
+
+    def __init__(self, directory: str = AUDIO_STORE_DIR, max_bytes: int = 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = AudioStoreStats()
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, kind: str, key: str) -> str:
+        return os.path.join(self.directory, kind, f"{key}.mp3")
+
+    def cleanup(self):
+        """Index the stored files, delete the leftovers of interrupted writes and evict down to the size limit."""
+        files = []
+        now = time.time()
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                # Other processes sharing the directory write, evict and clean up concurrently, files can vanish any time
+                try:
+                    stat = os.stat(path)
+                    if name.endswith(".tmp"):
+                        if now - stat.st_mtime > STALE_TMP_SECONDS:
+                            os.remove(path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_atime, path, stat.st_size))
+
+        with self._lock:
+            self._entries.clear()
+            for _, path, size in sorted(files):
+                self._entries[path] = size
+            self.stats.bytes = sum(self._entries.values())
+            self._evict()
+        logger.info(f"Audio store holds {self.stats.entries} files, {self.stats.bytes / 1024 / 1024:.1f} MB")
+
+    def get(self, kind: str, key: str) -> Optional[str]:
+        """Path of the stored file, None if there is none."""
+        path = self.path(kind, key)
+        with self._lock:
+            if path not in self._entries:
+                self.stats.misses += 1
+                return None
+            if not os.path.exists(path):
+                # Deleted behind our back, e.g. by another process sharing the directory
+                self.stats.bytes -= self._entries.pop(path)
+                self.stats.entries = len(self._entries)
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.stats.hits += 1
+        try:
+            # Only the access time is touched, the mtime is part of the ETag the file is served with
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def read(self, kind: str, key: str) -> Optional[bytes]:
+        path = self.get(kind, key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, kind: str, key: str, data: bytes) -> str:
+        """Stores `data` and returns the path of the file. Written to a temporary file first, readers never see a part."""
+        path = self.path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique across the threads and processes writing the same key
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.stats.bytes += len(data) - self._entries.pop(path, 0)
+            self._entries[path] = len(data)
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Optional[str] = None):
+        if self.stats.bytes > self.max_bytes:
+            # Evict down to 90% of the limit, so not every following write has to evict again
+            target = int(self.max_bytes * 0.9)
+            for path in list(self._entries):
+                if self.stats.bytes <= target:
+                    break
+                if path == keep:
+                    continue
+                self.stats.bytes -= self._entries.pop(path)
+                self.stats.evictions += 1
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self.stats.entries = len(self._entries)
@@ -0,0 +1,70 @@
+import asyncio
+import re
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable
+
+# End of a sentence: punctuation followed by whitespace, so "3.5" or "e.g." inside a word never cuts, or a line break
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+async def split_sentences(texts: AsyncIterator[str], min_chars: int = 40) -> AsyncIterator[str]:
+    """Regroups streamed text into sentences, yielded as soon as they are complete.
+
+    Sentences shorter than `min_chars` are joined with the next one, every synthesized chunk has a fixed overhead.
+    """
+    buffer = ""
+    async for text in texts:
+        buffer += text
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            sentence = buffer[start : match.start()].strip()
+            # A match at the very end may still grow, e.g. a line break followed by more line breaks
+            if len(sentence) >= min_chars and match.end() < len(buffer):
+                yield sentence
+                start = match.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def stream_speech(sentences: AsyncIterator[str], synthesize: Callable[[str], bytes], executor: Executor, lookahead: int = 2) -> AsyncIterator[bytes]:
+    """Synthesizes sentences in `executor` while they arrive and yields the audio in the order of the sentences.
+
+    Up to `lookahead` sentences of one stream are synthesized at the same time, so the next chunk is usually ready
+    before the client played the current one, without one stream taking over the whole executor.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(lookahead)
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    async def synthesize_sentence(sentence: str) -> bytes:
+        # The semaphore hands out slots in order of arrival, so earlier sentences are synthesized first
+        async with slots:
+            return await loop.run_in_executor(executor, synthesize, sentence)
+
+    async def produce():
+        try:
+            async for sentence in sentences:
+                await chunks.put(asyncio.create_task(synthesize_sentence(sentence)))
+        except Exception as e:
+            await chunks.put(e)
+        await chunks.put(None)
+
+    producer = asyncio.create_task(produce())
+    pending = []
+    try:
+        while (item := await chunks.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            pending.append(item)
+            yield await item
+            pending.remove(item)
+    finally:
+        # The client went away or something failed, stop generating and synthesizing what nobody will hear
+        producer.cancel()
+        while not chunks.empty():
+            item = chunks.get_nowait()
+            if isinstance(item, asyncio.Task):
+                pending.append(item)
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from yourcast.tools.vector_store import IndexVersion
+
+
+class SearchCacheStats(BaseModel):
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    entries: int = 0
+    invalidations: int = 0
+    latency_saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+
+
+class _Entry:
+    def __init__(self, query: str, limit: int, embedding: np.ndarray, response: bytes, compute_seconds: float):
+        self.query = query
+        self.limit = limit
+        self.embedding = embedding
+        self.response = response
+        self.compute_seconds = compute_seconds
+        self.created_at = time.monotonic()
+
+
+class SearchCache:
+    """Two level cache of serialized search responses.
+
+    The first level maps the normalized query and limit to the response, so repeated queries skip the embedding call,
+    the vector query and building the response. The second level compares the embedding of a new query with the ones
+    of cached queries and reuses the response of one with cosine similarity >= `similarity_threshold` and the same limit.
+
+    Entries expire after `ttl_seconds`, the least recently used entry is evicted beyond `max_size` entries, and the
+    whole cache is dropped as soon as the ingestion bumps `index_version`, or `metadata_version` returns a new value.
+    """
+
+    def __init__(
+        self,
+        index_version: IndexVersion,
+        max_size: int = 1024,
+        ttl_seconds: float = 600,
+        similarity_threshold: float = 0.95,
+        metadata_version: Optional[Callable[[], int]] = None,
+    ):
+        self.index_version = index_version
+        self.metadata_version = metadata_version
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.stats = SearchCacheStats()
+        self._entries: OrderedDict[tuple[str, int], _Entry] = OrderedDict()
+        # Read on the first lookup, the metadata store may not be open yet
+        self._version: Optional[tuple[int, int]] = None
+        self._lock = threading.Lock()
+        # Embeddings of all entries stacked for the similarity lookup, rebuilt lazily after the entries changed
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: list[tuple[str, int]] = []
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def get(self, query: str, limit: int) -> Optional[bytes]:
+        """First level lookup, None on a miss. A miss is only counted by `get_similar`, the lookup that follows it."""
+        key = (self.normalize(query), limit)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                self._matrix = None
+                self.stats.entries = len(self._entries)
+                return None
+            self._entries.move_to_end(key)
+            self.stats.exact_hits += 1
+            self.stats.latency_saved_seconds += entry.compute_seconds
+            return entry.response
+
+    def get_similar(self, embedding: list[float], limit: int) -> Optional[bytes]:
+        """Second level lookup by query embedding. The embedding call was paid already, the vector query is saved."""
+        query_vector = self._normalize_vector(embedding)
+        with self._lock:
+            self._check_version()
+            if self._matrix is None:
+                self._rebuild_matrix()
+            if not self._matrix_keys:
+                self.stats.misses += 1
+                return None
+
+            scores = self._matrix @ query_vector
+            for idx in np.argsort(-scores):
+                if scores[idx] < self.similarity_threshold:
+                    break
+                entry = self._entries.get(self._matrix_keys[idx])
+                if entry is None or entry.limit != limit or self._expired(entry):
+                    continue
+                self._entries.move_to_end(self._matrix_keys[idx])
+                self.stats.semantic_hits += 1
+                self.stats.latency_saved_seconds += entry.compute_seconds
+                return entry.response
+            self.stats.misses += 1
+            return None
+
+    def put(self, query: str, limit: int, embedding: list[float], response: bytes, compute_seconds: float):
+        """
+        :param compute_seconds: Time it took to produce the response, a later hit counts it as latency saved
+        """
+        key = (self.normalize(query), limit)
+        with self._lock:
+            self._check_version()
+            self._entries[key] = _Entry(key[0], limit, self._normalize_vector(embedding), response, compute_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+            self.stats.entries = len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._matrix = None
+        self.stats.entries = 0
+
+    def _check_version(self):
+        version = (self.index_version.get(), self.metadata_version() if self.metadata_version is not None else 0)
+        if version != self._version:
+            if self._version is not None:
+                self.stats.invalidations += 1
+                self._clear()
+            self._version = version
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.created_at > self.ttl_seconds
+
+    def _rebuild_matrix(self):
+        self._matrix_keys = [key for key, entry in self._entries.items() if not self._expired(entry)]
+        if self._matrix_keys:
+            self._matrix = np.stack([self._entries[key].embedding for key in self._matrix_keys])
+        else:
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+
+    @staticmethod
+    def _normalize_vector(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
@@ -0,0 +1,153 @@
+"""Load test: concurrent /search throughput while /summary_audio requests are running.
+
+The API runs against the fake OpenAI server and a local vector store, text to speech is replaced by a blocking sleep
+of --tts-latency seconds like a gTTS call. With a non-blocking request path the search throughput measured during the
+summary requests stays close to the throughput without them.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_api_load --concurrency 16 --duration 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from yourcast.benchmarks.fakes import FakeServer, create_fake_openai_app
+from yourcast.tools.helpers import load_json
+
+
+def populate_vector_store(directory: str, index_name: str, n_vectors: int, dimension: int = 1536):
+    from yourcast.tools.vector_store import LocalVectorStore
+
+    episode_names = list(load_json("yourcast/assets/episode_summaries.json"))
+    podcast_images = load_json("yourcast/assets/podcast_images.json")
+    podcast_names = list(podcast_images)
+    store = LocalVectorStore(os.path.join(directory, index_name), dimension)
+    rng = np.random.default_rng(0)
+    store.upsert(
+        [
+            {
+                "id": f"bullet-{i}",
+                "values": rng.normal(size=dimension).astype(np.float32),
+                "metadata": {
+                    "text": f"Fake bullet point {i} (42 sec)",
+                    "timestamp": 42,
+                    "episode_name": episode_names[i % len(episode_names)],
+                    "source_podcast_name": podcast_names[i % len(podcast_names)],
+                    "published_date": "Mar 29, 2025",
+                    "listen_link": "",
+                    "image": podcast_images[podcast_names[i % len(podcast_names)]],
+                },
+            }
+            for i in range(n_vectors)
+        ]
+    )
+
+
+def fake_synthesize_speech(tts_latency: float):
+    def synthesize_speech_bytes(text: str) -> bytes:
+        # Blocks the calling thread like gTTS does while it talks to Google
+        time.sleep(tts_latency)
+        return b"ID3" + text.encode()[:1024]
+
+    return synthesize_speech_bytes
+
+
+async def search_load(client: httpx.AsyncClient, concurrency: int, duration: float) -> list[float]:
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def user(user_id: int):
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            # Distinct queries, so every request pays for its embedding
+            response = await client.get("/search", params={"query": f"growth marketing question {user_id}-{i}", "limit": 10})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    await asyncio.gather(*(user(user_id) for user_id in range(concurrency)))
+    return latencies
+
+
+async def summary_audio_loop(client: httpx.AsyncClient, stop: asyncio.Event) -> int:
+    n_requests = 0
+    while not stop.is_set():
+        # A new takeaway every time, identical requests would be served from the audio store
+        takeaways = [f"A takeaway {id(stop)}-{n_requests}"] + ["A takeaway"] * 9
+        payload = {
+            "data_sample": [{"id": 1, "title": "Fake", "host": "Host", "hostId": "1", "image": "", "summary": "", "date": "", "keyTakeaways": takeaways}],
+            "length": "short",
+            "tone": "casual",
+            "style": "conversational",
+        }
+        response = await client.post("/summary_audio", json=payload, timeout=120)
+        response.raise_for_status()
+        n_requests += 1
+    return n_requests
+
+
+def report(name: str, latencies: list[float], duration: float):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:<34} {len(latencies) / duration:8.1f} req/s   p50 {statistics.median(latencies) * 1000:8.1f} ms   "
+        f"p95 {p95 * 1000:8.1f} ms   max {latencies[-1] * 1000:8.1f} ms"
+    )
+
+
+async def run(api_url: str, args):
+    async with httpx.AsyncClient(base_url=api_url, timeout=60, limits=httpx.Limits(max_connections=args.concurrency + 4)) as client:
+        # Warm up connection pools and the vector store pages
+        await search_load(client, args.concurrency, 1.0)
+        report("search", await search_load(client, args.concurrency, args.duration), args.duration)
+
+        stop = asyncio.Event()
+        summaries = [asyncio.create_task(summary_audio_loop(client, stop)) for _ in range(args.summary_requests)]
+        # Let the summary requests reach the LLM and TTS calls first
+        await asyncio.sleep(0.5)
+        latencies = await search_load(client, args.concurrency, args.duration)
+        stop.set()
+        n_summaries = sum(await asyncio.gather(*summaries))
+        report(f"search during {args.summary_requests} /summary_audio", latencies, args.duration)
+        print(f"{'':<34} {n_summaries} /summary_audio requests completed")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--concurrency", type=int, default=16, help="Concurrent /search users")
+    arg_parser.add_argument("--duration", type=float, default=5.0, help="Seconds per measurement")
+    arg_parser.add_argument("--summary-requests", type=int, default=2, help="Concurrent /summary_audio requests in the second measurement")
+    arg_parser.add_argument("--vectors", type=int, default=5000)
+    arg_parser.add_argument("--chat-latency", type=float, default=2.0)
+    arg_parser.add_argument("--embedding-latency", type=float, default=0.05)
+    arg_parser.add_argument("--tts-latency", type=float, default=2.0)
+    args = arg_parser.parse_args()
+
+    with (
+        FakeServer(create_fake_openai_app(chat_latency=args.chat_latency, embedding_latency=args.embedding_latency)) as openai_server,
+        tempfile.TemporaryDirectory() as tmp_dir,
+    ):
+        os.environ["OPENAI_BASE_URL"] = f"{openai_server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["YOURCAST_LLM_CACHE"] = "0"
+        os.environ["YOURCAST_EMBEDDING_BACKEND"] = "openai"
+        os.environ["YOURCAST_VECTOR_STORE"] = "local"
+        os.environ["YOURCAST_LOCAL_VECTOR_STORE_DIR"] = tmp_dir
+        os.environ["YOURCAST_METADATA_STORE"] = os.path.join(tmp_dir, "metadata.sqlite")
+        os.environ["PINECONE_INDEX_NAME"] = "bench"
+        os.environ["YOURCAST_AUDIO_STORE_DIR"] = os.path.join(tmp_dir, "audio")
+        populate_vector_store(tmp_dir, "bench", args.vectors)
+
+        # Imported after the environment is set, the API creates its clients and vector store at import
+        from yourcast.api import api
+
+        api.synthesize_speech_bytes = fake_synthesize_speech(args.tts_latency)
+        with FakeServer(api.app) as api_server:
+            asyncio.run(run(api_server.base_url, args))
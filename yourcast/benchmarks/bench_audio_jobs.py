@@ -0,0 +1,84 @@
+"""Submit latency and throughput of the audio job queue with many clients at once.
+
+Every client submits a job with new takeaways and follows it over server-sent events until the audio is ready, then
+downloads it. The API runs against the fake OpenAI server, text to speech is replaced by a blocking sleep.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_audio_jobs --clients 40 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from yourcast.benchmarks.bench_summary_stream import fake_tts, make_payload
+from yourcast.benchmarks.fakes import FakeServer, create_fake_openai_app
+
+
+async def client_run(client: httpx.AsyncClient, i: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    response = await client.post("/summary_audio/jobs", json=make_payload(i))
+    response.raise_for_status()
+    submitted = time.perf_counter() - start
+    job = response.json()
+
+    async with client.stream("GET", f"/summary_audio/jobs/{job['id']}/events") as events:
+        async for line in events.aiter_lines():
+            if line.startswith("data: "):
+                job = json.loads(line[len("data: ") :])
+    if job["status"] != "done":
+        raise RuntimeError(f"Job {job['id']} {job['status']}: {job['error']}")
+    (await client.get(job["audio_url"])).raise_for_status()
+    return submitted, time.perf_counter() - start
+
+
+async def run(api_url: str, args):
+    async with httpx.AsyncClient(base_url=api_url, timeout=300, limits=httpx.Limits(max_connections=args.clients + 4)) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(client_run(client, i) for i in range(args.clients)))
+        elapsed = time.perf_counter() - start
+        stats = (await client.get("/summary_audio/jobs/stats")).json()
+
+    submits = sorted(submitted for submitted, _ in results)
+    print(f"{args.clients} jobs with {args.workers} workers in {elapsed:.1f}s, {args.clients / elapsed:.2f} jobs/s")
+    print(f"submit        p50 {statistics.median(submits) * 1000:7.1f} ms   max {submits[-1] * 1000:7.1f} ms")
+    print(f"until audio   p50 {statistics.median(total for _, total in results):7.2f} s    max {max(total for _, total in results):7.2f} s")
+    print(
+        f"queue wait    mean {stats['mean_wait_seconds']:6.2f} s   p95 {stats['p95_wait_seconds']:6.2f} s, "
+        f"run mean {stats['mean_run_seconds']:6.2f} s   p95 {stats['p95_run_seconds']:6.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--clients", type=int, default=40)
+    arg_parser.add_argument("--workers", type=int, default=4)
+    arg_parser.add_argument("--chat-latency", type=float, default=2.0)
+    arg_parser.add_argument("--lines", type=int, default=20, help="Lines of the generated dialogue")
+    arg_parser.add_argument("--tts-overhead", type=float, default=0.1)
+    arg_parser.add_argument("--tts-seconds-per-char", type=float, default=0.001)
+    args = arg_parser.parse_args()
+
+    with FakeServer(create_fake_openai_app(chat_latency=args.chat_latency, n_items=args.lines)) as openai_server, tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["OPENAI_BASE_URL"] = f"{openai_server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["YOURCAST_LLM_CACHE"] = "0"
+        os.environ["YOURCAST_VECTOR_STORE"] = "local"
+        os.environ["YOURCAST_LOCAL_VECTOR_STORE_DIR"] = tmp_dir
+        os.environ["YOURCAST_METADATA_STORE"] = os.path.join(tmp_dir, "metadata.sqlite")
+        os.environ["PINECONE_INDEX_NAME"] = "bench"
+        os.environ["YOURCAST_AUDIO_STORE_DIR"] = os.path.join(tmp_dir, "audio")
+        os.environ["YOURCAST_AUDIO_JOBS_PATH"] = os.path.join(tmp_dir, "audio_jobs.sqlite")
+        os.environ["YOURCAST_AUDIO_JOB_WORKERS"] = str(args.workers)
+
+        # Imported after the environment is set, the API creates its clients and stores at import
+        from yourcast.api import api
+
+        api.synthesize_speech_bytes = fake_tts(args.tts_overhead, args.tts_seconds_per_char)
+        with FakeServer(api.app) as api_server:
+            asyncio.run(run(api_server.base_url, args))
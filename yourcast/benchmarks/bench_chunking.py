@@ -0,0 +1,89 @@
+"""Chunk sizes and cut points of the chunked summarization mode on the transcript fixtures of the benchmark suite.
+
+Checks that the chunks cover every sentence exactly once and in order, that no chunk of more than one sentence exceeds
+the token budget, and that every cut is at a speaker change unless the second half of the chunk had none. Exits with 1
+when a check fails.
+
+A random transcript with sentences of very different lengths is checked too, long sentences after a cut are where the
+sentences carried over into the next chunk can push it over the budget.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_chunking --chunk-tokens 500 1000 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+
+
+def random_transcript(n_sentences: int, seed: int = 0):
+    from yourcast.scraper.transcript import Transcript
+
+    rng = random.Random(seed)
+    transcript = Transcript()
+    speaker_id = 0
+    for idx in range(n_sentences):
+        if rng.random() < 0.2:
+            speaker_id = 1 - speaker_id
+        transcript.append(" ".join(["word"] * rng.randrange(2, 200)) + ".", idx * 5.0, speaker_id)
+    return transcript
+
+
+def check_chunks(transcript, chunks, sentence_tokens: list[int], budget: int) -> list[str]:
+    problems = []
+    if [text for chunk in chunks for text in chunk.texts()] != transcript.texts():
+        problems.append("chunks do not cover the transcript in order")
+        return problems
+    speaker_ids = transcript.speaker_ids
+    start = 0
+    for idx, chunk in enumerate(chunks):
+        end = start + len(chunk)
+        tokens = sum(sentence_tokens[start:end])
+        if len(chunk) > 1 and tokens > budget:
+            problems.append(f"chunk {idx} has {tokens} tokens")
+        if end < len(transcript) and speaker_ids[end] == speaker_ids[end - 1]:
+            skipped = [i for i in range(start + len(chunk) // 2 + 1, end) if speaker_ids[i] != speaker_ids[i - 1]]
+            if skipped:
+                problems.append(f"chunk {idx} is cut within a turn although a speaker changes at sentence {skipped[-1]}")
+        start = end
+    return problems
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--chunk-tokens", type=int, nargs="+", default=[500, 1000, 2000])
+    args = arg_parser.parse_args()
+
+    from yourcast.benchmarks.suite import fixture_pages
+    from yourcast.parser.episode_parser import EpisodeParser
+    from yourcast.parser.prompt_encoding import PromptEncoding
+    from yourcast.scraper.http_fetcher import parse_transcript_html
+    from yourcast.tools.metadata_store import MetadataStore
+    from yourcast.tools.rate_limit import estimate_tokens
+
+    transcripts = {name: parse_transcript_html(html) for name, html in fixture_pages().items()}
+    transcripts["random"] = random_transcript(2000)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        metadata_store = MetadataStore(os.path.join(tmp_dir, "metadata.sqlite"))
+        for name, transcript in transcripts.items():
+            print(f"{name}: {len(transcript)} sentences")
+            for label, encoding, overhead in (("verbose", None, 3), ("compact", PromptEncoding(), 1)):
+                # The same estimate split_into_chunks budgets with
+                sentence_tokens = [estimate_tokens(text) + overhead for text in transcript.texts()]
+                for budget in args.chunk_tokens:
+                    parser = EpisodeParser(metadata_store=metadata_store, chunk_tokens=budget, prompt_encoding=encoding)
+                    chunks = parser.split_into_chunks(transcript)
+                    problems = check_chunks(transcript, chunks, sentence_tokens, budget)
+                    failed |= bool(problems)
+                    sizes = [sum(estimate_tokens(text) + overhead for text in chunk.texts()) for chunk in chunks]
+                    at_speaker_change = sum(chunk[0].speaker_id != previous[-1].speaker_id for previous, chunk in zip(chunks, chunks[1:]))
+                    print(
+                        f"  {label:<8} budget {budget:>5}: {len(chunks):>3} chunks, tokens mean {statistics.mean(sizes):7.1f} "
+                        f"max {max(sizes):>5}, {at_speaker_change}/{len(chunks) - 1} cuts at speaker changes"
+                    )
+                    for problem in problems:
+                        print(f"    FAILED: {problem}")
+    sys.exit(1 if failed else 0)
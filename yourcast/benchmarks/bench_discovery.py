@@ -0,0 +1,44 @@
+"""Compare the streaming episode discovery with the markdownify + regex path of get_podcast_links.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_discovery
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from yourcast.scraper.discover_episodes import LISTING_HTML_PATH, iter_episodes
+from yourcast.scraper.get_podcast_links import extract_episode_info_from_html
+
+
+def measure(fn, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, min(timings), peak
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--html", default=LISTING_HTML_PATH)
+    arg_parser.add_argument("--repeats", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    markdown_result, markdown_time, markdown_peak = measure(lambda: extract_episode_info_from_html(args.html), args.repeats)
+    streaming_result, streaming_time, streaming_peak = measure(lambda: list(iter_episodes(args.html)), args.repeats)
+
+    print(f"{'path':<20}{'episodes':>10}{'best time (ms)':>18}{'peak memory (MB)':>20}")
+    print(f"{'markdown + regex':<20}{len(markdown_result):>10}{markdown_time * 1000:>18.1f}{markdown_peak / 1e6:>20.2f}")
+    print(f"{'streaming html':<20}{len(streaming_result):>10}{streaming_time * 1000:>18.1f}{streaming_peak / 1e6:>20.2f}")
+    print(f"speedup: {markdown_time / streaming_time:.1f}x")
+
+    differing = [(old, new) for old, new in zip(markdown_result, streaming_result) if old != new]
+    for old, new in differing:
+        print(f"differs: {old['episode_name']!r} (markdown) vs {new['episode_name']!r} (streaming)")
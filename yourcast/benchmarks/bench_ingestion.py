@@ -0,0 +1,101 @@
+"""Measure ingestion throughput of the sequential loop and the concurrent pipeline against a fake OpenAI server.
+
+Two more pipeline runs over the same episodes measure how fast already ingested episodes are skipped via the ledger,
+and what an incremental re-ingestion of unchanged bullet points costs.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_ingestion --episodes 40 --chat-latency 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from yourcast.benchmarks.fakes import FakePineconeIndex, FakeServer, create_fake_openai_app
+from yourcast.tools.helpers import load_json, store_json
+
+
+def write_fake_episodes(directory: str, n_episodes: int, n_sentences: int) -> list[str]:
+    podcast_names = list(load_json("yourcast/assets/podcast_images.json"))
+    paths = []
+    for i in range(n_episodes):
+        sentences = [
+            {"text": f"Sentence {j} of fake episode {i} talking about something interesting.", "start_time": j * 4.2, "speaker_id": j % 2}
+            for j in range(n_sentences)
+        ]
+        episode = {
+            "episode_name": f"Fake episode {i}",
+            "podcast_name": podcast_names[i % len(podcast_names)],
+            "publication_date": "Mar 29, 2025",
+            "url": f"https://example.com/fake-episode-{i}",
+            "sentences": sentences,
+        }
+        path = os.path.join(directory, f"fake-episode-{i}.json")
+        store_json(episode, path)
+        paths.append(path)
+    return paths
+
+
+def run_sequential(parser, paths: list[str]):
+    from yourcast.scraper.run_scrape import EpisodeScrapeResult
+
+    for path in paths:
+        episode = EpisodeScrapeResult(**load_json(path))
+        if not parser.needs_ingestion(episode):
+            continue
+        bulletpoints = parser.parse(episode)
+        parser.upsert_changed_bulletpoints(episode, bulletpoints.bullet_points)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--episodes", type=int, default=20)
+    arg_parser.add_argument("--sentences", type=int, default=500)
+    arg_parser.add_argument("--chat-latency", type=float, default=0.5)
+    arg_parser.add_argument("--embedding-latency", type=float, default=0.05)
+    arg_parser.add_argument("--llm-concurrency", type=int, default=8)
+    arg_parser.add_argument("--rpm", type=float, default=500)
+    arg_parser.add_argument("--tpm", type=float, default=2_000_000)
+    arg_parser.add_argument("--chunk-tokens", type=int, default=None, help="Summarize the episodes in chunks of this many tokens")
+    arg_parser.add_argument("--skip-sequential", action="store_true")
+    args = arg_parser.parse_args()
+
+    app = create_fake_openai_app(chat_latency=args.chat_latency, embedding_latency=args.embedding_latency)
+    with FakeServer(app) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["OPENAI_BASE_URL"] = f"{server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        # Every run has to pay for its LLM calls, otherwise the second run only measures cache hits
+        os.environ["YOURCAST_LLM_CACHE"] = "0"
+        # Imported after the environment is set, the module level OpenAI client reads it on first use
+        from yourcast.parser.episode_parser import EpisodeParser
+        from yourcast.parser.ingest_pipeline import IngestionPipeline
+        from yourcast.parser.ingestion_ledger import IngestionLedger
+        from yourcast.tools.metadata_store import MetadataStore
+        from yourcast.tools.rate_limit import RateLimitScheduler
+
+        paths = write_fake_episodes(tmp_dir, args.episodes, args.sentences)
+        metadata_store = MetadataStore(os.path.join(tmp_dir, "metadata.sqlite"))
+        metadata_store.migrate_from_json()
+
+        if not args.skip_sequential:
+            start = time.perf_counter()
+            ledger = IngestionLedger(os.path.join(tmp_dir, "sequential_ledger.json"))
+            run_sequential(EpisodeParser(FakePineconeIndex(), metadata_store=metadata_store, chunk_tokens=args.chunk_tokens, ledger=ledger), paths)
+            elapsed = time.perf_counter() - start
+            print(f"sequential: {args.episodes} episodes in {elapsed:.1f}s, {args.episodes / elapsed * 3600:.0f} episodes/hour")
+
+        ledger = IngestionLedger(os.path.join(tmp_dir, "ledger.json"))
+        parser = EpisodeParser(FakePineconeIndex(), metadata_store=metadata_store, chunk_tokens=args.chunk_tokens, ledger=ledger)
+        pipeline = IngestionPipeline(parser, RateLimitScheduler(args.rpm, args.tpm), llm_concurrency=args.llm_concurrency)
+        stats = asyncio.run(pipeline.run(paths))
+        print(f"pipeline:   {stats.summary()}")
+
+        rerun = IngestionPipeline(parser, RateLimitScheduler(args.rpm, args.tpm), llm_concurrency=args.llm_concurrency)
+        stats = asyncio.run(rerun.run(paths))
+        print(f"re-run:     {stats.skipped} already ingested episodes skipped in {stats.elapsed_seconds:.2f}s")
+
+        # The fake server returns the same bullet points again, so nothing should be embedded, upserted or deleted
+        parser.incremental = True
+        incremental = IngestionPipeline(parser, RateLimitScheduler(args.rpm, args.tpm), llm_concurrency=args.llm_concurrency)
+        print(f"incremental: {asyncio.run(incremental.run(paths)).summary()}")
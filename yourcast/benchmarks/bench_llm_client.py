@@ -0,0 +1,65 @@
+"""Per-call overhead of building a new OpenAI client for every call versus the shared pooled SyncClient/AsyncClient.
+
+Runs against the fake OpenAI server without latency, so the numbers are pure client and connection overhead. The fake
+server speaks plain HTTP on localhost, against api.openai.com every new connection also pays a TLS handshake.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_llm_client --calls 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from yourcast.benchmarks.fakes import FakeServer, create_fake_openai_app
+
+
+def report(name: str, durations: list[float]) -> float:
+    mean_ms = statistics.mean(durations) * 1000
+    print(f"{name:<28} mean {mean_ms:7.2f} ms   p50 {statistics.median(durations) * 1000:7.2f} ms per call")
+    return mean_ms
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--calls", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    with FakeServer(create_fake_openai_app(chat_latency=0.0, n_items=1)) as server:
+        os.environ["OPENAI_BASE_URL"] = f"{server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        from openai import OpenAI
+
+        from yourcast.tools.llm_helpers import AsyncClient, OpenaiModelNames, SyncClient
+
+        model = OpenaiModelNames.gpt4o_mini
+        messages = [{"role": "system", "content": "You are terse."}, {"role": "user", "content": "Say hi."}]
+
+        durations = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            # What every call used to do
+            OpenAI(api_key=os.getenv("OPENAI_API_KEY")).chat.completions.create(model=model.value, messages=messages, timeout=60)
+            durations.append(time.perf_counter() - start)
+        new_client_ms = report("new OpenAI client per call", durations)
+
+        client = SyncClient()
+        durations = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            client.completion("You are terse.", "Say hi.", model)
+            durations.append(time.perf_counter() - start)
+        sync_ms = report("shared SyncClient", durations)
+
+        async def run_async() -> list[float]:
+            client = AsyncClient()
+            durations = []
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                await client.completion("You are terse.", "Say hi.", model)
+                durations.append(time.perf_counter() - start)
+            return durations
+
+        async_ms = report("shared AsyncClient", asyncio.run(run_async()))
+        print(f"saved per call: {new_client_ms - sync_ms:.2f} ms sync, {new_client_ms - async_ms:.2f} ms async")
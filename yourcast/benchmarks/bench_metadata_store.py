@@ -0,0 +1,102 @@
+"""Cost of storing episode summaries one by one: rewriting episode_summaries.json after every episode, as the parser
+used to, versus an upsert into the metadata store. A second measurement runs summary lookups of the size of a /search
+response in reader threads while writer threads store new episodes, and reports how quickly readers see them.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_metadata_store --episodes 5000 --readers 4 --writers 2
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from yourcast.tools.helpers import store_json
+from yourcast.tools.metadata_store import MetadataStore
+
+SUMMARY = "A fake episode summary of about the length the parser generates, to make the stored file realistically large. " * 2
+
+
+def bench_json(path: str, n_episodes: int) -> float:
+    summaries = {}
+    start = time.perf_counter()
+    for i in range(n_episodes):
+        summaries[f"Fake episode {i}"] = SUMMARY
+        store_json(summaries, path)
+    return time.perf_counter() - start
+
+
+def bench_store(store: MetadataStore, n_episodes: int) -> float:
+    start = time.perf_counter()
+    for i in range(n_episodes):
+        store.put_episode(f"Fake episode {i}", podcast_name="Fake podcast", published_date="Mar 29, 2025", url="", summary=SUMMARY)
+    return time.perf_counter() - start
+
+
+def bench_concurrent(store: MetadataStore, n_episodes: int, n_readers: int, n_writers: int, duration: float):
+    stop = threading.Event()
+    lookups: list[float] = []
+    # Time from a write until a reader saw the new version
+    visibility: list[float] = []
+    written_at: dict[int, float] = {}
+    lock = threading.Lock()
+
+    def read():
+        rng = random.Random()
+        last_version = store.version()
+        while not stop.is_set():
+            names = [f"Fake episode {rng.randrange(n_episodes)}" for _ in range(20)]
+            start = time.perf_counter()
+            store.get_summaries(names)
+            version = store.version()
+            now = time.perf_counter()
+            with lock:
+                lookups.append(now - start)
+                if version != last_version and version in written_at:
+                    visibility.append(now - written_at[version])
+            last_version = version
+
+    def write(writer: int):
+        i = 0
+        while not stop.is_set():
+            version = store.put_episode(f"New episode {writer}-{i}", summary=SUMMARY)
+            with lock:
+                written_at[version] = time.perf_counter()
+            i += 1
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=read) for _ in range(n_readers)] + [threading.Thread(target=write, args=(w,)) for w in range(n_writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    lookups.sort()
+    print(
+        f"concurrent: {len(lookups) / duration:.0f} lookups/s of 20 summaries by {n_readers} readers, "
+        f"p50 {statistics.median(lookups) * 1000:.2f} ms   p99 {lookups[int(len(lookups) * 0.99)] * 1000:.2f} ms, "
+        f"{len(written_at)} episodes written by {n_writers} writers"
+    )
+    if visibility:
+        print(f"            new summaries visible to readers after p50 {statistics.median(visibility) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--episodes", type=int, default=2000)
+    arg_parser.add_argument("--readers", type=int, default=4)
+    arg_parser.add_argument("--writers", type=int, default=2)
+    arg_parser.add_argument("--duration", type=float, default=3.0)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_seconds = bench_json(os.path.join(tmp_dir, "episode_summaries.json"), args.episodes)
+        print(f"json rewrite:    {args.episodes} episodes in {json_seconds:6.2f}s, {json_seconds / args.episodes * 1000:7.3f} ms/episode")
+        store = MetadataStore(os.path.join(tmp_dir, "metadata.sqlite"))
+        store_seconds = bench_store(store, args.episodes)
+        print(f"metadata store:  {args.episodes} episodes in {store_seconds:6.2f}s, {store_seconds / args.episodes * 1000:7.3f} ms/episode")
+        bench_concurrent(store, args.episodes, args.readers, args.writers, args.duration)
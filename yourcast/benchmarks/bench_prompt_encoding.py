@@ -0,0 +1,91 @@
+"""Input tokens and timestamp accuracy of the compact transcript encoding compared with the verbose one.
+
+Tokens are counted on the HTML fixtures of the benchmark suite. Timestamps are checked with `fixtures/takeaways.json`,
+a transcript with bullet points reworded and merged across sentences like the structuring step does, each with the
+sentences it was taken from. Every bullet point cites the last timestamp written before its first sentence and is
+mapped back to a sentence the way the parser does it. Its error is how far the resulting timestamp is outside its
+sentences. In the verbose format the start time of the first sentence is cited, only rounding down to whole seconds
+is left.
+
+The fallback error is the one of the cited timestamp itself, what a bullet point that shares no word with its
+sentences ends up with. Exits with 1 when the mean or maximum error of a compact encoding exceeds the one of the
+verbose format, or when the fallback error reaches the timestamp interval the encoder guarantees.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_prompt_encoding
+"""
+
+import argparse
+import importlib.util
+import statistics
+import sys
+
+
+def timestamp_errors(transcript, bullet_points: list[dict], encoding) -> tuple[list[float], list[float]]:
+    """Errors of the mapped timestamps and of the cited ones, in seconds, one per bullet point."""
+    from yourcast.parser.prompt_encoding import encode_transcript, locate_sentence
+
+    start_times = transcript.start_times
+
+    def error(timestamp: int, sources: list[int]) -> float:
+        return max(start_times[sources[0]] - timestamp, timestamp - start_times[sources[-1]], 0.0)
+
+    if encoding is None:
+        # Snapped to the whole second the bullet point timestamps are stored in
+        errors = [error(int(start_times[bp["sources"][0]]), bp["sources"]) for bp in bullet_points]
+        return errors, errors
+    texts = transcript.texts()
+    encoded = encode_transcript(transcript, encoding, with_token_counts=False)
+    errors, fallback_errors = [], []
+    for bp in bullet_points:
+        cited = encoded.sentence_anchors[bp["sources"][0]]
+        located = locate_sentence(texts, encoded.sentence_anchors, bp["text"], cited)
+        errors.append(error(int(start_times[located]), bp["sources"]))
+        fallback_errors.append(error(cited, bp["sources"]))
+    return errors, fallback_errors
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--intervals", type=float, nargs="+", default=[15, 30, 60], help="Timestamp intervals of the compact encodings")
+    arg_parser.add_argument("--drop-fillers", action="store_true")
+    args = arg_parser.parse_args()
+
+    from yourcast.benchmarks.suite import fixture_pages, fixture_takeaways
+    from yourcast.parser.prompt_encoding import PromptEncoding, count_tokens, encode_transcript
+    from yourcast.scraper.http_fetcher import parse_transcript_html
+
+    transcripts = {name: parse_transcript_html(html) for name, html in fixture_pages().items()}
+    encodings = {"verbose": None}
+    for interval in args.intervals:
+        encodings[f"compact {interval:g}s"] = PromptEncoding(timestamp_interval=interval, drop_fillers=args.drop_fillers)
+        encodings[f"compact {interval:g}s unmerged"] = PromptEncoding(timestamp_interval=interval, merge_speaker_turns=False, drop_fillers=args.drop_fillers)
+
+    if importlib.util.find_spec("tiktoken"):
+        print("Tokens counted with the o200k_base tokenizer of tiktoken")
+    else:
+        print("Tokens estimated at 4 characters per token, install tiktoken for exact counts")
+    for name, transcript in transcripts.items():
+        print(f"{name}: {len(transcript)} sentences, {transcript.start_times[-1] / 60:.0f} minutes")
+        verbose_tokens = count_tokens(transcript.to_prompt())
+        for label, encoding in encodings.items():
+            tokens = verbose_tokens if encoding is None else encode_transcript(transcript, encoding).tokens
+            print(f"  {label:<26}{tokens:>8} tokens {1 - tokens / verbose_tokens:>7.1%} saved")
+
+    transcript, bullet_points = fixture_takeaways()
+    print(f"takeaways.json: {len(bullet_points)} reworded bullet points from {len(transcript)} sentences")
+    verbose_errors, _ = timestamp_errors(transcript, bullet_points, None)
+    failed = False
+    for label, encoding in encodings.items():
+        errors, fallback_errors = timestamp_errors(transcript, bullet_points, encoding)
+        problems = []
+        if statistics.mean(errors) > statistics.mean(verbose_errors) or max(errors) > max(verbose_errors):
+            problems.append("EXCEEDS verbose")
+        if encoding is not None and max(fallback_errors) >= encoding.timestamp_interval:
+            problems.append(f"fallback EXCEEDS {encoding.timestamp_interval:g}s")
+        failed |= bool(problems)
+        print(
+            f"  {label:<26}timestamp error mean {statistics.mean(errors):5.2f}s  max {max(errors):5.2f}s   "
+            f"fallback mean {statistics.mean(fallback_errors):5.2f}s  max {max(fallback_errors):5.2f}s"
+            f"{''.join(f'  {problem}' for problem in problems)}"
+        )
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,93 @@
+"""/search latency with and without the search result cache on a workload of repeated queries.
+
+Users draw their queries from a small pool with a Zipf distribution, like the popular searches of a real audience.
+The API runs against the fake OpenAI server and a local vector store. Halfway through the cached run the index version
+is bumped, as the ingestion does after writing an episode, to show the cost of an invalidation.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_search_cache --requests 2000 --queries 200
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from yourcast.benchmarks.bench_api_load import populate_vector_store, report
+from yourcast.benchmarks.fakes import FakeServer, create_fake_openai_app
+
+
+async def search_workload(client: httpx.AsyncClient, queries: list[str], concurrency: int, on_halfway=None) -> tuple[list[float], float]:
+    latencies = []
+    queue = list(reversed(queries))
+    halfway = len(queries) // 2
+
+    async def user():
+        while queue:
+            query = queue.pop()
+            if on_halfway and len(queue) == halfway:
+                on_halfway()
+            start = time.perf_counter()
+            response = await client.get("/search", params={"query": query, "limit": 10})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+async def run(api_url: str, api, args):
+    rng = np.random.default_rng(0)
+    pool = [f"how do I grow a b2b product number {i}" for i in range(args.queries)]
+    ranks = np.minimum(rng.zipf(1.3, size=args.requests), args.queries) - 1
+    # Same queries with varying case and spacing, the cache normalizes them to one key
+    queries = [pool[rank].upper() if i % 3 == 0 else f"  {pool[rank]} " for i, rank in enumerate(ranks)]
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=60, limits=httpx.Limits(max_connections=args.concurrency + 4)) as client:
+        max_size = api.search_cache.max_size
+        api.search_cache.max_size = 0
+        latencies, elapsed = await search_workload(client, queries, args.concurrency)
+        report("search without cache", latencies, elapsed)
+
+        api.search_cache.max_size = max_size
+        latencies, elapsed = await search_workload(client, queries, args.concurrency, on_halfway=api.search_cache.index_version.bump)
+        report("search with cache", latencies, elapsed)
+        stats = (await client.get("/search/cache_stats")).json()
+        print(
+            f"{'':<34} hit rate {stats['hit_rate']:.1%} ({stats['exact_hits']} exact, {stats['semantic_hits']} semantic, "
+            f"{stats['misses']} misses), {stats['invalidations']} invalidations, {stats['latency_saved_seconds']:.1f}s saved"
+        )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--requests", type=int, default=2000)
+    arg_parser.add_argument("--queries", type=int, default=200, help="Distinct queries in the pool")
+    arg_parser.add_argument("--concurrency", type=int, default=16)
+    arg_parser.add_argument("--vectors", type=int, default=5000)
+    arg_parser.add_argument("--embedding-latency", type=float, default=0.05)
+    args = arg_parser.parse_args()
+
+    with FakeServer(create_fake_openai_app(embedding_latency=args.embedding_latency)) as openai_server, tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["OPENAI_BASE_URL"] = f"{openai_server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["YOURCAST_EMBEDDING_BACKEND"] = "openai"
+        os.environ["YOURCAST_VECTOR_STORE"] = "local"
+        os.environ["YOURCAST_LOCAL_VECTOR_STORE_DIR"] = tmp_dir
+        os.environ["YOURCAST_METADATA_STORE"] = os.path.join(tmp_dir, "metadata.sqlite")
+        os.environ["PINECONE_INDEX_NAME"] = "bench"
+        populate_vector_store(tmp_dir, "bench", args.vectors)
+
+        # Imported after the environment is set, the API creates its clients and vector store at import
+        from yourcast.api import api
+        from yourcast.api.search_cache import SearchCache
+        from yourcast.tools.vector_store import IndexVersion
+
+        # Keep the version file of the benchmark out of the assets
+        api.search_cache = SearchCache(IndexVersion("bench", tmp_dir))
+        with FakeServer(api.app) as api_server:
+            asyncio.run(run(api_server.base_url, api, args))
@@ -0,0 +1,92 @@
+"""Cold start of an API worker: import time of yourcast.api.api and the time until the server is live and ready.
+
+Every measurement runs in a fresh interpreter. Liveness is the first answered HTTP request, readiness the first 200 of
+/readyz. The import time is checked against --budget, the script exits with 1 when the median exceeds it, so it can
+guard the import time in CI. Runs against an empty local vector store, no network needed.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_startup --runs 5 --budget 1.5
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import yourcast.api.api; print(time.perf_counter() - start)"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env, capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_cold_start(env: dict, timeout: float = 60) -> tuple[float, float]:
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "yourcast.api.api:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    live = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while ready is None and time.perf_counter() - start < timeout:
+                try:
+                    response = client.get("/readyz")
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                if live is None:
+                    live = time.perf_counter() - start
+                if response.status_code == 200:
+                    ready = time.perf_counter() - start
+                else:
+                    time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+    return live, ready
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--budget", type=float, default=1.5, help="Seconds the median import of the API may take")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": "fake",
+            "YOURCAST_VECTOR_STORE": "local",
+            "YOURCAST_LOCAL_VECTOR_STORE_DIR": tmp_dir,
+            "YOURCAST_METADATA_STORE": os.path.join(tmp_dir, "metadata.sqlite"),
+            "YOURCAST_AUDIO_STORE_DIR": os.path.join(tmp_dir, "audio"),
+            "YOURCAST_AUDIO_JOBS_PATH": os.path.join(tmp_dir, "audio_jobs.sqlite"),
+            "PYTHONPATH": os.getcwd(),
+        }
+        imports = [measure_import(env) for _ in range(args.runs)]
+        starts = [measure_cold_start(env) for _ in range(args.runs)]
+
+    import_seconds = statistics.median(imports)
+    print(f"import yourcast.api.api   median {import_seconds:6.2f}s   max {max(imports):6.2f}s   budget {args.budget:.2f}s")
+    print(f"live                      median {statistics.median(live for live, _ in starts):6.2f}s")
+    readies = [ready for _, ready in starts if ready is not None]
+    print(f"ready                     median {statistics.median(readies):6.2f}s" if readies else "ready                     never")
+    if import_seconds > args.budget:
+        print(f"Import takes {import_seconds:.2f}s, over the budget of {args.budget:.2f}s")
+        sys.exit(1)
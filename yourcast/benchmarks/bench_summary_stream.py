@@ -0,0 +1,97 @@
+"""Time to first byte and total time of /summary_audio versus /summary_audio/stream.
+
+The API runs against the fake OpenAI server, which streams the completion word by word over --chat-latency seconds.
+Text to speech is replaced by a blocking sleep of --tts-overhead seconds plus --tts-seconds-per-char per character,
+roughly what a gTTS call costs. The last measurement repeats the requests of the streaming one, which are then served
+from the audio store.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_summary_stream --requests 3 --chat-latency 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from yourcast.benchmarks.fakes import FakeServer, create_fake_openai_app
+
+
+def make_payload(i: int) -> dict:
+    return {
+        "data_sample": [
+            {"id": 1, "title": "Fake", "host": "Host", "hostId": "1", "image": "", "summary": "", "date": "", "keyTakeaways": [f"A takeaway {i}"] * 10}
+        ],
+        "length": "short",
+        "tone": "casual",
+        "style": "conversational",
+    }
+
+
+def fake_tts(overhead: float, seconds_per_char: float):
+    def synthesize_speech_bytes(text: str) -> bytes:
+        # Blocks the calling thread like gTTS does while it talks to Google
+        time.sleep(overhead + seconds_per_char * len(text))
+        return b"ID3" + text.encode()
+
+    return synthesize_speech_bytes
+
+
+async def measure(client: httpx.AsyncClient, path: str, payload: dict) -> tuple[float, float, int]:
+    start = time.perf_counter()
+    first_byte = None
+    n_bytes = 0
+    async with client.stream("POST", path, json=payload) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            n_bytes += len(chunk)
+    return first_byte, time.perf_counter() - start, n_bytes
+
+
+async def run(api_url: str, args):
+    async with httpx.AsyncClient(base_url=api_url, timeout=120) as client:
+        # New takeaways for every request, so the audio store has nothing to serve, then the same ones again
+        for name, path, offset in [
+            ("/summary_audio", "/summary_audio", 0),
+            ("/summary_audio/stream", "/summary_audio/stream", args.requests),
+            ("repeated, from the store", "/summary_audio/stream", args.requests),
+        ]:
+            results = [await measure(client, path, make_payload(offset + i)) for i in range(args.requests)]
+            print(
+                f"{name:<26} time to first byte {statistics.median(r[0] for r in results):6.2f}s   "
+                f"total {statistics.median(r[1] for r in results):6.2f}s   {results[0][2]} bytes"
+            )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--requests", type=int, default=3, help="Sequential requests per endpoint, the median is reported")
+    arg_parser.add_argument("--chat-latency", type=float, default=4.0, help="Seconds until the whole completion is generated")
+    arg_parser.add_argument("--first-token-latency", type=float, default=0.3)
+    arg_parser.add_argument("--lines", type=int, default=40, help="Lines of the generated dialogue")
+    arg_parser.add_argument("--tts-overhead", type=float, default=0.3)
+    arg_parser.add_argument("--tts-seconds-per-char", type=float, default=0.003)
+    args = arg_parser.parse_args()
+
+    app = create_fake_openai_app(chat_latency=args.chat_latency, first_token_latency=args.first_token_latency, n_items=args.lines)
+    with FakeServer(app) as openai_server, tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["OPENAI_BASE_URL"] = f"{openai_server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["YOURCAST_LLM_CACHE"] = "0"
+        os.environ["YOURCAST_VECTOR_STORE"] = "local"
+        os.environ["YOURCAST_LOCAL_VECTOR_STORE_DIR"] = tmp_dir
+        os.environ["YOURCAST_METADATA_STORE"] = os.path.join(tmp_dir, "metadata.sqlite")
+        os.environ["PINECONE_INDEX_NAME"] = "bench"
+        os.environ["YOURCAST_AUDIO_STORE_DIR"] = os.path.join(tmp_dir, "audio")
+
+        # Imported after the environment is set, the API creates its clients and vector store at import
+        from yourcast.api import api
+
+        api.synthesize_speech_bytes = fake_tts(args.tts_overhead, args.tts_seconds_per_char)
+        with FakeServer(api.app) as api_server:
+            asyncio.run(run(api_server.base_url, args))
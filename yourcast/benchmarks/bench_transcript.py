@@ -0,0 +1,89 @@
+"""Memory per episode, load time and prompt render time of a Transcript compared with a list of Sentence models.
+
+The episode is generated with --sentences caption lines of realistic length. Loading starts from the list of dicts that
+json.load returns for a scrape result, rendering produces the transcript part of the parser prompt.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_transcript --sentences 20000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+WORDS = "the market growth founder investors podcast really think about because people company money product build team year time".split()
+
+
+def fake_sentence_dicts(n_sentences: int) -> list[dict]:
+    rng = random.Random(0)
+    start_time = 0.0
+    sentences = []
+    for _ in range(n_sentences):
+        sentences.append(
+            {"text": " ".join(rng.choices(WORDS, k=rng.randrange(5, 30))) + ".", "start_time": round(start_time, 2), "speaker_id": rng.randrange(3)}
+        )
+        start_time += rng.uniform(1, 12)
+    return sentences
+
+
+def measure(fn, repeats: int) -> tuple[float, object]:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def allocated_mb(fn) -> float:
+    tracemalloc.start()
+    result = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size / 1024 / 1024
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--sentences", type=int, default=20000, help="About 1000 per hour of audio")
+    arg_parser.add_argument("--repeats", type=int, default=5, help="The fastest of this many runs is reported")
+    args = arg_parser.parse_args()
+
+    from yourcast.scraper.crawler import Sentence
+    from yourcast.scraper.transcript import Transcript
+
+    dicts = fake_sentence_dicts(args.sentences)
+
+    def load_sentences() -> list[Sentence]:
+        return [Sentence(**sentence) for sentence in dicts]
+
+    def load_transcript() -> Transcript:
+        return Transcript.from_sentences(dicts)
+
+    sentences_load, sentences = measure(load_sentences, args.repeats)
+    transcript_load, transcript = measure(load_transcript, args.repeats)
+    sentences_mb = allocated_mb(load_sentences)
+    transcript_mb = allocated_mb(lambda: Transcript.from_sentences(dicts).text)
+
+    def render_sentences() -> str:
+        # How the parser rendered the prompt before
+        return "".join(f"{sentence.text} ({sentence.start_time} sec) " for sentence in sentences)
+
+    sentences_render, prompt = measure(render_sentences, args.repeats)
+    transcript_render, transcript_prompt = measure(transcript.to_prompt, args.repeats)
+    assert prompt == transcript_prompt
+    assert transcript.to_sentences() == sentences
+
+    middle = transcript.start_times[len(transcript) // 2]
+    slice_seconds, _ = measure(lambda: transcript.between(middle, middle + 600), args.repeats)
+
+    print(f"{args.sentences} sentences, {len(transcript.text) / 1024 / 1024:.1f} MB of text")
+    print(f"memory    list[Sentence] {sentences_mb:7.1f} MB   Transcript {transcript_mb:7.1f} MB   {sentences_mb / transcript_mb:5.1f}x less")
+    print(
+        f"load      list[Sentence] {sentences_load * 1000:7.1f} ms   Transcript {transcript_load * 1000:7.1f} ms   {sentences_load / transcript_load:5.1f}x faster"
+    )
+    print(
+        f"render    list[Sentence] {sentences_render * 1000:7.1f} ms   Transcript {transcript_render * 1000:7.1f} ms   {sentences_render / transcript_render:5.1f}x faster"
+    )
+    print(f"10 minute time range slice {slice_seconds * 1000:.3f} ms")
@@ -0,0 +1,116 @@
+"""Size on disk and load time of scrape results as JSON files versus the transcript archive.
+
+Fake episodes of --sentences sentences each are written as JSON files the way the scraper stores them, then converted
+to an archive. Loading everything compares json.load plus validation with the archive reader, loading single episodes
+shows what random access into the archive costs, and streaming reports the peak memory of reading every sentence.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_transcript_archive --episodes 200 --sentences 3000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from yourcast.tools.helpers import load_json, store_json
+
+WORDS = "the market growth founder investors podcast really think about because people company money product build team year time".split()
+
+
+def write_fake_scrape_results(directory: str, n_episodes: int, n_sentences: int):
+    rng = random.Random(0)
+    for i in range(n_episodes):
+        start_time = 0.0
+        sentences = []
+        for j in range(n_sentences):
+            sentences.append(
+                {"text": " ".join(rng.choices(WORDS, k=rng.randrange(5, 30))) + ".", "start_time": round(start_time, 2), "speaker_id": rng.randrange(3)}
+            )
+            start_time += rng.uniform(1, 12)
+        store_json(
+            {
+                "episode_name": f"Fake episode {i}",
+                "podcast_name": "Fake podcast",
+                "publication_date": "Mar 29, 2025",
+                "url": f"https://example.com/fake-episode-{i}",
+                "sentences": sentences,
+            },
+            os.path.join(directory, f"fake-episode-{i}.json"),
+        )
+
+
+def directory_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def peak_memory_mb(fn) -> float:
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--episodes", type=int, default=100)
+    arg_parser.add_argument("--sentences", type=int, default=2000, help="Sentences per episode, about 1000 per hour of audio")
+    arg_parser.add_argument("--lookups", type=int, default=50, help="Single episodes loaded at random")
+    args = arg_parser.parse_args()
+
+    from yourcast.scraper.run_scrape import EpisodeScrapeResult
+    from yourcast.scraper.transcript_archive import TranscriptArchive, convert_scrape_results
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_dir = os.path.join(tmp_dir, "scrape_results")
+        os.makedirs(json_dir)
+        write_fake_scrape_results(json_dir, args.episodes, args.sentences)
+        archive_path = os.path.join(tmp_dir, "transcripts.archive")
+        start = time.perf_counter()
+        convert_scrape_results(json_dir, archive_path)
+        print(f"converted {args.episodes} episodes in {time.perf_counter() - start:.1f}s")
+
+        json_mb = directory_size(json_dir) / 1024 / 1024
+        archive_mb = os.path.getsize(archive_path) / 1024 / 1024
+        print(f"size          json {json_mb:8.1f} MB   archive {archive_mb:8.1f} MB   {json_mb / archive_mb:5.1f}x smaller")
+
+        json_paths = [os.path.join(json_dir, name) for name in sorted(os.listdir(json_dir))]
+        start = time.perf_counter()
+        for path in json_paths:
+            EpisodeScrapeResult(**load_json(path))
+        json_seconds = time.perf_counter() - start
+
+        archive = TranscriptArchive(archive_path)
+        start = time.perf_counter()
+        for episode in archive.iter_episodes():
+            pass
+        archive_seconds = time.perf_counter() - start
+        print(f"load all      json {json_seconds:8.2f} s    archive {archive_seconds:8.2f} s    {json_seconds / archive_seconds:5.1f}x faster")
+
+        rng = random.Random(1)
+        picks = [rng.randrange(args.episodes) for _ in range(args.lookups)]
+        json_times, archive_times = [], []
+        for i in picks:
+            start = time.perf_counter()
+            EpisodeScrapeResult(**load_json(json_paths[i]))
+            json_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            archive.load(f"Fake episode {i}")
+            archive_times.append(time.perf_counter() - start)
+        print(f"load one      json {statistics.median(json_times) * 1000:8.1f} ms   archive {statistics.median(archive_times) * 1000:8.1f} ms")
+
+        def stream_json():
+            for path in json_paths:
+                for sentence in EpisodeScrapeResult(**load_json(path)).sentences:
+                    pass
+
+        def stream_archive():
+            for episode_name in archive.episode_names():
+                for sentence in archive.iter_sentences(episode_name):
+                    pass
+
+        print(f"stream peak   json {peak_memory_mb(stream_json):8.1f} MB   archive {peak_memory_mb(stream_archive):8.1f} MB")
+        archive.close()
@@ -0,0 +1,75 @@
+"""Compare query latency and memory footprint of the local vector store with the Pinecone index.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_vector_store --vectors 20000
+The Pinecone path is only measured when PINECONE_API_KEY is set, it queries the index named by PINECONE_INDEX_NAME.
+"""
+
+import argparse
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from yourcast.tools.vector_store import LocalVectorStore, PineconeVectorStore, initialise_pinecone_index
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_queries(store, queries: np.ndarray, top_k: int, filter=None) -> list[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.query(query.tolist(), top_k=top_k, filter=filter, include_metadata=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<34} p50 {statistics.median(latencies):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--vectors", type=int, default=20000)
+    arg_parser.add_argument("--dimension", type=int, default=1536)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--top-k", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.normal(size=(args.queries, args.dimension)).astype(np.float32)
+
+    for dtype in ("float32", "float16"):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = LocalVectorStore(tmp_dir, args.dimension, dtype=dtype)
+            for start in range(0, args.vectors, 1000):
+                batch = rng.normal(size=(min(1000, args.vectors - start), args.dimension)).astype(np.float32)
+                store.upsert(
+                    [
+                        {"id": f"id-{start + i}", "values": vector, "metadata": {"episode_name": f"episode {(start + i) % 500}", "text": "bullet point"}}
+                        for i, vector in enumerate(batch)
+                    ]
+                )
+            # Reopen so the matrix is only mapped, not still resident from the upserts
+            store = LocalVectorStore(tmp_dir, args.dimension, dtype=dtype)
+            rss_before = max_rss_mb()
+            report(f"local {dtype} ({args.vectors} vectors)", measure_queries(store, queries, args.top_k))
+            report(f"local {dtype} filtered by episode", measure_queries(store, queries, args.top_k, filter={"episode_name": "episode 7"}))
+            size_mb = os.path.getsize(store.vectors_path) / 1e6
+            print(f"{'':<34} vectors file {size_mb:.1f} MB, peak RSS grew by {max_rss_mb() - rss_before:.1f} MB while querying")
+
+    if os.getenv("PINECONE_API_KEY"):
+        rss_before = max_rss_mb()
+        store = PineconeVectorStore(initialise_pinecone_index(os.getenv("PINECONE_INDEX_NAME", "yourpod"), args.dimension))
+        report("pinecone", measure_queries(store, queries[: min(args.queries, 50)], args.top_k))
+        print(f"{'':<34} peak RSS grew by {max_rss_mb() - rss_before:.1f} MB")
+    else:
+        print("PINECONE_API_KEY is not set, skipping the Pinecone path")
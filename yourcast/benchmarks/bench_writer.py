@@ -0,0 +1,72 @@
+"""Compare per-episode embedding and upserting with the BatchingWriter against a fake OpenAI server and a fake index.
+
+Run from the repo root: python -m yourcast.benchmarks.bench_writer --episodes 200 --embedding-latency 0.2 --upsert-latency 0.1
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from yourcast.benchmarks.fakes import FakePineconeIndex, FakeServer, create_fake_openai_app
+from yourcast.tools.helpers import load_json
+
+
+def make_episodes(n_episodes: int, n_bullets: int):
+    from yourcast.parser.episode_parser import BulletPoint
+    from yourcast.scraper.run_scrape import EpisodeScrapeResult
+
+    podcast_names = list(load_json("yourcast/assets/podcast_images.json"))
+    episodes = []
+    for i in range(n_episodes):
+        episode = EpisodeScrapeResult(
+            episode_name=f"Fake episode {i}",
+            podcast_name=podcast_names[i % len(podcast_names)],
+            publication_date="Mar 29, 2025",
+            url=f"https://example.com/fake-episode-{i}",
+            sentences=[],
+        )
+        bulletpoints = [BulletPoint(text=f"Takeaway {j} of fake episode {i} ({j * 60} sec)", timestamp=j * 60) for j in range(n_bullets)]
+        episodes.append((episode, bulletpoints))
+    return episodes
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--episodes", type=int, default=200)
+    arg_parser.add_argument("--bullets", type=int, default=15)
+    arg_parser.add_argument("--embedding-latency", type=float, default=0.2)
+    arg_parser.add_argument("--upsert-latency", type=float, default=0.1)
+    arg_parser.add_argument("--embed-batch-size", type=int, default=None, help="Defaults to the input limit of the embeddings endpoint")
+    arg_parser.add_argument("--upsert-batch-size", type=int, default=100)
+    args = arg_parser.parse_args()
+
+    app = create_fake_openai_app(embedding_latency=args.embedding_latency)
+    with FakeServer(app) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["OPENAI_BASE_URL"] = f"{server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["YOURCAST_METADATA_STORE"] = os.path.join(tmp_dir, "metadata.sqlite")
+        # Imported after the environment is set, the module level OpenAI client reads it on first use
+        from yourcast.parser.batching_writer import BatchingWriter
+        from yourcast.parser.episode_parser import EpisodeParser
+        from yourcast.parser.ingestion_ledger import IngestionLedger
+
+        episodes = make_episodes(args.episodes, args.bullets)
+        n_vectors = args.episodes * args.bullets
+
+        parser = EpisodeParser(FakePineconeIndex(upsert_latency=args.upsert_latency), ledger=IngestionLedger(os.path.join(tmp_dir, "per_episode.json")))
+        requests_before = dict(app.state.requests)
+        start = time.perf_counter()
+        for episode, bulletpoints in episodes:
+            parser.upsert_changed_bulletpoints(episode, bulletpoints)
+        elapsed = time.perf_counter() - start
+        print(
+            f"per episode: {n_vectors} vectors in {elapsed:.1f}s, {n_vectors / elapsed:.1f} vectors/s, "
+            f"{app.state.requests['embeddings'] - requests_before['embeddings']} embedding requests"
+        )
+
+        parser = EpisodeParser(FakePineconeIndex(upsert_latency=args.upsert_latency), ledger=IngestionLedger(os.path.join(tmp_dir, "batched.json")))
+        with BatchingWriter(parser, embed_batch_size=args.embed_batch_size, upsert_batch_size=args.upsert_batch_size) as writer:
+            for episode, bulletpoints in episodes:
+                writer.submit(episode, parser.diff_bulletpoints(episode, bulletpoints))
+        print(f"batched:     {writer.stats.summary()}")
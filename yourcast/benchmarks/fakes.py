@@ -0,0 +1,264 @@
+"""Local stand-ins for OpenAI and Pinecone, so pipelines can be exercised offline with a controlled latency.
+
+The OpenAI clients are pointed to the fake server through OPENAI_BASE_URL, Pinecone is replaced by FakePineconeIndex.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import socket
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from yourcast.tools.rate_limit import estimate_tokens
+
+
+def _schema_instance(schema: dict, defs: dict, n_items: int):
+    # Minimal instance of a JSON schema, enough to satisfy the structured output models of this repo
+    if "$ref" in schema:
+        return _schema_instance(defs[schema["$ref"].split("/")[-1]], defs, n_items)
+    schema_type = schema.get("type")
+    if schema_type == "object":
+        return {name: _schema_instance(prop, defs, n_items) for name, prop in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        return [_schema_instance(schema.get("items", {}), defs, n_items) for _ in range(n_items)]
+    if schema_type == "integer":
+        return 42
+    if schema_type == "number":
+        return 4.2
+    if schema_type == "boolean":
+        return True
+    return "Fake takeaway with enough words to look like a real bullet point (42 sec)"
+
+
+def _fake_embedding(text: str, dimension: int) -> np.ndarray:
+    # Deterministic unit vector per text, so identical texts get identical embeddings
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    values = np.random.default_rng(seed).normal(size=dimension).astype(np.float32)
+    return values / np.linalg.norm(values)
+
+
+def _stream_chunks(body: dict, content: str, usage: dict, first_token_latency: float, chat_latency: float):
+    # Server-sent events like the streaming chat completions: one chunk per word, spread over `chat_latency` seconds
+    # of which the first word takes `first_token_latency`
+    tokens = re.findall(r"\S+\s*", content)
+    token_latency = max(chat_latency - first_token_latency, 0.0) / max(len(tokens) - 1, 1)
+
+    def chunk(choices: list, usage: Optional[dict] = None) -> str:
+        data = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": choices,
+            "usage": usage,
+        }
+        return f"data: {json.dumps(data)}\n\n"
+
+    async def events():
+        await asyncio.sleep(first_token_latency)
+        for i, token in enumerate(tokens):
+            if i > 0:
+                await asyncio.sleep(token_latency)
+            yield chunk([{"index": 0, "delta": {"content": token}, "finish_reason": None, "logprobs": None}])
+        yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop", "logprobs": None}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield chunk([], usage)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def create_fake_openai_app(
+    chat_latency: float = 0.5,
+    embedding_latency: float = 0.05,
+    completion_tokens: int = 800,
+    n_items: int = 15,
+    first_token_latency: float = 0.3,
+) -> FastAPI:
+    """
+    :param chat_latency: Seconds until a chat completion is complete, streamed or not
+    :param first_token_latency: Seconds until the first chunk of a streamed chat completion
+    """
+    app = FastAPI()
+    app.state.requests = {"chat": 0, "embeddings": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests["chat"] += 1
+        prompt = " ".join(str(message["content"]) for message in body["messages"])
+        response_format = body.get("response_format") or {}
+
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            content = json.dumps(_schema_instance(schema, schema.get("$defs", {}), n_items))
+        else:
+            # Distinct per prompt like a real completion, the same prompt always gets the same one
+            digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+            content = "".join(f"- Fake takeaway {i} of {digest} (42 sec)\n" for i in range(n_items))
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": completion_tokens,
+            "total_tokens": estimate_tokens(prompt) + completion_tokens,
+        }
+
+        if body.get("stream"):
+            return _stream_chunks(body, content, usage, first_token_latency, chat_latency)
+
+        await asyncio.sleep(chat_latency)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content, "refusal": None}, "finish_reason": "stop", "logprobs": None}],
+            "usage": usage,
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        app.state.requests["embeddings"] += 1
+        await asyncio.sleep(embedding_latency)
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimension = body.get("dimensions") or 1536
+        n_tokens = sum(estimate_tokens(text) for text in inputs)
+        # The OpenAI client asks for base64 by default, which is also much cheaper to serialize than float lists
+        if body.get("encoding_format") == "base64":
+            encode = lambda vector: base64.b64encode(vector.tobytes()).decode()
+        else:
+            encode = lambda vector: vector.tolist()
+        return {
+            "object": "list",
+            "model": body["model"],
+            "data": [{"object": "embedding", "index": i, "embedding": encode(_fake_embedding(text, dimension))} for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": n_tokens, "total_tokens": n_tokens},
+        }
+
+    return app
+
+
+class FakeServer:
+    """Runs an ASGI app with uvicorn in a background thread, use as a context manager."""
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None):
+        self.app = app
+        self.port = port or self._free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+class FakeMatch:
+    def __init__(self, id: str, score: float, metadata: Optional[dict]):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+
+class FakeQueryResponse:
+    def __init__(self, matches: list[FakeMatch]):
+        self.matches = matches
+
+
+class FakeVector:
+    def __init__(self, id: str, values: list[float], metadata: dict):
+        self.id = id
+        self.values = values
+        self.metadata = metadata
+
+
+class FakeFetchResponse:
+    def __init__(self, vectors: dict[str, FakeVector]):
+        self.vectors = vectors
+
+
+class FakePineconeIndex:
+    """In-memory index with the subset of the Pinecone Index API used by this repo."""
+
+    def __init__(self, query_latency: float = 0.0, upsert_latency: float = 0.0):
+        self.query_latency = query_latency
+        self.upsert_latency = upsert_latency
+        self.vectors: dict[str, tuple[list[float], dict]] = {}
+        self._lock = threading.Lock()
+        # Ids and stacked values of all vectors for the query, rebuilt after a write
+        self._matrix: Optional[tuple[list[str], np.ndarray]] = None
+
+    def upsert(self, vectors: list[dict]):
+        time.sleep(self.upsert_latency)
+        with self._lock:
+            for vector in vectors:
+                self.vectors[vector["id"]] = (vector["values"], vector.get("metadata") or {})
+            self._matrix = None
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            for id in ids:
+                self.vectors.pop(id, None)
+            self._matrix = None
+
+    def fetch(self, ids: list[str]):
+        with self._lock:
+            vectors = {id: FakeVector(id, *self.vectors[id]) for id in ids if id in self.vectors}
+        return FakeFetchResponse(vectors)
+
+    def query(self, vector: list[float], top_k: int = 10, filter: Optional[dict] = None, include_metadata: bool = False):
+        time.sleep(self.query_latency)
+        with self._lock:
+            if self._matrix is None:
+                ids = list(self.vectors)
+                values = np.array([self.vectors[id][0] for id in ids], dtype=np.float32) if ids else np.zeros((0, len(vector)), dtype=np.float32)
+                self._matrix = (ids, values)
+            ids, values = self._matrix
+            vectors = self.vectors
+
+        scores = values @ np.asarray(vector, dtype=np.float32)
+        matches = []
+        for idx in np.argsort(-scores):
+            id = ids[idx]
+            entry = vectors.get(id)
+            if entry is None:
+                continue
+            metadata = entry[1]
+            if filter and any(metadata.get(key) != value for key, value in filter.items()):
+                continue
+            matches.append(FakeMatch(id, float(scores[idx]), metadata if include_metadata else None))
+            if len(matches) == top_k:
+                break
+        return FakeQueryResponse(matches)
+
+    # Defined last, the method name shadows the builtin for the annotations of the methods below it
+    def list(self, prefix: Optional[str] = None, limit: int = 100):
+        with self._lock:
+            ids = [id for id in self.vectors if prefix is None or id.startswith(prefix)]
+        for i in range(0, len(ids), limit):
+            yield ids[i : i + limit]
@@ -0,0 +1,340 @@
+"""End-to-end benchmark suite that runs offline and compares its results with a stored baseline.
+
+OpenAI is replaced by the fake server of `fakes.py`, Pinecone by FakePineconeIndex, text to speech by a sleep, and
+transcript pages by the HTML fixtures in `fixtures/`, which follow the markup of the transcript site. Measured are:
+
+- search: /search throughput and p50/p95/p99 latency with --concurrency users, the search cache disabled
+- summary_audio: time until /summary_audio returned the whole MP3, for new takeaways every request
+- ingestion: episodes per minute through EpisodeParser.parse and upsert_changed_bulletpoints, one after the other
+- crawl: time to extract the sentences of a fixture page with the HTML parser of the HTTP fetcher, and with
+  Crawler.crawl when a Chromium for Playwright is installed
+- prompt: input tokens the compact transcript encoding saves on the fixtures, and the error of the reworded bullet
+  points of `fixtures/takeaways.json` mapped back to their sentences, and of the timestamps they cite
+
+Results are written as JSON to --output. With --baseline, every metric is compared with the baseline file and the
+suite exits with 1 when one got worse by more than --tolerance. --save-baseline stores the results as the new baseline.
+
+Run from the repo root: python -m yourcast.benchmarks.suite --baseline bench_baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+from yourcast.benchmarks.bench_summary_stream import fake_tts, make_payload
+from yourcast.benchmarks.fakes import FakePineconeIndex, FakeServer, create_fake_openai_app
+from yourcast.tools.helpers import load_json
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+STAGES = ["search", "summary_audio", "ingestion", "crawl", "prompt"]
+
+
+def metric(value: float, unit: str, better: str) -> dict:
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def fixture_pages() -> dict[str, str]:
+    pages = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, name)) as f:
+                pages[name] = f.read()
+    return pages
+
+
+def fixture_takeaways():
+    """Transcript of `takeaways.json` and its bullet points, reworded like the structuring step does, each with the
+    indices of the sentences it was taken from in `sources`."""
+    from yourcast.scraper.transcript import Transcript
+
+    fixture = load_json(os.path.join(FIXTURES_DIR, "takeaways.json"))
+    return Transcript.from_sentences(fixture["sentences"]), fixture["bullet_points"]
+
+
+def populate_index(index: FakePineconeIndex, n_vectors: int, dimension: int = 1536):
+    episode_names = list(load_json("yourcast/assets/episode_summaries.json"))
+    podcast_images = load_json("yourcast/assets/podcast_images.json")
+    podcast_names = list(podcast_images)
+    rng = np.random.default_rng(0)
+    index.upsert(
+        [
+            {
+                "id": f"bullet-{i}",
+                "values": rng.normal(size=dimension).astype(np.float32),
+                "metadata": {
+                    "text": f"Fake bullet point {i} (42 sec)",
+                    "timestamp": 42,
+                    "episode_name": episode_names[i % len(episode_names)],
+                    "source_podcast_name": podcast_names[i % len(podcast_names)],
+                    "published_date": "Mar 29, 2025",
+                    "listen_link": "",
+                    "image": podcast_images[podcast_names[i % len(podcast_names)]],
+                },
+            }
+            for i in range(n_vectors)
+        ]
+    )
+
+
+async def search_load(client: httpx.AsyncClient, concurrency: int, duration: float) -> list[float]:
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def user(user_id: int):
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            # Distinct queries, so every request pays for its embedding
+            response = await client.get("/search", params={"query": f"growth marketing question {user_id}-{i}", "limit": 10})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    await asyncio.gather(*(user(user_id) for user_id in range(concurrency)))
+    return latencies
+
+
+async def bench_api(api_url: str, args) -> dict:
+    results = {}
+    async with httpx.AsyncClient(base_url=api_url, timeout=120, limits=httpx.Limits(max_connections=args.concurrency + 4)) as client:
+        if "search" in args.stages:
+            # Warms up the connection pools and the index matrix
+            await search_load(client, args.concurrency, 1.0)
+            latencies = await search_load(client, args.concurrency, args.duration)
+            results["search.throughput"] = metric(len(latencies) / args.duration, "req/s", "higher")
+            for name, q in [("p50", 0.5), ("p95", 0.95), ("p99", 0.99)]:
+                results[f"search.{name}"] = metric(percentile(latencies, q) * 1000, "ms", "lower")
+
+        if "summary_audio" in args.stages:
+            durations = []
+            for i in range(args.summary_requests):
+                start = time.perf_counter()
+                response = await client.post("/summary_audio", json=make_payload(i))
+                response.raise_for_status()
+                durations.append(time.perf_counter() - start)
+            results["summary_audio.p50"] = metric(statistics.median(durations), "s", "lower")
+            results["summary_audio.max"] = metric(max(durations), "s", "lower")
+    return results
+
+
+def bench_ingestion(tmp_dir: str, args) -> dict:
+    from yourcast.parser.episode_parser import EpisodeParser
+    from yourcast.parser.ingestion_ledger import IngestionLedger
+    from yourcast.scraper.http_fetcher import parse_transcript_html
+    from yourcast.scraper.run_scrape import EpisodeScrapeResult
+
+    transcripts = list(map(parse_transcript_html, fixture_pages().values()))
+    podcast_names = list(load_json("yourcast/assets/podcast_images.json"))
+    parser = EpisodeParser(FakePineconeIndex(), ledger=IngestionLedger(os.path.join(tmp_dir, "ledger.json")))
+    start = time.perf_counter()
+    for i in range(args.episodes):
+        episode = EpisodeScrapeResult(
+            episode_name=f"Fake episode {i}",
+            podcast_name=podcast_names[i % len(podcast_names)],
+            publication_date="Mar 29, 2025",
+            url=f"https://example.com/fake-episode-{i}",
+            sentences=transcripts[i % len(transcripts)],
+        )
+        bulletpoints = parser.parse(episode)
+        parser.upsert_changed_bulletpoints(episode, bulletpoints.bullet_points)
+    elapsed = time.perf_counter() - start
+    return {"ingestion.episodes_per_minute": metric(args.episodes / elapsed * 60, "episodes/min", "higher")}
+
+
+def bench_crawl(args) -> tuple[dict, list[str]]:
+    from fastapi import FastAPI
+    from fastapi.responses import HTMLResponse
+
+    from yourcast.scraper.http_fetcher import parse_transcript_html
+
+    pages = fixture_pages()
+    results = {}
+    notes = []
+    timings = []
+    for html in pages.values():
+        best = float("inf")
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            parse_transcript_html(html)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+    results["crawl.http_parse_per_page"] = metric(statistics.mean(timings) * 1000, "ms", "lower")
+
+    app = FastAPI()
+
+    @app.get("/pod/{name}")
+    async def page(name: str):
+        return HTMLResponse(pages[name])
+
+    try:
+        from yourcast.scraper.crawler import Crawler
+
+        crawler = Crawler(is_headless=True, block_resources=True, wait_for_article=True)
+    except Exception as e:
+        notes.append(f"Crawler.crawl skipped, no browser: {str(e).splitlines()[0]}")
+        return results, notes
+
+    try:
+        with FakeServer(app) as server:
+            timings = []
+            for name in pages:
+                crawler.crawl(f"{server.base_url}/pod/{name}")
+                best = float("inf")
+                for _ in range(args.repeats):
+                    start = time.perf_counter()
+                    crawler.crawl(f"{server.base_url}/pod/{name}")
+                    best = min(best, time.perf_counter() - start)
+                timings.append(best)
+        results["crawl.browser_per_page"] = metric(statistics.mean(timings) * 1000, "ms", "lower")
+    finally:
+        crawler.browser.close()
+        crawler.playwright.stop()
+    return results, notes
+
+
+def bench_prompt() -> dict:
+    from yourcast.benchmarks.bench_prompt_encoding import timestamp_errors
+    from yourcast.parser.prompt_encoding import PromptEncoding, count_tokens, encode_transcript
+    from yourcast.scraper.http_fetcher import parse_transcript_html
+
+    encoding = PromptEncoding()
+    verbose_tokens, tokens = 0, 0
+    for html in fixture_pages().values():
+        transcript = parse_transcript_html(html)
+        verbose_tokens += count_tokens(transcript.to_prompt())
+        tokens += encode_transcript(transcript, encoding).tokens
+    errors, fallback_errors = timestamp_errors(*fixture_takeaways(), encoding)
+    return {
+        "prompt.tokens_saved": metric((1 - tokens / verbose_tokens) * 100, "%", "higher"),
+        "prompt.timestamp_error_mean": metric(statistics.mean(errors), "s", "lower"),
+        "prompt.timestamp_error_max": metric(max(errors), "s", "lower"),
+        "prompt.fallback_error_mean": metric(statistics.mean(fallback_errors), "s", "lower"),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print every metric next to its baseline value and return the names of the ones that regressed."""
+    if baseline.get("settings") != results["settings"]:
+        print("The baseline was measured with other settings, differences may not mean much")
+    regressions = []
+    print(f"{'metric':<34}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if previous is None or not previous["value"]:
+            print(f"{name:<34}{'':>12}{current['value']:>12.2f}{'new':>10}  {current['unit']}")
+            continue
+        change = current["value"] / previous["value"] - 1
+        worse = change > tolerance if current["better"] == "lower" else change < -tolerance
+        if worse:
+            regressions.append(name)
+        print(f"{name:<34}{previous['value']:>12.2f}{current['value']:>12.2f}{change:>+10.1%}  {current['unit']}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    arg_parser.add_argument("--output", default="bench_results.json")
+    arg_parser.add_argument("--baseline", default=None, help="Results file of an earlier run to compare with")
+    arg_parser.add_argument("--save-baseline", default=None, help="Also write the results to this baseline file")
+    arg_parser.add_argument("--tolerance", type=float, default=0.15, help="Relative change of a metric that counts as a regression")
+    arg_parser.add_argument("--concurrency", type=int, default=16, help="Concurrent /search users")
+    arg_parser.add_argument("--duration", type=float, default=5.0, help="Seconds of /search load")
+    arg_parser.add_argument("--vectors", type=int, default=2000)
+    arg_parser.add_argument("--summary-requests", type=int, default=3)
+    arg_parser.add_argument("--episodes", type=int, default=10)
+    arg_parser.add_argument("--repeats", type=int, default=20, help="Runs per fixture page, the fastest is reported")
+    arg_parser.add_argument("--chat-latency", type=float, default=0.5)
+    arg_parser.add_argument("--embedding-latency", type=float, default=0.02)
+    arg_parser.add_argument("--completion-tokens", type=int, default=800)
+    arg_parser.add_argument("--tts-overhead", type=float, default=0.05)
+    arg_parser.add_argument("--tts-seconds-per-char", type=float, default=0.0005)
+    args = arg_parser.parse_args()
+
+    # Every setting that changes the numbers, a comparison with a baseline of other settings is flagged
+    settings = {name: value for name, value in vars(args).items() if name not in ("stages", "output", "baseline", "save_baseline", "tolerance")}
+    metrics: dict[str, dict] = {}
+    notes: list[str] = []
+
+    app = create_fake_openai_app(
+        chat_latency=args.chat_latency, embedding_latency=args.embedding_latency, completion_tokens=args.completion_tokens, first_token_latency=0.05
+    )
+    with FakeServer(app) as openai_server, tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["OPENAI_BASE_URL"] = f"{openai_server.base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["YOURCAST_LLM_CACHE"] = "0"
+        os.environ["YOURCAST_EMBEDDING_BACKEND"] = "openai"
+        os.environ["YOURCAST_VECTOR_STORE"] = "local"
+        os.environ["YOURCAST_LOCAL_VECTOR_STORE_DIR"] = tmp_dir
+        os.environ["YOURCAST_METADATA_STORE"] = os.path.join(tmp_dir, "metadata.sqlite")
+        os.environ["YOURCAST_AUDIO_STORE_DIR"] = os.path.join(tmp_dir, "audio")
+        os.environ["YOURCAST_AUDIO_JOBS_PATH"] = os.path.join(tmp_dir, "audio_jobs.sqlite")
+        os.environ["YOURCAST_SEARCH_CACHE_SIZE"] = "0"
+        os.environ["PINECONE_INDEX_NAME"] = "bench"
+
+        if "search" in args.stages or "summary_audio" in args.stages:
+            # Imported after the environment is set, the API reads it at import
+            from yourcast.api import api
+            from yourcast.tools.vector_store import PineconeVectorStore
+
+            index = FakePineconeIndex()
+            populate_index(index, args.vectors)
+            api._vector_store = PineconeVectorStore(index)
+            api.synthesize_speech_bytes = fake_tts(args.tts_overhead, args.tts_seconds_per_char)
+            with FakeServer(api.app) as api_server:
+                metrics.update(asyncio.run(bench_api(api_server.base_url, args)))
+        if "ingestion" in args.stages:
+            metrics.update(bench_ingestion(tmp_dir, args))
+        if "crawl" in args.stages:
+            crawl_metrics, crawl_notes = bench_crawl(args)
+            metrics.update(crawl_metrics)
+            notes.extend(crawl_notes)
+        if "prompt" in args.stages:
+            metrics.update(bench_prompt())
+
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": settings,
+        "metrics": metrics,
+        "notes": notes,
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=4)
+
+    for note in notes:
+        print(note)
+    if args.baseline:
+        regressions = compare(results, load_json(args.baseline), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        for name, value in metrics.items():
+            print(f"{name:<34}{value['value']:>12.2f}  {value['unit']}")
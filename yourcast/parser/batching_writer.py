@@ -0,0 +1,266 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
+from yourcast.tools.vector_store import IndexVersion
+
+logger = logging.getLogger(__name__)
+
+
+class WriterStats(BaseModel):
+    episodes: int = 0
+    failed: int = 0
+    vectors_embedded: int = 0
+    vectors_reused: int = 0
+    vectors_upserted: int = 0
+    vectors_deleted: int = 0
+    embed_requests: int = 0
+    upsert_requests: int = 0
+    embed_seconds: float = 0.0
+    upsert_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def vectors_per_second(self) -> float:
+        return self.vectors_upserted / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def embed_vectors_per_second(self) -> float:
+        return self.vectors_embedded / self.embed_seconds if self.embed_seconds > 0 else 0.0
+
+    @property
+    def upsert_vectors_per_second(self) -> float:
+        return self.vectors_upserted / self.upsert_seconds if self.upsert_seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Wrote {self.vectors_upserted} vectors of {self.episodes} episodes ({self.failed} failed) at {self.vectors_per_second:.1f} vectors/s: "
+            f"{self.vectors_embedded} embedded in {self.embed_requests} requests ({self.embed_vectors_per_second:.1f} vectors/s), "
+            f"{self.vectors_reused} reused, {self.upsert_requests} upserts ({self.upsert_vectors_per_second:.1f} vectors/s), "
+            f"{self.vectors_deleted} stale vectors deleted"
+        )
+
+
+class _PendingEpisode:
+    def __init__(self, scraped_episode, diff, n_vectors: int):
+        self.scraped_episode = scraped_episode
+        self.diff = diff
+        self.remaining = n_vectors
+        self.error: Optional[Exception] = None
+
+
+class _PendingBullet:
+    def __init__(self, episode: _PendingEpisode, id: str, bulletpoint, is_moved: bool):
+        self.episode = episode
+        self.id = id
+        self.bulletpoint = bulletpoint
+        self.is_moved = is_moved
+        self.enqueued_at = time.monotonic()
+
+
+class BatchingWriter:
+    """Embeds and upserts the changed bullet points of many episodes in shared batches.
+
+    Bullet points of all submitted episodes are collected in one buffer. An embedding thread takes up to
+    `embed_batch_size` of them as soon as the buffer is full or its oldest entry is `flush_interval` seconds old, and
+    hands the finished vectors to an upsert thread. So batch N is upserted while batch N+1 is being embedded.
+    An episode is recorded in the ingestion ledger, and its stale vectors deleted, once all of its vectors are upserted.
+
+    :param parser: EpisodeParser that embeds, builds the upserts and owns the index and the ledger
+    :param on_episode_done: Called from the upsert thread with the episode, its BulletPointDiff and the error if it failed
+    :param index_version: Bumped after every written episode, so caches of search results know they are outdated
+    """
+
+    def __init__(
+        self,
+        parser,
+        embed_batch_size: Optional[int] = None,
+        upsert_batch_size: int = 100,
+        flush_interval: float = 2.0,
+        on_episode_done: Optional[Callable] = None,
+        index_version: Optional[IndexVersion] = None,
+    ):
+        self.parser = parser
+        self.embed_batch_size = embed_batch_size or parser.embedding_provider.max_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.flush_interval = flush_interval
+        self.on_episode_done = on_episode_done
+        self.index_version = index_version
+        # Submitting blocks when the buffer holds this many bullet points, so slow writes throttle the producers
+        self.max_buffered = 4 * self.embed_batch_size
+        self.stats = WriterStats()
+
+        self._buffer: list[_PendingBullet] = []
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._started_at: Optional[float] = None
+        self._condition = threading.Condition()
+        # One embedded batch can wait while the previous one is upserted
+        self._upsert_queue: queue.Queue = queue.Queue(maxsize=1)
+        self._embed_thread = threading.Thread(target=self._embed_loop, daemon=True)
+        self._upsert_thread = threading.Thread(target=self._upsert_loop, daemon=True)
+        self._embed_thread.start()
+        self._upsert_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, scraped_episode, diff):
+        """Queue the added and moved bullet points of `diff`, returns once they are buffered."""
+        changed = [(id, bp, False) for id, bp in diff.added.items()] + [(id, bp, True) for id, bp in diff.moved.items()]
+        episode = _PendingEpisode(scraped_episode, diff, len(changed))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("BatchingWriter is closed")
+            if self._started_at is None:
+                self._started_at = time.perf_counter()
+            self._in_flight += 1
+            if changed:
+                while len(self._buffer) >= self.max_buffered:
+                    self._condition.wait()
+                self._buffer.extend(_PendingBullet(episode, id, bp, is_moved) for id, bp, is_moved in changed)
+                self._condition.notify_all()
+        if not changed:
+            # Nothing to embed, only stale vectors to delete
+            self._finish(episode)
+
+    def flush(self):
+        """Write everything submitted so far and wait until it is in the index."""
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._in_flight:
+                self._condition.wait()
+            self._flush_requested = False
+
+    def close(self):
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._embed_thread.join()
+        self._upsert_thread.join()
+
+    def _next_batch(self) -> Optional[list[_PendingBullet]]:
+        with self._condition:
+            while True:
+                if self._buffer:
+                    age = time.monotonic() - self._buffer[0].enqueued_at
+                    if self._flush_requested or self._closed or len(self._buffer) >= self.embed_batch_size or age >= self.flush_interval:
+                        batch = self._buffer[: self.embed_batch_size]
+                        del self._buffer[: self.embed_batch_size]
+                        self._condition.notify_all()
+                        return batch
+                    self._condition.wait(timeout=self.flush_interval - age)
+                elif self._closed:
+                    return None
+                else:
+                    self._condition.wait()
+
+    def _embed_loop(self):
+        while (batch := self._next_batch()) is not None:
+            try:
+                self._upsert_queue.put(self._build_upserts(batch))
+            except Exception as e:
+                logger.error(f"Embedding a batch of {len(batch)} bullet points failed: {e}")
+                for bullet in batch:
+                    bullet.episode.error = e
+                self._upsert_queue.put([(bullet.episode, None) for bullet in batch])
+        self._upsert_queue.put(None)
+
+    def _build_upserts(self, batch: list[_PendingBullet]) -> list[tuple[_PendingEpisode, dict]]:
+        # Moved bullet points keep their stored vector, one fetch for the whole batch
+        vectors = {}
+        moved_ids = [bullet.id for bullet in batch if bullet.is_moved]
+        if moved_ids:
+            fetched = self.parser.pinecone_index.fetch(ids=moved_ids).vectors
+            vectors = {id: list(vector.values) for id, vector in fetched.items()}
+            self.stats.vectors_reused += len(vectors)
+
+        to_embed = [bullet for bullet in batch if bullet.id not in vectors]
+        if to_embed:
+            start = time.perf_counter()
+            embeddings = self.parser.embed_bulletpoints([bullet.bulletpoint for bullet in to_embed])
+            self.stats.embed_seconds += time.perf_counter() - start
+            self.stats.embed_requests += 1
+            self.stats.vectors_embedded += len(to_embed)
+            vectors.update({bullet.id: embedding for bullet, embedding in zip(to_embed, embeddings)})
+
+        by_episode: dict[_PendingEpisode, list[_PendingBullet]] = {}
+        for bullet in batch:
+            by_episode.setdefault(bullet.episode, []).append(bullet)
+
+        upserts = []
+        for episode, bullets in by_episode.items():
+            episode_upserts = self.parser.build_upserts(
+                [bullet.bulletpoint for bullet in bullets],
+                [vectors[bullet.id] for bullet in bullets],
+                episode.scraped_episode.podcast_name,
+                episode.scraped_episode.publication_date,
+                episode.scraped_episode.episode_name,
+                ids=[bullet.id for bullet in bullets],
+            )
+            upserts.extend((episode, upsert) for upsert in episode_upserts)
+        return upserts
+
+    def _upsert_loop(self):
+        while (upserts := self._upsert_queue.get()) is not None:
+            for i in range(0, len(upserts), self.upsert_batch_size):
+                chunk = upserts[i : i + self.upsert_batch_size]
+                vectors = [upsert for episode, upsert in chunk if upsert is not None and episode.error is None]
+                try:
+                    if vectors:
+                        start = time.perf_counter()
+                        self.parser.pinecone_index.upsert(vectors)
+                        self.stats.upsert_seconds += time.perf_counter() - start
+                        self.stats.upsert_requests += 1
+                        self.stats.vectors_upserted += len(vectors)
+                except Exception as e:
+                    logger.error(f"Upserting {len(vectors)} vectors failed: {e}")
+                    for episode, _ in chunk:
+                        episode.error = e
+                # Every episode of the chunk is counted down, also after a failure, so none stays in flight forever
+                for episode, _ in chunk:
+                    episode.remaining -= 1
+                    if episode.remaining == 0:
+                        self._finish(episode)
+
+    def _finish(self, episode: _PendingEpisode):
+        # Runs in the upsert thread, or in the submitting thread for episodes without changed bullet points. Whatever
+        # fails, the episode has to leave _in_flight, otherwise flush and close wait forever
+        try:
+            if episode.error is None:
+                try:
+                    # Deleted after the upsert, an interrupted run leaves stale vectors behind at worst, never a gap
+                    if episode.diff.stale_ids:
+                        self.parser.pinecone_index.delete(ids=episode.diff.stale_ids)
+                    self.parser.record_ingested(episode.scraped_episode, episode.diff.ids, episode.diff.timestamps)
+                    if self.index_version and (episode.diff.added or episode.diff.moved or episode.diff.stale_ids):
+                        self.index_version.bump()
+                except Exception as e:
+                    logger.error(f"Finishing episode '{episode.scraped_episode.episode_name}' failed: {e}")
+                    episode.error = e
+
+            if self.on_episode_done:
+                try:
+                    self.on_episode_done(episode.scraped_episode, episode.diff, episode.error)
+                except Exception as e:
+                    logger.error(f"on_episode_done failed for episode '{episode.scraped_episode.episode_name}': {e}")
+        finally:
+            with self._condition:
+                if episode.error is None:
+                    self.stats.episodes += 1
+                    self.stats.vectors_deleted += len(episode.diff.stale_ids)
+                else:
+                    self.stats.failed += 1
+                self._in_flight -= 1
+                self.stats.elapsed_seconds = time.perf_counter() - self._started_at
+                self._condition.notify_all()
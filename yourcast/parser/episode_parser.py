@@ -1,39 +1,46 @@
+import argparse
+import bisect
 import json
 import logging
 import os
 import re
-import time
-from typing import List
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
 
-import openai
-from pinecone import Pinecone, ServerlessSpec
 from pydantic import BaseModel
 from tqdm import tqdm
 
-from yourcast.scraper.crawler import Sentence
+from yourcast.parser.batching_writer import BatchingWriter
+from yourcast.parser.ingestion_ledger import IngestionLedger, transcript_hash
+from yourcast.parser.models import BulletPoint, BulletPointMetadata, BulletPoints
+from yourcast.parser.prompt_encoding import COMPACT_TRANSCRIPT_INSTRUCTIONS, PromptEncoding, encode_transcript, locate_sentence
 from yourcast.scraper.run_scrape import EpisodeScrapeResult
-from yourcast.tools.helpers import load_json, make_id, store_json
-from yourcast.tools.llm_helpers import OpenaiModelNames, get_llm_completion, get_llm_structured_response
+from yourcast.scraper.transcript import Transcript
+from yourcast.tools.embeddings import EmbeddingProvider, get_embedding_provider
+from yourcast.tools.helpers import load_json, make_id
+from yourcast.tools.llm_helpers import LLMResponse, OpenaiModelNames, get_llm_completion, get_llm_structured_response
+from yourcast.tools.metadata_store import MetadataStore, get_metadata_store
+from yourcast.tools.metrics import metrics
+from yourcast.tools.rate_limit import estimate_tokens
+from yourcast.tools.vector_store import IndexVersion, get_vector_store
 
 
-class BulletPoint(BaseModel):
-    text: str
-    timestamp: int
+class BulletPointDiff(BaseModel):
+    """Bullet points of a new parse compared with the ones recorded for the previous ingestion of the episode."""
 
+    # All bullet points of the new parse, in order
+    ids: list[str]
+    timestamps: list[int]
+    # New texts, they need to be embedded
+    added: dict[str, BulletPoint] = {}
+    # Same text at another timestamp, the stored vector is reused with new metadata
+    moved: dict[str, BulletPoint] = {}
+    stale_ids: list[str] = []
 
-class BulletPointMetadata(BaseModel):
-    text: str
-    timestamp: int
-    episode_name: str
-    source_podcast_name: str
-    published_date: str
-    listen_link: str
-    image: str
-
-
-class BulletPoints(BaseModel):
-    episode_summary: str
-    bullet_points: List[BulletPoint]
+    @property
+    def n_unchanged(self) -> int:
+        return len(self.ids) - len(self.added) - len(self.moved)
 
 
 MODEL = OpenaiModelNames.gpt4o_mini
@@ -72,69 +79,204 @@ Your task is to transform bullet points with supporting details into clear, comp
 Format each output as a message with its timestamp, removing any bullet points or indentation while preserving all key information in a concise, engaging format. Return a complete list of all processed bullet points.
 """
 
-episode_summaries = load_json("yourcast/assets/episode_summaries.json") if os.path.exists("yourcast/assets/episode_summaries.json") else {}
-podcast_images = load_json("yourcast/assets/podcast_images.json")
+merge_instructions = """
+The bullet points below were extracted independently from consecutive parts of the same podcast, so the same topic can appear more than once.
+Merge bullet points that cover the same topic into one and keep the timestamp of its earliest occurrence. Keep the bullet points in chronological order.
+"""
 
 
 class EpisodeParser:
-    def __init__(self, pinecone_index=None):
+    def __init__(
+        self,
+        pinecone_index=None,
+        metadata_store: Optional[MetadataStore] = None,
+        chunk_tokens: Optional[int] = None,
+        chunk_workers: int = 4,
+        embedding_provider: Optional[EmbeddingProvider] = None,
+        ledger: Optional[IngestionLedger] = None,
+        incremental: bool = False,
+        prompt_encoding: Optional[PromptEncoding] = None,
+    ):
+        """
+        :param metadata_store: Receives the episode summaries and provides the podcast images, defaults to the shared store
+        :param chunk_tokens: Enables the chunked mode: transcripts longer than this token budget are split into windows
+            whose takeaways are extracted in parallel and merged in the structuring step
+        :param chunk_workers: Number of chunks summarized concurrently
+        :param embedding_provider: Embeds the bullet points, defaults to the provider selected by YOURCAST_EMBEDDING_BACKEND
+        :param ledger: Ingestion ledger of `pinecone_index`, decides which episodes are already upserted
+        :param incremental: Re-parse already ingested episodes too, e.g. after a prompt change. Only bullet points whose
+            text changed are embedded and upserted, the vectors of bullet points that are gone are deleted
+        :param prompt_encoding: Render transcripts in the compact format instead of every sentence followed by its start
+            time. Bullet point timestamps are mapped back to the sentence they match after the timestamp they cite
+        """
         self.pinecone_index = pinecone_index
+        self.ledger = ledger
+        self.incremental = incremental
+        self.embedding_provider = embedding_provider or get_embedding_provider()
+        self.chunk_tokens = chunk_tokens
+        self.chunk_workers = chunk_workers
+        self.metadata_store = metadata_store or get_metadata_store()
+        self.prompt_encoding = prompt_encoding
 
     def episode_already_upserted(self, source_podcast_name: str, published_date: str, episode_name: str) -> bool:
-        """Check if an episode has already been upserted to Pinecone by metadata."""
-        if not self.pinecone_index:
-            raise ValueError("Pinecone index not initialized.")
-        # Query Pinecone for a vector with matching metadata
-        # We'll use a metadata filter for all three fields
-        query_filter = {
-            "source_podcast_name": source_podcast_name,
-            "published_date": published_date,
-            "episode_name": episode_name,
-        }
-        # Query with a dummy vector (all zeros) and top_k=1, using filter
-        # (Assumes at least one vector per episode)
-        try:
-            response = self.pinecone_index.query(
-                vector=[0.0] * 1536,
-                top_k=1,
-                filter=query_filter,
-                include_metadata=False,
-            )
-            return len(response.matches) > 0
-        except Exception as e:
-            print(f"Error querying Pinecone: {e}")
-            return False
+        """Check the ingestion ledger for the episode, no request to the index is made."""
+        if not self.ledger:
+            raise ValueError("Ingestion ledger not initialized.")
+        return self.ledger.get(source_podcast_name, published_date, episode_name) is not None
+
+    def needs_ingestion(self, scraped_episode: EpisodeScrapeResult) -> bool:
+        """New episodes, episodes whose transcript changed since they were ingested, and all episodes in incremental mode."""
+        if not self.ledger:
+            raise ValueError("Ingestion ledger not initialized.")
+        if self.incremental:
+            return True
+        entry = self.ledger.get(scraped_episode.podcast_name, scraped_episode.publication_date, scraped_episode.episode_name)
+        # Entries rebuilt from the index have no transcript hash, they count as unchanged
+        return entry is None or (entry.content_hash is not None and entry.content_hash != transcript_hash(scraped_episode))
 
     def parse(self, scraped_episode_file: EpisodeScrapeResult):
-        transcript = self.concatenate_sentences(scraped_episode_file.sentences)
-        free_form_user_prompt = f"""
-        Here is the podcast transcript. Please extract the key takeaways following the format specified in the system prompt.
+        free_form_response = self.extract_takeaways(scraped_episode_file)
+        parsed_bulletpoints, _ = self.structure_takeaways(scraped_episode_file, free_form_response)
+        return parsed_bulletpoints
 
+    def extract_takeaways(self, scraped_episode_file: EpisodeScrapeResult) -> LLMResponse:
+        """First parsing stage: free form takeaways from the full transcript, or from each of its chunks in parallel."""
+        with metrics.span("extract_takeaways"):
+            return self._extract_takeaways(scraped_episode_file)
+
+    def _extract_takeaways(self, scraped_episode_file: EpisodeScrapeResult) -> LLMResponse:
+        chunks = self.split_into_chunks(scraped_episode_file.sentences)
+        if len(chunks) == 1:
+            return self.extract_chunk_takeaways(chunks[0])
+
+        with ThreadPoolExecutor(max_workers=self.chunk_workers) as executor:
+            responses = list(executor.map(lambda idx: self.extract_chunk_takeaways(chunks[idx], idx, len(chunks)), range(len(chunks))))
+        return self.merge_chunk_takeaways(chunks, responses)
+
+    def extract_chunk_takeaways(self, sentences: Transcript, chunk_idx: int = 0, n_chunks: int = 1) -> LLMResponse:
+        """One LLM request for the takeaways of one chunk, callers with their own rate limiting schedule the chunks themselves."""
+        transcript = self.concatenate_sentences(sentences)
+        part = "" if n_chunks == 1 else f"part {chunk_idx + 1} of {n_chunks} of the "
+        instructions = "" if self.prompt_encoding is None else COMPACT_TRANSCRIPT_INSTRUCTIONS
+        free_form_user_prompt = f"""
+        Here is {part}the podcast transcript. Please extract the key takeaways following the format specified in the system prompt.
+        {instructions}
         Transcript:
         {transcript}
 
         Please provide a comprehensive summary with bullet points that capture the most important insights and information from the transcript.
         """
 
-        free_form_response = get_llm_completion(raw_parser_system_prompt, free_form_user_prompt, MODEL)
+        return get_llm_completion(raw_parser_system_prompt, free_form_user_prompt, MODEL)
 
+    @staticmethod
+    def merge_chunk_takeaways(chunks: list[Transcript], responses: list[LLMResponse]) -> LLMResponse:
+        """Join the takeaways of all chunks into the free form response the structuring step merges."""
+        if len(chunks) == 1:
+            return responses[0]
+        content = "\n\n".join(
+            f"Takeaways from part {idx + 1} of {len(chunks)} ({chunk[0].start_time} sec - {chunk[-1].start_time} sec):\n{response.content}"
+            for idx, (chunk, response) in enumerate(zip(chunks, responses))
+        )
+        return LLMResponse(
+            content=content,
+            llm_costs=sum(response.llm_costs for response in responses),
+            prompt_tokens=sum(response.prompt_tokens for response in responses),
+            completion_tokens=sum(response.completion_tokens for response in responses),
+        )
+
+    def structure_takeaways(self, scraped_episode_file: EpisodeScrapeResult, free_form_response: LLMResponse) -> tuple[BulletPoints, LLMResponse]:
+        """Second parsing stage: turn the free form takeaways into BulletPoints and store the episode summary."""
+        is_chunked = len(self.split_into_chunks(scraped_episode_file.sentences)) > 1
         structured_user_prompt = f"""
         Here is the free form summary of the episode.
         {free_form_response.content}
 
         Please transform the bullet points into a concise, engaging message and provide a summary of the episode in the episode_summary field
         """
-        structured_response = get_llm_structured_response(structured_parser_system_prompt, structured_user_prompt, BulletPoints, MODEL)
+        if is_chunked:
+            structured_user_prompt = merge_instructions + structured_user_prompt
+        with metrics.span("structure_takeaways"):
+            structured_response = get_llm_structured_response(structured_parser_system_prompt, structured_user_prompt, BulletPoints, MODEL)
         parsed_bulletpoints = BulletPoints(**json.loads(structured_response.content))
-        episode_summaries[scraped_episode_file.episode_name] = parsed_bulletpoints.episode_summary
-        store_json(episode_summaries, "yourcast/assets/episode_summaries.json")
-        return parsed_bulletpoints
-
-    def concatenate_sentences(self, sentences: list[Sentence]):
-        full_episode_text = ""
-        for sentence in sentences:
-            full_episode_text += sentence.text + f" ({sentence.start_time} sec) "
-        return full_episode_text
+        if self.prompt_encoding is not None:
+            # The prompts only contained some timestamps, find the sentence every bullet was taken from
+            self.locate_timestamps(parsed_bulletpoints.bullet_points, scraped_episode_file.sentences)
+        elif is_chunked:
+            # The merge step sees chunk summaries only, make sure every bullet still points to a sentence of the episode
+            self.snap_timestamps(parsed_bulletpoints.bullet_points, scraped_episode_file.sentences.start_times)
+        # One upsert of the episode row, readers like the API see the new summary right away
+        with metrics.span("metadata_store"):
+            self.metadata_store.put_episode(
+                scraped_episode_file.episode_name,
+                podcast_name=scraped_episode_file.podcast_name,
+                published_date=scraped_episode_file.publication_date,
+                url=scraped_episode_file.url,
+                summary=parsed_bulletpoints.episode_summary,
+            )
+        return parsed_bulletpoints, structured_response
+
+    def concatenate_sentences(self, sentences: Transcript) -> str:
+        if self.prompt_encoding is None:
+            return sentences.to_prompt()
+        encoded = encode_transcript(sentences, self.prompt_encoding)
+        metrics.inc("yourcast_transcript_prompt_tokens_total", encoded.verbose_tokens, format="verbose")
+        metrics.inc("yourcast_transcript_prompt_tokens_total", encoded.tokens, format="compact")
+        return encoded.text
+
+    def sentence_anchors(self, sentences: Transcript) -> list[int]:
+        """The timestamp of the compact prompts before every sentence, every chunk starts with a timestamp of its own."""
+        anchors = []
+        for chunk in self.split_into_chunks(sentences):
+            anchors.extend(encode_transcript(chunk, self.prompt_encoding, with_token_counts=False).sentence_anchors)
+        return anchors
+
+    def locate_timestamps(self, bulletpoints: list[BulletPoint], sentences: Transcript):
+        """Move every bullet point timestamp from the prompt timestamp it cites to the start of the sentence it matches."""
+        texts = sentences.texts()
+        sentence_anchors = self.sentence_anchors(sentences)
+        for bp in bulletpoints:
+            idx = locate_sentence(texts, sentence_anchors, bp.text, bp.timestamp)
+            if idx is not None:
+                bp.timestamp = int(sentences.start_times[idx])
+
+    def split_into_chunks(self, sentences: Transcript) -> list[Transcript]:
+        """Split the transcript into windows of at most `chunk_tokens`, cutting at speaker changes where possible."""
+        if not self.chunk_tokens or not sentences:
+            return [sentences]
+
+        # " (NN.N sec) " adds about 3 tokens to every sentence, the compact format about 1 on average
+        overhead = 3 if self.prompt_encoding is None else 1
+        sentence_tokens = [estimate_tokens(text) + overhead for text in sentences.texts()]
+        speaker_ids = sentences.speaker_ids
+        chunks = []
+        chunk_start = 0
+        chunk_tokens = 0
+        last_speaker_change = 0  # index of the latest sentence that starts a new speaker turn
+        for idx in range(len(sentences)):
+            # The sentences carried over from a cut can leave too little room for this one, then cut again
+            while idx > chunk_start and chunk_tokens + sentence_tokens[idx] > self.chunk_tokens:
+                # Prefer to cut at a speaker change, unless that would leave a very small chunk behind
+                cut = last_speaker_change if last_speaker_change - chunk_start > (idx - chunk_start) // 2 else idx
+                chunks.append(sentences[chunk_start:cut])
+                chunk_tokens -= sum(sentence_tokens[chunk_start:cut])
+                chunk_start = cut
+            if idx and speaker_ids[idx] != speaker_ids[idx - 1]:
+                last_speaker_change = idx
+            chunk_tokens += sentence_tokens[idx]
+        chunks.append(sentences[chunk_start:])
+        return chunks
+
+    @staticmethod
+    def snap_timestamps(bulletpoints: list[BulletPoint], start_times: Sequence[float]):
+        """Move every bullet point timestamp to the nearest of `start_times`, e.g. the sentence starts of the transcript."""
+        start_times = sorted(start_times)
+        if not start_times:
+            return
+        for bp in bulletpoints:
+            idx = bisect.bisect_left(start_times, bp.timestamp)
+            candidates = start_times[max(idx - 1, 0) : idx + 1]
+            bp.timestamp = int(min(candidates, key=lambda start_time: abs(start_time - bp.timestamp)))
 
     def upsert_bulletpoints_batch(
         self,
@@ -144,94 +286,186 @@ class EpisodeParser:
         episode_name: str,
         listen_link: str = "",
         batch_size: int = 32,
-    ):
-        """Batch embed and upsert bullet points to Pinecone with metadata."""
+    ) -> list[str]:
+        """Batch embed and upsert bullet points to Pinecone with metadata, returns the upserted ids."""
         if not self.pinecone_index:
             raise ValueError("Pinecone index not initialized.")
 
+        ids = self.bulletpoint_ids(bulletpoints, source_podcast_name, published_date, episode_name)
         for i in range(0, len(bulletpoints), batch_size):
             batch = bulletpoints[i : i + batch_size]
-            # Remove " (xxx sec)" from bullet point text using regex
-            texts = [re.sub(r"\s*\(\d+\s*sec\)", "", bp.text) for bp in batch]
-            # Batch embed
-            response = openai.embeddings.create(input=texts, model="text-embedding-3-small")
-            embeddings = [d.embedding for d in response.data]
-            # Prepare upsert dicts
-            upserts = []
-            for idx, (bp, emb) in enumerate(zip(batch, embeddings)):
-                upserts.append(
-                    {
-                        "id": make_id(bp.text, i + idx),
-                        "values": emb,
-                        "metadata": BulletPointMetadata(
-                            text=bp.text,
-                            timestamp=bp.timestamp,
-                            episode_name=episode_name,
-                            source_podcast_name=source_podcast_name,
-                            published_date=published_date,
-                            listen_link=listen_link,
-                            image=podcast_images[source_podcast_name],
-                        ).model_dump(),
-                    }
-                )
+            embeddings = self.embed_bulletpoints(batch)
+            upserts = self.build_upserts(batch, embeddings, source_podcast_name, published_date, episode_name, listen_link, ids=ids[i : i + batch_size])
             # Upsert to Pinecone
             self.pinecone_index.upsert(upserts)
         print("Upsert complete.")
+        return ids
 
+    def upsert_changed_bulletpoints(
+        self,
+        scraped_episode: EpisodeScrapeResult,
+        bulletpoints: list[BulletPoint],
+        listen_link: str = "",
+        batch_size: int = 32,
+    ) -> BulletPointDiff:
+        """Upsert the bullet points that differ from the previous ingestion of the episode and delete the stale ones."""
+        diff = self.diff_bulletpoints(scraped_episode, bulletpoints)
+        upserts = self.build_diff_upserts(scraped_episode, diff, listen_link, batch_size)
+        self.apply_diff(scraped_episode, diff, upserts, batch_size)
+        return diff
+
+    def diff_bulletpoints(self, scraped_episode: EpisodeScrapeResult, bulletpoints: list[BulletPoint]) -> BulletPointDiff:
+        ids = self.bulletpoint_ids(bulletpoints, scraped_episode.podcast_name, scraped_episode.publication_date, scraped_episode.episode_name)
+        entry = self.ledger.get(scraped_episode.podcast_name, scraped_episode.publication_date, scraped_episode.episode_name) if self.ledger else None
+        previous_ids = entry.bullet_ids if entry else []
+        # Unknown timestamps (older ledgers) count as moved, which costs a fetch but no embedding
+        previous_timestamps = dict(zip(entry.bullet_ids, entry.bullet_timestamps)) if entry else {}
+
+        diff = BulletPointDiff(ids=ids, timestamps=[bp.timestamp for bp in bulletpoints])
+        previous_id_set = set(previous_ids)
+        for id, bp in zip(ids, bulletpoints):
+            if id not in previous_id_set:
+                diff.added[id] = bp
+            elif previous_timestamps.get(id) != bp.timestamp:
+                diff.moved[id] = bp
+        current_ids = set(ids)
+        diff.stale_ids = [id for id in previous_ids if id not in current_ids]
+        return diff
+
+    def build_diff_upserts(self, scraped_episode: EpisodeScrapeResult, diff: BulletPointDiff, listen_link: str = "", batch_size: int = 32) -> list[dict]:
+        """Embed the added bullet points, moved bullet points keep their stored vector and only get new metadata."""
+        vectors = {}
+        if diff.moved:
+            fetched = self.pinecone_index.fetch(ids=list(diff.moved)).vectors
+            vectors = {id: list(vector.values) for id, vector in fetched.items()}
+
+        # Moved bullet points missing from the index are embedded again
+        to_embed = list(diff.added.items()) + [(id, bp) for id, bp in diff.moved.items() if id not in vectors]
+        for i in range(0, len(to_embed), batch_size):
+            batch = to_embed[i : i + batch_size]
+            embeddings = self.embed_bulletpoints([bp for _, bp in batch])
+            vectors.update({id: embedding for (id, _), embedding in zip(batch, embeddings)})
+
+        changed = {**diff.added, **diff.moved}
+        return self.build_upserts(
+            list(changed.values()),
+            [vectors[id] for id in changed],
+            scraped_episode.podcast_name,
+            scraped_episode.publication_date,
+            scraped_episode.episode_name,
+            listen_link,
+            ids=list(changed),
+        )
 
-def initialise_pinecone_index(index_name):
-    # configure client
-    pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-    cloud = os.environ.get("PINECONE_CLOUD") or "aws"
-    region = os.environ.get("PINECONE_REGION") or "us-east-1"
-
-    spec = ServerlessSpec(cloud=cloud, region=region)
-
-    # check if index already exists (it shouldn't if this is first time)
-    if index_name not in pc.list_indexes().names():
-        # if does not exist, create index
-        pc.create_index(index_name, dimension=1536, metric="cosine", spec=spec)
-        # wait for index to be initialized
-        while not pc.describe_index(index_name).status["ready"]:
-            time.sleep(1)
-
-    # connect to index
-    index = pc.Index(index_name)
-    return index
+    def apply_diff(self, scraped_episode: EpisodeScrapeResult, diff: BulletPointDiff, upserts: list[dict], batch_size: int = 32):
+        if not self.pinecone_index:
+            raise ValueError("Pinecone index not initialized.")
+        for i in range(0, len(upserts), batch_size):
+            self.pinecone_index.upsert(upserts[i : i + batch_size])
+        # Deleted after the upsert, an interrupted run leaves stale vectors behind at worst, never a gap
+        if diff.stale_ids:
+            self.pinecone_index.delete(ids=diff.stale_ids)
+        self.record_ingested(scraped_episode, diff.ids, diff.timestamps)
+
+    def record_ingested(self, scraped_episode: EpisodeScrapeResult, bullet_ids: list[str], bullet_timestamps: list[int]):
+        if self.ledger:
+            self.ledger.record(scraped_episode, bullet_ids, bullet_timestamps, self.embedding_provider.model_name)
+
+    @staticmethod
+    def bulletpoint_ids(bulletpoints: list[BulletPoint], source_podcast_name: str, published_date: str, episode_name: str) -> list[str]:
+        """Content based ids: a bullet point text of an episode keeps its id, no matter where it moves in the list."""
+        episode_key = json.dumps([source_podcast_name, published_date, episode_name])
+        occurrences = Counter()
+        ids = []
+        for bp in bulletpoints:
+            # Repeated texts within one episode are told apart by their occurrence
+            ids.append(make_id(f"{episode_key}_{bp.text}", occurrences[bp.text]))
+            occurrences[bp.text] += 1
+        return ids
+
+    def embed_bulletpoints(self, bulletpoints: list[BulletPoint]) -> list[list[float]]:
+        # Remove " (xxx sec)" from bullet point text using regex
+        texts = [re.sub(r"\s*\(\d+\s*sec\)", "", bp.text) for bp in bulletpoints]
+        # Batch embed
+        with metrics.span("embed_bulletpoints", backend=self.embedding_provider.model_name):
+            return self.embedding_provider.embed(texts)
+
+    def build_upserts(
+        self,
+        bulletpoints: list[BulletPoint],
+        embeddings: list[list[float]],
+        source_podcast_name: str,
+        published_date: str,
+        episode_name: str,
+        listen_link: str = "",
+        ids: Optional[list[str]] = None,
+    ) -> list[dict]:
+        """Prepare upsert dicts, `ids` default to the ids of `bulletpoints` as all bullet points of the episode."""
+        if ids is None:
+            ids = self.bulletpoint_ids(bulletpoints, source_podcast_name, published_date, episode_name)
+        image = self.metadata_store.get_podcast_image(source_podcast_name)
+        if image is None:
+            raise KeyError(f"No image for podcast {source_podcast_name}")
+        upserts = []
+        for id, bp, emb in zip(ids, bulletpoints, embeddings):
+            upserts.append(
+                {
+                    "id": id,
+                    "values": emb,
+                    "metadata": BulletPointMetadata(
+                        text=bp.text,
+                        timestamp=bp.timestamp,
+                        episode_name=episode_name,
+                        source_podcast_name=source_podcast_name,
+                        published_date=published_date,
+                        listen_link=listen_link,
+                        image=image,
+                    ).model_dump(),
+                }
+            )
+        return upserts
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    metrics.report_at_exit("ingestion")
+
+    arg_parser = argparse.ArgumentParser(description="Parse, embed and upsert all scraped episodes one after the other")
+    arg_parser.add_argument("--incremental", action="store_true", help="Re-parse ingested episodes and only upsert the changed bullet points")
+    arg_parser.add_argument("--compact-prompt", action="store_true", help="Render transcripts with timestamps only at speaker changes and intervals")
+    arg_parser.add_argument("--timestamp-interval", type=float, default=30.0, help="Seconds between timestamps within a speaker turn of the compact prompt")
+    arg_parser.add_argument("--drop-fillers", action="store_true", help="Drop filler words like um and uh from the compact prompt")
+    args = arg_parser.parse_args()
+
+    # Files starting with an underscore, like the scrape manifest, are not episodes
+    scraped_episodes_files = [name for name in os.listdir("yourcast/assets/scrape_results/") if not name.startswith("_")]
+    embedding_provider = get_embedding_provider()
+    index_name = os.environ.get("PINECONE_INDEX_NAME", embedding_provider.default_index_name)
+    index = get_vector_store(index_name, embedding_provider.dimension)
+    ledger = IngestionLedger.for_index(index_name, index, embedding_provider.model_name)
+
+    prompt_encoding = PromptEncoding(timestamp_interval=args.timestamp_interval, drop_fillers=args.drop_fillers) if args.compact_prompt else None
+    parser = EpisodeParser(index, ledger=ledger, incremental=args.incremental, prompt_encoding=prompt_encoding)
+    parsed_count = 0
+
+    # Bullet points are embedded and upserted in the background while the next episodes are parsed
+    with BatchingWriter(parser, index_version=IndexVersion(index_name)) as writer:
+        for scraped_episode_file in tqdm(scraped_episodes_files, desc="Upserting episodes", unit="episode"):
+            scraped_episode = EpisodeScrapeResult(**load_json(f"yourcast/assets/scrape_results/{scraped_episode_file}"))
+            # Check if already upserted
+            if not parser.needs_ingestion(scraped_episode):
+                logging.info(
+                    f"Episode '{scraped_episode.episode_name}' from '{scraped_episode.podcast_name}' ({scraped_episode.publication_date}) already upserted. Skipping."
+                )
+                continue
 
-    scraped_episodes_files = os.listdir("yourcast/assets/scrape_results/")
-    index_name = "yourpod"
-    index = initialise_pinecone_index(index_name)
-
-    upserted_count = 0
-
-    for scraped_episode_file in tqdm(scraped_episodes_files, desc="Upserting episodes", unit="episode"):
-        scraped_episode = EpisodeScrapeResult(**load_json(f"yourcast/assets/scrape_results/{scraped_episode_file}"))
-        parser = EpisodeParser(index)
-        # Check if already upserted
-        if parser.episode_already_upserted(
-            scraped_episode.podcast_name,
-            scraped_episode.publication_date,
-            scraped_episode.episode_name,
-        ):
+            parsed_bulletpoints = parser.parse(scraped_episode)
+            diff = parser.diff_bulletpoints(scraped_episode, parsed_bulletpoints.bullet_points)
+            writer.submit(scraped_episode, diff)
+            parsed_count += 1
             logging.info(
-                f"Episode '{scraped_episode.episode_name}' from '{scraped_episode.podcast_name}' ({scraped_episode.publication_date}) already upserted. Skipping."
+                f"Parsed episode '{scraped_episode.episode_name}' from '{scraped_episode.podcast_name}' ({scraped_episode.publication_date}): "
+                f"{len(diff.added)} added, {len(diff.moved)} moved, {len(diff.stale_ids)} deleted, {diff.n_unchanged} unchanged. "
+                f"Progress: {parsed_count}/{len(scraped_episodes_files)}"
             )
-            continue
-
-        parsed_bulletpoints = parser.parse(scraped_episode)
-        parser.upsert_bulletpoints_batch(
-            parsed_bulletpoints.bullet_points,
-            scraped_episode.podcast_name,
-            scraped_episode.publication_date,
-            scraped_episode.episode_name,
-        )
-        upserted_count += 1
-        logging.info(
-            f"Parsed and upserted episode '{scraped_episode.episode_name}' from '{scraped_episode.podcast_name}' ({scraped_episode.publication_date}) to Pinecone. "
-            f"Progress: {upserted_count}/{len(scraped_episodes_files)}"
-        )
+    logging.info(writer.stats.summary())
@@ -0,0 +1,306 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from pydantic import BaseModel
+
+from yourcast.parser.batching_writer import BatchingWriter
+from yourcast.parser.episode_parser import BulletPointDiff, BulletPoints, EpisodeParser, raw_parser_system_prompt, structured_parser_system_prompt
+from yourcast.parser.ingestion_ledger import IngestionLedger
+from yourcast.parser.prompt_encoding import PromptEncoding
+from yourcast.scraper.run_scrape import EpisodeScrapeResult
+from yourcast.scraper.transcript import Transcript
+from yourcast.scraper.transcript_archive import TranscriptArchive
+from yourcast.tools.embeddings import get_embedding_provider
+from yourcast.tools.helpers import load_json
+from yourcast.tools.llm_helpers import LLMResponse
+from yourcast.tools.metrics import metrics
+from yourcast.tools.rate_limit import RateLimitScheduler, estimate_tokens
+from yourcast.tools.vector_store import IndexVersion, get_vector_store
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_RESULTS_DIR = "yourcast/assets/scrape_results"
+
+
+class IngestionStats(BaseModel):
+    episodes: int = 0
+    skipped: int = 0
+    failed: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_costs: float = 0.0
+    llm_cache_hits: int = 0
+    cost_saved: float = 0.0
+    vectors: int = 0
+    vectors_deleted: int = 0
+    vectors_unchanged: int = 0
+    vectors_per_second: float = 0.0
+    embed_requests: int = 0
+    upsert_requests: int = 0
+    rate_limit_wait_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def episodes_per_hour(self) -> float:
+        return self.episodes / self.elapsed_seconds * 3600 if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def summary(self) -> str:
+        return (
+            f"Ingested {self.episodes} episodes ({self.skipped} skipped, {self.failed} failed) in {self.elapsed_seconds:.1f}s: "
+            f"{self.episodes_per_hour:.1f} episodes/hour, {self.total_tokens} tokens "
+            f"({self.prompt_tokens} prompt, {self.completion_tokens} completion), ${self.llm_costs:.4f} LLM costs, "
+            f"{self.llm_cache_hits} LLM cache hits saving ${self.cost_saved:.4f}, "
+            f"{self.vectors} vectors upserted ({self.vectors_per_second:.1f}/s in {self.embed_requests} embed and {self.upsert_requests} upsert requests), "
+            f"{self.vectors_deleted} deleted, {self.vectors_unchanged} unchanged, "
+            f"{self.rate_limit_wait_seconds:.1f}s waited for rate limits"
+        )
+
+
+class EpisodeJob:
+    """State of one episode while it moves through the pipeline stages."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.episode: Optional[EpisodeScrapeResult] = None
+        self.free_form_response: Optional[LLMResponse] = None
+        self.bulletpoints: Optional[BulletPoints] = None
+        self.diff: Optional[BulletPointDiff] = None
+
+
+class IngestionPipeline:
+    """Keeps many episodes in flight through the load -> parse -> structure -> write stages.
+
+    Every stage has its own pool of workers connected by bounded queues, the blocking OpenAI and Pinecone
+    calls run in threads. The write stage hands the changed bullet points to a BatchingWriter, which embeds and
+    upserts them in batches across episodes. Both LLM stages share a RateLimitScheduler, so the pipeline stays within the
+    requests-per-minute and tokens-per-minute limits of the account no matter how many episodes are in flight. The chunks
+    of a chunked transcript are scheduled as requests of their own.
+    """
+
+    def __init__(
+        self,
+        parser: EpisodeParser,
+        scheduler: RateLimitScheduler,
+        llm_concurrency: int = 8,
+        io_concurrency: int = 4,
+        expected_completion_tokens: int = 2000,
+        embed_batch_size: Optional[int] = None,
+        upsert_batch_size: int = 100,
+        flush_interval: float = 2.0,
+        index_version: Optional[IndexVersion] = None,
+        archive: Optional[TranscriptArchive] = None,
+    ):
+        """
+        :param archive: Load the episodes from this transcript archive, the paths passed to `run` are episode names then
+        """
+        self.parser = parser
+        self.scheduler = scheduler
+        self.llm_concurrency = llm_concurrency
+        self.io_concurrency = io_concurrency
+        self.expected_completion_tokens = expected_completion_tokens
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.flush_interval = flush_interval
+        self.index_version = index_version
+        self.archive = archive
+        self.stats = IngestionStats()
+        # Bounds the extraction requests in flight, chunked episodes fan out into several requests
+        self._extract_slots = asyncio.Semaphore(llm_concurrency)
+        self.writer: Optional[BatchingWriter] = None
+
+    async def run(self, scraped_episode_paths: list[str]) -> IngestionStats:
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        self.writer = BatchingWriter(
+            self.parser,
+            embed_batch_size=self.embed_batch_size,
+            upsert_batch_size=self.upsert_batch_size,
+            flush_interval=self.flush_interval,
+            index_version=self.index_version,
+            # Stats are only updated from the event loop
+            on_episode_done=lambda *args: loop.call_soon_threadsafe(self._episode_written, *args),
+        )
+        stages = [
+            (self.load, self.io_concurrency),
+            (self.extract, self.llm_concurrency),
+            (self.structure, self.llm_concurrency),
+            (self.write, self.io_concurrency),
+        ]
+        queues = [asyncio.Queue(maxsize=2 * n_workers) for _, n_workers in stages]
+
+        async def feed():
+            for path in scraped_episode_paths:
+                await queues[0].put(EpisodeJob(path))
+            for _ in range(stages[0][1]):
+                await queues[0].put(None)
+
+        tasks = [feed()]
+        for stage_idx, (handle, n_workers) in enumerate(stages):
+            is_last = stage_idx == len(stages) - 1
+            outbox = None if is_last else queues[stage_idx + 1]
+            n_next_workers = 0 if is_last else stages[stage_idx + 1][1]
+            tasks.append(self._run_stage(handle, queues[stage_idx], outbox, n_workers, n_next_workers))
+        await asyncio.gather(*tasks)
+        await asyncio.to_thread(self.writer.close)
+
+        self.stats.vectors_per_second = self.writer.stats.vectors_per_second
+        self.stats.embed_requests = self.writer.stats.embed_requests
+        self.stats.upsert_requests = self.writer.stats.upsert_requests
+        logger.info(self.writer.stats.summary())
+        self.stats.rate_limit_wait_seconds = self.scheduler.waited_seconds
+        self.stats.elapsed_seconds = time.perf_counter() - start
+        return self.stats
+
+    async def _run_stage(self, handle, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue], n_workers: int, n_next_workers: int):
+        async def worker():
+            while (job := await inbox.get()) is not None:
+                try:
+                    passed_on = await handle(job)
+                except Exception as e:
+                    logger.error(f"{handle.__name__} failed for {job.path}: {e}")
+                    self.stats.failed += 1
+                    continue
+                if passed_on and outbox is not None:
+                    await outbox.put(job)
+
+        await asyncio.gather(*(worker() for _ in range(n_workers)))
+        # Every worker of the next stage stops at its own sentinel
+        if outbox is not None:
+            for _ in range(n_next_workers):
+                await outbox.put(None)
+
+    async def load(self, job: EpisodeJob) -> bool:
+        with metrics.span("load_episode"):
+            if self.archive is not None:
+                job.episode = await asyncio.to_thread(self.archive.load, job.path)
+            else:
+                job.episode = EpisodeScrapeResult(**await asyncio.to_thread(load_json, job.path))
+        if not self.parser.needs_ingestion(job.episode):
+            logger.info(f"Episode '{job.episode.episode_name}' already upserted. Skipping.")
+            self.stats.skipped += 1
+            return False
+        return True
+
+    async def _call_llm(self, estimated_prompt_tokens: int, fn, *args) -> LLMResponse:
+        estimated_tokens = estimated_prompt_tokens + self.expected_completion_tokens
+        with metrics.span("rate_limit_wait"):
+            await self.scheduler.acquire(estimated_tokens)
+        response = await asyncio.to_thread(fn, *args)
+        self.scheduler.settle(estimated_tokens, response.prompt_tokens + response.completion_tokens)
+        self.stats.prompt_tokens += response.prompt_tokens
+        self.stats.completion_tokens += response.completion_tokens
+        self.stats.llm_costs += response.llm_costs
+        self.stats.llm_cache_hits += response.cache_hit
+        self.stats.cost_saved += response.cost_saved
+        return response
+
+    async def extract(self, job: EpisodeJob) -> bool:
+        # Every chunk of a long transcript is a request of its own, it passes the rate limits and takes an LLM slot of
+        # the stage like the request of a whole episode
+        chunks = self.parser.split_into_chunks(job.episode.sentences)
+
+        async def extract_chunk(idx: int) -> LLMResponse:
+            async with self._extract_slots:
+                return await self._call_llm(self.estimate_extract_tokens(chunks[idx]), self._extract_chunk_takeaways, chunks[idx], idx, len(chunks))
+
+        responses = await asyncio.gather(*(extract_chunk(idx) for idx in range(len(chunks))))
+        job.free_form_response = self.parser.merge_chunk_takeaways(chunks, responses)
+        return True
+
+    def _extract_chunk_takeaways(self, chunk: Transcript, chunk_idx: int, n_chunks: int) -> LLMResponse:
+        with metrics.span("extract_takeaways"):
+            return self.parser.extract_chunk_takeaways(chunk, chunk_idx, n_chunks)
+
+    def estimate_extract_tokens(self, sentences: Transcript) -> int:
+        # Estimated from the sentence lengths, the " (NN.N sec) " suffix adds about 12 characters per sentence and the
+        # compact format about 4
+        overhead = 12 if self.parser.prompt_encoding is None else 4
+        transcript_length = len(sentences.text) + overhead * len(sentences)
+        return estimate_tokens(raw_parser_system_prompt) + transcript_length // 4
+
+    async def structure(self, job: EpisodeJob) -> bool:
+        estimated_prompt_tokens = estimate_tokens(structured_parser_system_prompt + job.free_form_response.content)
+
+        def structure_takeaways():
+            bulletpoints, response = self.parser.structure_takeaways(job.episode, job.free_form_response)
+            job.bulletpoints = bulletpoints
+            return response
+
+        await self._call_llm(estimated_prompt_tokens, structure_takeaways)
+        return True
+
+    async def write(self, job: EpisodeJob) -> bool:
+        job.diff = self.parser.diff_bulletpoints(job.episode, job.bulletpoints.bullet_points)
+        await asyncio.to_thread(self.writer.submit, job.episode, job.diff)
+        return True
+
+    def _episode_written(self, episode: EpisodeScrapeResult, diff: BulletPointDiff, error: Optional[Exception]):
+        if error is not None:
+            logger.error(f"Writing episode '{episode.episode_name}' failed: {error}")
+            self.stats.failed += 1
+            return
+        self.stats.vectors += len(diff.added) + len(diff.moved)
+        self.stats.vectors_deleted += len(diff.stale_ids)
+        self.stats.vectors_unchanged += diff.n_unchanged
+        self.stats.episodes += 1
+        logger.info(f"Parsed and upserted episode '{episode.episode_name}' ({self.stats.episodes}/{self.stats.episodes + self.stats.skipped})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    metrics.report_at_exit("ingestion")
+
+    arg_parser = argparse.ArgumentParser(description="Parse, embed and upsert all scraped episodes concurrently")
+    arg_parser.add_argument("--scrape-results", default=SCRAPE_RESULTS_DIR)
+    arg_parser.add_argument("--archive", default=None, help="Read the episodes from this transcript archive instead of --scrape-results")
+    arg_parser.add_argument("--index-name", default=None, help="Defaults to PINECONE_INDEX_NAME or the index of the embedding backend")
+    arg_parser.add_argument("--llm-concurrency", type=int, default=8, help="LLM requests in flight in each LLM stage")
+    arg_parser.add_argument("--io-concurrency", type=int, default=4, help="Workers of the load and write stages")
+    arg_parser.add_argument("--chunk-tokens", type=int, default=None, help="Summarize longer transcripts in chunks of this many tokens")
+    arg_parser.add_argument("--rpm", type=float, default=500, help="Requests per minute allowed by the OpenAI account")
+    arg_parser.add_argument("--tpm", type=float, default=200_000, help="Tokens per minute allowed by the OpenAI account")
+    arg_parser.add_argument("--embed-batch-size", type=int, default=None, help="Bullet points per embedding request, defaults to the backend limit")
+    arg_parser.add_argument("--upsert-batch-size", type=int, default=100, help="Vectors per upsert request")
+    arg_parser.add_argument("--flush-interval", type=float, default=2.0, help="Seconds a bullet point waits for its batch to fill up")
+    arg_parser.add_argument("--incremental", action="store_true", help="Re-parse ingested episodes and only upsert the changed bullet points")
+    arg_parser.add_argument("--compact-prompt", action="store_true", help="Render transcripts with timestamps only at speaker changes and intervals")
+    arg_parser.add_argument("--timestamp-interval", type=float, default=30.0, help="Seconds between timestamps within a speaker turn of the compact prompt")
+    arg_parser.add_argument("--drop-fillers", action="store_true", help="Drop filler words like um and uh from the compact prompt")
+    args = arg_parser.parse_args()
+
+    embedding_provider = get_embedding_provider()
+    index_name = args.index_name or os.environ.get("PINECONE_INDEX_NAME", embedding_provider.default_index_name)
+    archive = TranscriptArchive(args.archive) if args.archive else None
+    if archive is not None:
+        paths = archive.episode_names()
+    else:
+        paths = [os.path.join(args.scrape_results, name) for name in sorted(os.listdir(args.scrape_results)) if not name.startswith("_")]
+    index = get_vector_store(index_name, embedding_provider.dimension)
+    ledger = IngestionLedger.for_index(index_name, index, embedding_provider.model_name)
+    pipeline = IngestionPipeline(
+        EpisodeParser(
+            index,
+            chunk_tokens=args.chunk_tokens,
+            ledger=ledger,
+            incremental=args.incremental,
+            prompt_encoding=PromptEncoding(timestamp_interval=args.timestamp_interval, drop_fillers=args.drop_fillers) if args.compact_prompt else None,
+        ),
+        RateLimitScheduler(args.rpm, args.tpm),
+        llm_concurrency=args.llm_concurrency,
+        io_concurrency=args.io_concurrency,
+        embed_batch_size=args.embed_batch_size,
+        upsert_batch_size=args.upsert_batch_size,
+        flush_interval=args.flush_interval,
+        index_version=IndexVersion(index_name),
+        archive=archive,
+    )
+    stats = asyncio.run(pipeline.run(paths))
+    logging.info(stats.summary())
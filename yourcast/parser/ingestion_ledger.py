@@ -0,0 +1,180 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+from tqdm import tqdm
+
+from yourcast.scraper.run_scrape import EpisodeScrapeResult
+from yourcast.tools.embeddings import get_embedding_provider
+from yourcast.tools.helpers import load_json, store_json_atomic
+from yourcast.tools.vector_store import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+LEDGER_DIR = "yourcast/assets/ingestion_ledger"
+
+
+class LedgerEntry(BaseModel):
+    source_podcast_name: str
+    published_date: str
+    episode_name: str
+    # None for entries rebuilt from the index, which does not store the transcript
+    content_hash: Optional[str] = None
+    bullet_ids: list[str]
+    # Parallel to bullet_ids, empty for ledgers written before timestamps were recorded
+    bullet_timestamps: list[int] = []
+    embedding_model: str
+    ingested_at: str
+
+
+def ledger_path(index_name: str) -> str:
+    return f"{LEDGER_DIR}/{index_name}.json"
+
+
+def transcript_hash(episode: EpisodeScrapeResult) -> str:
+    sentences = json.dumps(episode.sentences.to_dicts(), sort_keys=True)
+    return hashlib.sha256(sentences.encode()).hexdigest()
+
+
+class IngestionLedger:
+    """Local record of the episodes upserted to one index, so skipping them needs no query against the index.
+
+    Entries are keyed by (podcast, published date, episode name) and remember the transcript hash, the ids and
+    timestamps of the upserted bullet points and the embedding model. Recorded episodes are appended to a journal next to
+    the ledger file, which is compacted into the ledger file once it holds as many entries as the ledger, so recording
+    stays constant time however many episodes are ingested. If both are lost, `rebuild` recreates the ledger from the
+    index in one pass over all vector ids.
+    """
+
+    def __init__(self, path: str, compact_after: int = 1000):
+        """
+        :param compact_after: Journal entries written before the journal may be compacted, even for a small ledger
+        """
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compact_after = compact_after
+        data = load_json(path) if os.path.exists(path) else {}
+        self.entries: dict[str, LedgerEntry] = {key: LedgerEntry(**entry) for key, entry in data.get("episodes", {}).items()}
+        self._lock = threading.Lock()
+        self._journal_entries = 0
+        if os.path.exists(self.journal_path):
+            self._replay_journal()
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path) or os.path.exists(self.journal_path)
+
+    def _replay_journal(self):
+        torn = False
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Written partially by a crash, the episode is ingested again
+                    torn = True
+                    continue
+                self.entries[record["key"]] = LedgerEntry(**record["entry"])
+                self._journal_entries += 1
+        if torn:
+            logger.warning(f"Skipped a partially written entry of {self.journal_path}")
+            # Appending after a partial line would corrupt the next entry too
+            self.save()
+
+    @classmethod
+    def for_index(cls, index_name: str, index, embedding_model: str) -> "IngestionLedger":
+        """Ledger of `index_name`, rebuilt from the index when there is no ledger file yet."""
+        ledger = cls(ledger_path(index_name))
+        if not ledger.exists:
+            logger.info(f"No ingestion ledger at {ledger.path}, rebuilding it from index '{index_name}'")
+            ledger.rebuild(index, embedding_model)
+        return ledger
+
+    @staticmethod
+    def make_key(source_podcast_name: str, published_date: str, episode_name: str) -> str:
+        return json.dumps([source_podcast_name, published_date, episode_name])
+
+    def get(self, source_podcast_name: str, published_date: str, episode_name: str) -> Optional[LedgerEntry]:
+        return self.entries.get(self.make_key(source_podcast_name, published_date, episode_name))
+
+    def record(self, episode: EpisodeScrapeResult, bullet_ids: list[str], bullet_timestamps: list[int], embedding_model: str) -> LedgerEntry:
+        entry = LedgerEntry(
+            source_podcast_name=episode.podcast_name,
+            published_date=episode.publication_date,
+            episode_name=episode.episode_name,
+            content_hash=transcript_hash(episode),
+            bullet_ids=bullet_ids,
+            bullet_timestamps=bullet_timestamps,
+            embedding_model=embedding_model,
+            ingested_at=datetime.now().isoformat(),
+        )
+        key = self.make_key(episode.podcast_name, episode.publication_date, episode.episode_name)
+        with self._lock:
+            self.entries[key] = entry
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.journal_path, "a") as f:
+                f.write(json.dumps({"key": key, "entry": entry.model_dump()}) + "\n")
+            self._journal_entries += 1
+            # Replaying the journal never costs more than loading the ledger file, and the rewrite is paid once per as
+            # many recorded episodes as the ledger holds
+            if self._journal_entries >= max(self.compact_after, len(self.entries)):
+                self.save()
+        return entry
+
+    def save(self):
+        """Write all entries to the ledger file atomically and empty the journal."""
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        store_json_atomic({"episodes": {key: entry.model_dump() for key, entry in self.entries.items()}}, self.path)
+        # A crash before the journal is emptied only replays entries that are in the ledger file already
+        open(self.journal_path, "w").close()
+        self._journal_entries = 0
+
+    def rebuild(self, index, embedding_model: str, batch_size: int = 100):
+        """Replace all entries by the episodes found in `index`, grouping its vectors by their episode metadata."""
+        entries: dict[str, LedgerEntry] = {}
+        ingested_at = datetime.now().isoformat()
+        with tqdm(desc="Rebuilding ingestion ledger", unit="vector") as progress:
+            for ids in index.list(limit=batch_size):
+                vectors = index.fetch(ids=list(ids)).vectors
+                for id, vector in vectors.items():
+                    metadata = vector.metadata or {}
+                    if not {"source_podcast_name", "published_date", "episode_name"} <= metadata.keys():
+                        continue
+                    key = self.make_key(metadata["source_podcast_name"], metadata["published_date"], metadata["episode_name"])
+                    if key not in entries:
+                        entries[key] = LedgerEntry(
+                            source_podcast_name=metadata["source_podcast_name"],
+                            published_date=metadata["published_date"],
+                            episode_name=metadata["episode_name"],
+                            bullet_ids=[],
+                            embedding_model=embedding_model,
+                            ingested_at=ingested_at,
+                        )
+                    entries[key].bullet_ids.append(id)
+                    entries[key].bullet_timestamps.append(int(metadata.get("timestamp", -1)))
+                progress.update(len(vectors))
+
+        with self._lock:
+            self.entries = entries
+            self.save()
+        logger.info(f"Rebuilt ingestion ledger with {len(entries)} episodes")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    arg_parser = argparse.ArgumentParser(description="Rebuild the ingestion ledger of an index from the vectors stored in it")
+    arg_parser.add_argument("--index-name", default=None, help="Defaults to PINECONE_INDEX_NAME or the index of the embedding backend")
+    args = arg_parser.parse_args()
+
+    embedding_provider = get_embedding_provider()
+    index_name = args.index_name or os.environ.get("PINECONE_INDEX_NAME", embedding_provider.default_index_name)
+    IngestionLedger(ledger_path(index_name)).rebuild(get_vector_store(index_name, embedding_provider.dimension), embedding_provider.model_name)
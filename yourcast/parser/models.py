@@ -0,0 +1,25 @@
+from typing import List
+
+from pydantic import BaseModel
+
+# Kept apart from episode_parser, so the API can use them without importing the ingestion and scraper modules
+
+
+class BulletPoint(BaseModel):
+    text: str
+    timestamp: int
+
+
+class BulletPointMetadata(BaseModel):
+    text: str
+    timestamp: int
+    episode_name: str
+    source_podcast_name: str
+    published_date: str
+    listen_link: str
+    image: str
+
+
+class BulletPoints(BaseModel):
+    episode_summary: str
+    bullet_points: List[BulletPoint]
@@ -0,0 +1,159 @@
+import bisect
+import re
+from typing import Optional, Sequence
+
+from pydantic import BaseModel
+
+from yourcast.scraper.transcript import Transcript
+from yourcast.tools.rate_limit import estimate_tokens
+
+# Hesitations that carry no content, dropped as whole words together with the punctuation and space that follow them
+FILLER_PATTERN = re.compile(r"\b(?:u+h+m*|u+m+|e+r+m+|hm+|mhm|mm-hmm|uh-huh)\b[,.]?\s*", re.IGNORECASE)
+WORD_PATTERN = re.compile(r"\w+")
+# Words that say nothing about which sentence a bullet point was taken from
+STOPWORDS = frozenset(
+    """
+    a about above after again against all am an and any are as at be because been before being below between both but by
+    can could d did do does doing don down during each few for from had has have having he her here herself him himself
+    his how i if in into is it its itself just ll m me more most my myself no nor not now of off on once only or other
+    our ours out over own re s same she should so some such t than that the their them themselves then there these they
+    this those through to too under until up ve very was we were what when where which while who whom why will with
+    would you your yours
+    """.split()
+)
+
+COMPACT_TRANSCRIPT_INSTRUCTIONS = """
+Every line of the transcript starts with its speaker (S0, S1, ...). Numbers in square brackets are
+the time in seconds at which the text after them starts, use them as the timestamps of the takeaways.
+"""
+
+
+class PromptEncoding(BaseModel):
+    """How the transcript is rendered into the parser prompts in the compact format."""
+
+    # A timestamp is written at every speaker change, and within a turn once this many seconds passed since the last one
+    timestamp_interval: float = 30.0
+    # Consecutive sentences of the same speaker become one line with one speaker label, otherwise every sentence is a
+    # line of its own
+    merge_speaker_turns: bool = True
+    drop_fillers: bool = False
+
+
+class EncodedTranscript(BaseModel):
+    text: str
+    # The timestamps written into the text, in seconds
+    anchors: list[int]
+    # The last timestamp written at or before every sentence of the transcript, the one a bullet point taken from that
+    # sentence cites. locate_sentence maps it back to the sentence
+    sentence_anchors: list[int]
+    # Input tokens of the transcript in the verbose format, every sentence followed by its start time, and in this one.
+    # Zero unless counted
+    verbose_tokens: int = 0
+    tokens: int = 0
+
+    @property
+    def saved_ratio(self) -> float:
+        return 1 - self.tokens / self.verbose_tokens if self.verbose_tokens else 0.0
+
+
+_encoder = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of the gpt-4o tokenizer if tiktoken is installed, the 4 characters per token estimate otherwise."""
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            _encoder = False
+    if _encoder is False:
+        return estimate_tokens(text)
+    return len(_encoder.encode(text, disallowed_special=()))
+
+
+def drop_fillers(text: str) -> str:
+    return FILLER_PATTERN.sub("", text).strip()
+
+
+def encode_transcript(transcript: Transcript, encoding: Optional[PromptEncoding] = None, with_token_counts: bool = True) -> EncodedTranscript:
+    """Render `transcript` for the parser prompts with as few timestamps and speaker labels as the encoding allows.
+
+    Timestamps are whole seconds, every sentence of the transcript starts less than `timestamp_interval` seconds after
+    the last timestamp written before it.
+
+    :param with_token_counts: Count the tokens of both formats, which takes longer than encoding
+    """
+    encoding = encoding or PromptEncoding()
+    parts: list[str] = []
+    anchors: list[int] = []
+    sentence_anchors: list[int] = []
+    previous_speaker: Optional[int] = None
+    for text, start_time, speaker_id in zip(transcript.texts(), transcript.start_times, transcript.speaker_ids):
+        if encoding.drop_fillers:
+            text = drop_fillers(text)
+            if not text:
+                sentence_anchors.append(anchors[-1] if anchors else int(start_time))
+                continue
+        speaker_changed = speaker_id != previous_speaker
+        if speaker_changed or start_time - anchors[-1] >= encoding.timestamp_interval:
+            anchors.append(int(start_time))
+            marker = f"[{int(start_time)}] "
+        else:
+            marker = ""
+
+        if encoding.merge_speaker_turns and not speaker_changed:
+            parts.append(f" {marker}{text}")
+        else:
+            separator = "" if previous_speaker is None else "\n"
+            parts.append(f"{separator}S{speaker_id}: {marker}{text}")
+        previous_speaker = speaker_id
+        sentence_anchors.append(anchors[-1])
+
+    encoded = EncodedTranscript(text="".join(parts), anchors=anchors, sentence_anchors=sentence_anchors)
+    if with_token_counts:
+        encoded.verbose_tokens = count_tokens(transcript.to_prompt())
+        encoded.tokens = count_tokens(encoded.text)
+    return encoded
+
+
+def content_words(text: str) -> set[str]:
+    """Lowercased words without stopwords, cut to a crude stem so "hires" matches "hire" and "manager" "management"."""
+    words = set()
+    for word in WORD_PATTERN.findall(text.lower()):
+        if word not in STOPWORDS:
+            words.add((word[:-1] if len(word) > 3 and word.endswith("s") else word)[:5])
+    return words
+
+
+def locate_sentence(texts: Sequence[str], sentence_anchors: Sequence[int], text: str, timestamp: float) -> Optional[int]:
+    """Index of the sentence `text` was most likely taken from, None for an empty transcript.
+
+    A bullet point of a compact prompt cites the timestamp written before its sentence, which can be an interval earlier.
+    The cited timestamp is snapped to the nearest one the prompt contained and the sentences it covers are compared by
+    the content words they share with `text`, which the structuring step usually rewords. Without any shared word the
+    first sentence after the timestamp is returned.
+
+    :param sentence_anchors: EncodedTranscript.sentence_anchors, one per sentence of `texts` and in order
+    """
+    if not sentence_anchors:
+        return None
+    idx = bisect.bisect_left(sentence_anchors, timestamp)
+    candidates = sentence_anchors[max(idx - 1, 0) : idx + 1]
+    anchor = min(candidates, key=lambda candidate: abs(candidate - timestamp))
+    start = bisect.bisect_left(sentence_anchors, anchor)
+    stop = bisect.bisect_right(sentence_anchors, anchor)
+
+    words = content_words(text)
+    best, best_score = start, 0.0
+    for sentence_idx in range(start, stop):
+        sentence_words = content_words(texts[sentence_idx])
+        if not sentence_words:
+            continue
+        # Dice coefficient, a long sentence does not win just by containing more words
+        score = 2 * len(words & sentence_words) / (len(words) + len(sentence_words))
+        if score > best_score:
+            best, best_score = sentence_idx, score
+    return best
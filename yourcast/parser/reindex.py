@@ -0,0 +1,57 @@
+import argparse
+import logging
+import os
+import re
+
+from tqdm import tqdm
+
+from yourcast.tools.embeddings import EMBEDDING_BACKENDS, EmbeddingProvider, get_embedding_provider
+from yourcast.tools.vector_store import IndexVersion, get_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+def reindex(source_index, target_index, embedding_provider: EmbeddingProvider, batch_size: int = 100) -> int:
+    """Copy all bullet points of `source_index` to `target_index`, re-embedding their text with `embedding_provider`.
+
+    Ids and metadata are kept, so the new index can replace the old one without re-running the LLM parsing.
+    """
+    n_vectors = 0
+    with tqdm(desc="Re-indexing bullet points", unit="vector") as progress:
+        for ids in source_index.list(limit=batch_size):
+            vectors = source_index.fetch(ids=list(ids)).vectors
+            records = [(id, vector.metadata) for id, vector in vectors.items() if vector.metadata]
+            # Same text cleaning as EpisodeParser.embed_bulletpoints
+            texts = [re.sub(r"\s*\(\d+\s*sec\)", "", metadata["text"]) for _, metadata in records]
+            embeddings = embedding_provider.embed(texts)
+            target_index.upsert([{"id": id, "values": embedding, "metadata": metadata} for (id, metadata), embedding in zip(records, embeddings)])
+            n_vectors += len(records)
+            progress.update(len(records))
+    return n_vectors
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    arg_parser = argparse.ArgumentParser(description="Re-embed an existing index with another embedding backend")
+    arg_parser.add_argument("--source-index", default=os.environ.get("PINECONE_INDEX_NAME", "yourpod"))
+    arg_parser.add_argument("--source-backend", choices=list(EMBEDDING_BACKENDS), default="openai", help="Embedding backend of the source index")
+    arg_parser.add_argument("--backend", choices=list(EMBEDDING_BACKENDS), default="fastembed", help="Embedding backend of the new index")
+    arg_parser.add_argument("--target-index", default=None, help="Defaults to the index name of the backend")
+    args = arg_parser.parse_args()
+
+    embedding_provider = get_embedding_provider(args.backend)
+    target_index_name = args.target_index or embedding_provider.default_index_name
+    if target_index_name == args.source_index:
+        raise ValueError("The target index must differ from the source index")
+
+    n_vectors = reindex(
+        get_vector_store(args.source_index, get_embedding_provider(args.source_backend).dimension),
+        get_vector_store(target_index_name, embedding_provider.dimension),
+        embedding_provider,
+    )
+    IndexVersion(target_index_name).bump()
+    logger.info(
+        f"Re-indexed {n_vectors} vectors from '{args.source_index}' into '{target_index_name}' with {embedding_provider.model_name}. "
+        f"Start the API and ingestion with YOURCAST_EMBEDDING_BACKEND={args.backend} to use it."
+    )
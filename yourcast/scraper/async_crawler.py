@@ -0,0 +1,132 @@
+import logging
+from typing import Optional
+
+from playwright.async_api import Browser, BrowserContext, Page, Playwright, async_playwright
+
+from yourcast.scraper.crawler import BLOCKED_RESOURCE_TYPES, EXTRACT_TRANSCRIPT_JS, USER_AGENT, sentences_from_rows
+from yourcast.scraper.transcript import Transcript
+from yourcast.tools.keywords import StaticNames
+from yourcast.tools.metrics import metrics
+
+logger = logging.getLogger(StaticNames.scraper_logger_name)
+
+
+async def block_unneeded_resources_async(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class AsyncCrawlerWorker:
+    """A single browser context owned by one scraping worker.
+
+    The context is recycled after `max_urls_before_recycle` pages instead of restarting the whole browser,
+    so the other workers keep running while one of them refreshes its state.
+    """
+
+    def __init__(self, crawler: "AsyncCrawler", worker_id: int, max_urls_before_recycle: int):
+        self.crawler = crawler
+        self.worker_id = worker_id
+        self.max_urls_before_recycle = max_urls_before_recycle
+        self.context: Optional[BrowserContext] = None
+        self.page: Optional[Page] = None
+        self.urls_processed = 0
+
+    async def open(self):
+        self.context = await self.crawler.browser.new_context(user_agent=USER_AGENT)
+        if self.crawler.block_resources:
+            await self.context.route("**/*", block_unneeded_resources_async)
+        self.page = await self.context.new_page()
+        if self.crawler.is_stealth:
+            from playwright_stealth import stealth_async
+
+            await stealth_async(self.page)
+        self.urls_processed = 0
+
+    async def close(self):
+        if self.context is not None:
+            await self.context.close()
+        self.context = None
+        self.page = None
+
+    async def recycle(self):
+        logger.info(f"Recycling browser context of worker {self.worker_id}...")
+        await self.close()
+        await self.open()
+
+    async def crawl(self, url: str) -> Transcript:
+        logger.debug(f"Worker {self.worker_id} crawling {url}")
+        if self.page is None:
+            await self.open()
+
+        try:
+            with metrics.span("crawl_navigation", crawler="async_browser"):
+                if self.crawler.wait_for_article:
+                    await self.page.goto(url, wait_until="domcontentloaded", referer="https://google.com")
+                    await self.page.wait_for_selector("article")
+                else:
+                    await self.page.goto(url, wait_until=self.crawler.wait_until, referer="https://google.com")
+            with metrics.span("crawl_extraction", crawler="async_browser"):
+                sentences = sentences_from_rows(await self.page.evaluate(EXTRACT_TRANSCRIPT_JS))
+        except Exception:
+            # A failed navigation can leave the page in a broken state, start over with a clean context
+            await self.recycle()
+            raise
+
+        self.urls_processed += 1
+        if self.urls_processed >= self.max_urls_before_recycle:
+            await self.recycle()
+        return sentences
+
+
+class AsyncCrawler:
+    """Shares one Chromium instance between N concurrently used browser contexts."""
+
+    def __init__(
+        self,
+        is_headless: bool = True,
+        wait_until: str = "networkidle",
+        is_stealth: bool = False,
+        max_urls_before_recycle: int = 50,
+        block_resources: bool = False,
+        wait_for_article: bool = False,
+    ):
+        self.is_headless = is_headless
+        self.wait_until = wait_until
+        self.is_stealth = is_stealth
+        self.block_resources = block_resources
+        self.wait_for_article = wait_for_article
+        self.max_urls_before_recycle = max_urls_before_recycle
+        self.playwright: Optional[Playwright] = None
+        self.browser: Optional[Browser] = None
+        self.workers: list[AsyncCrawlerWorker] = []
+
+    async def start(self):
+        logger.info("Initializing AsyncCrawler")
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(headless=self.is_headless)
+
+    async def new_worker(self, open_context: bool = True) -> AsyncCrawlerWorker:
+        # Without open_context the browser context is only created on the worker's first crawl
+        worker = AsyncCrawlerWorker(self, len(self.workers), self.max_urls_before_recycle)
+        if open_context:
+            await worker.open()
+        self.workers.append(worker)
+        return worker
+
+    async def stop(self):
+        for worker in self.workers:
+            await worker.close()
+        self.workers = []
+        if self.browser is not None:
+            await self.browser.close()
+        if self.playwright is not None:
+            await self.playwright.stop()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
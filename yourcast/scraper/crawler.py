@@ -1,15 +1,19 @@
 import logging
 import re
-from typing import List
+from typing import Optional
 
 from playwright.sync_api import sync_playwright
 from playwright_stealth import stealth_sync
 from pydantic import BaseModel
 
+from yourcast.scraper.transcript import Transcript
 from yourcast.tools.keywords import StaticNames
+from yourcast.tools.metrics import metrics
 
 logger = logging.getLogger(StaticNames.scraper_logger_name)
 
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
+
 
 class ScrapeResultMetadata(BaseModel):
     url: str
@@ -37,61 +41,102 @@ def extract_links(markdown: str) -> dict:
     return podcast_info
 
 
+def parse_caption_timestamp(id_attr: Optional[str]) -> Optional[float]:
+    # Caption ids look like "start-17.4 ...", convert the timestamp to seconds (e.g., "17.4" -> 17.4)
+    if not id_attr or not id_attr.startswith("start-"):
+        return None
+    timestamp_str = id_attr.split("-")[1].split(" ")[0]
+    try:
+        return float(timestamp_str)
+    except ValueError:
+        return None
+
+
+# Collects all caption rows of the transcript in a single in-page evaluation, instead of one IPC round trip per element.
+# Returns null when the page has no article element.
+EXTRACT_TRANSCRIPT_JS = """
+() => {
+    const article = document.querySelector("article");
+    if (!article) {
+        return null;
+    }
+    const rows = [];
+    article.querySelectorAll('div[class*="prose mb-6 border-l-8"]').forEach((speakerDiv, speakerIdx) => {
+        speakerDiv.querySelectorAll('p[class*="caption"]').forEach((p) => {
+            rows.push([p.getAttribute("id"), p.textContent, speakerIdx]);
+        });
+    });
+    return rows;
+}
+"""
+
+# Resources a transcript page does not need to render its captions
+BLOCKED_RESOURCE_TYPES = {"image", "font", "stylesheet", "media"}
+
+
+def sentences_from_rows(rows: Optional[list]) -> Transcript:
+    """Convert the (id, text, speaker index) rows returned by EXTRACT_TRANSCRIPT_JS to sentences."""
+    if rows is None:
+        logger.warning("No article element found on the page")
+        return Transcript()
+
+    sentences = Transcript()
+    for id_attr, text, speaker_idx in rows:
+        timestamp = parse_caption_timestamp(id_attr)
+        if timestamp is None:
+            continue
+        text = (text or "").strip()
+        if text:  # Only add non-empty sentences
+            sentences.append(text, timestamp, speaker_idx)
+    return sentences
+
+
+def block_unneeded_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return route.abort()
+    return route.continue_()
+
+
 class Crawler:
     def __init__(
         self,
         is_headless: bool = True,
         wait_until: str = "networkidle",
         is_stealth: bool = False,
+        block_resources: bool = False,
+        wait_for_article: bool = False,
     ):
+        """
+        :param block_resources: Abort image, font, stylesheet and media requests
+        :param wait_for_article: Only wait for the DOM and the article element instead of `wait_until`
+        """
         logger.info("Initializing Crawler")
         self.playwright = sync_playwright().start()
         self.is_headless = is_headless
         self.wait_until = wait_until
+        self.block_resources = block_resources
+        self.wait_for_article = wait_for_article
         self.browser = self.playwright.chromium.launch(headless=self.is_headless)
         self.page = self.get_new_page()
         self.urls_processed = 0
         self.max_urls_before_restart = 200
         self.is_stealth = is_stealth
 
-    def crawl(self, url: str) -> List[Sentence]:
+    def crawl(self, url: str) -> Transcript:
         logger.debug("Crawling...")
 
         if self.is_stealth:
             stealth_sync(self.page)
-        self.page.goto(url, wait_until=self.wait_until, referer="https://google.com")
+        with metrics.span("crawl_navigation", crawler="browser"):
+            if self.wait_for_article:
+                self.page.goto(url, wait_until="domcontentloaded", referer="https://google.com")
+                self.page.wait_for_selector("article")
+            else:
+                self.page.goto(url, wait_until=self.wait_until, referer="https://google.com")
 
         # Extract sentences with timestamps and speaker info
-        sentences = []
-
-        # First find the article element
-        article = self.page.query_selector("article")
-        if not article:
-            logger.warning("No article element found on the page")
-
-        # Find speaker divs only within the article
-        speaker_divs = article.query_selector_all('div[class*="prose mb-6 border-l-8"]')
-
-        for speaker_idx, speaker_div in enumerate(speaker_divs):
-            # Get all paragraphs within the speaker's div
-            paragraphs = speaker_div.query_selector_all('p[class*="caption"]')
-
-            for p in paragraphs:
-                # Extract timestamp from id attribute
-                id_attr = p.get_attribute("id")
-                if id_attr and id_attr.startswith("start-"):
-                    timestamp_str = id_attr.split("-")[1].split(" ")[0]
-                    try:
-                        # Convert timestamp to seconds (e.g., "17.4" -> 17.4)
-                        timestamp = float(timestamp_str)
-                    except ValueError:
-                        continue
-
-                    # Get the text content
-                    text = p.text_content().strip()
-
-                    if text:  # Only add non-empty sentences
-                        sentences.append(Sentence(text=text, start_time=timestamp, speaker_id=speaker_idx))
+        with metrics.span("crawl_extraction", crawler="browser"):
+            sentences = sentences_from_rows(self.page.evaluate(EXTRACT_TRANSCRIPT_JS))
 
         self.urls_processed += 1
         if self.urls_processed >= self.max_urls_before_restart:
@@ -100,9 +145,9 @@ class Crawler:
         return sentences
 
     def get_new_page(self):
-        context = self.browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
-        )
+        context = self.browser.new_context(user_agent=USER_AGENT)
+        if self.block_resources:
+            context.route("**/*", block_unneeded_resources)
         return context.new_page()
 
     def restart_browser(self):
@@ -0,0 +1,113 @@
+import argparse
+import logging
+import os
+import re
+from html.parser import HTMLParser
+from typing import Iterator, Optional
+
+from yourcast.tools.helpers import load_json, store_json
+from yourcast.tools.keywords import StaticNames
+
+logger = logging.getLogger(StaticNames.scraper_logger_name)
+
+BASE_URL = "https://www.readablepod.com"
+LISTING_HTML_PATH = "yourcast/assets/podcasts_from_2025.html"
+EPISODE_URLS_PATH = "yourcast/assets/episode_urls.json"
+NEW_EPISODE_URLS_PATH = "yourcast/assets/new_episode_urls.json"
+
+DATE_PATTERN = re.compile(r"^[A-Za-z]{3} \d{2}, \d{4}$")
+# Collapse whitespace like the browser does, but keep non-breaking spaces that are part of the names
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f\v]+")
+
+
+class EpisodeListingParser(HTMLParser):
+    """Incrementally extracts episode cards from a readablepod listing page.
+
+    Every card is a link wrapping an `h2` with the episode name, a `div` with the podcast name and a `span` with the date.
+    Finished cards are collected in `episodes` and can be drained after every `feed`, so memory stays flat
+    no matter how long the listing is.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.episodes: list[dict] = []
+        self._href: Optional[str] = None
+        self._field: Optional[str] = None
+        self._fields: dict[str, list[str]] = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href") or ""
+            # Only relative links can be episode pages, navigation links are filtered by the card content below
+            if href.startswith("/") and not href.startswith("//"):
+                self._href = href
+                self._fields = {"episode_name": [], "podcast_name": [], "publication_date": []}
+        elif self._href is not None:
+            if tag == "h2":
+                self._field = "episode_name"
+            elif tag == "div" and "truncate" in (dict(attrs).get("class") or ""):
+                self._field = "podcast_name"
+            elif tag == "span":
+                self._field = "publication_date"
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._href is not None:
+            episode = {key: WHITESPACE_PATTERN.sub(" ", "".join(parts)).strip() for key, parts in self._fields.items()}
+            if episode["episode_name"] and episode["podcast_name"] and DATE_PATTERN.match(episode["publication_date"]):
+                episode["url"] = BASE_URL + self._href
+                self.episodes.append(episode)
+            self._href = None
+            self._field = None
+        elif tag in ("h2", "div", "span"):
+            self._field = None
+
+    def handle_data(self, data):
+        if self._field is not None:
+            self._fields[self._field].append(data)
+
+    def drain(self) -> list[dict]:
+        episodes, self.episodes = self.episodes, []
+        return episodes
+
+
+def iter_episodes(html_path: str = LISTING_HTML_PATH, chunk_size: int = 64 * 1024) -> Iterator[dict]:
+    """Yield episode_name, podcast_name, publication_date and url of every episode card in the listing page."""
+    parser = EpisodeListingParser()
+    with open(html_path, "r", encoding="utf-8") as f:
+        while chunk := f.read(chunk_size):
+            parser.feed(chunk)
+            yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+
+def find_new_episodes(episodes: Iterator[dict], known_episodes_path: str = EPISODE_URLS_PATH) -> list[dict]:
+    """Return the episodes whose URL is not listed in episode_urls.json yet."""
+    known = load_json(known_episodes_path)["raw_episodes"] if os.path.exists(known_episodes_path) else []
+    known_urls = {episode["url"] for episode in known}
+
+    new_episodes = []
+    for episode in episodes:
+        if episode["url"] not in known_urls:
+            known_urls.add(episode["url"])
+            new_episodes.append(episode)
+    return new_episodes
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    arg_parser = argparse.ArgumentParser(description="Find episodes in a listing page that are not in episode_urls.json yet")
+    arg_parser.add_argument("--html", default=LISTING_HTML_PATH, help="Listing page to parse")
+    arg_parser.add_argument("--merge", action="store_true", help="Append the new episodes to episode_urls.json")
+    args = arg_parser.parse_args()
+
+    new_episodes = find_new_episodes(iter_episodes(args.html))
+    store_json({"raw_episodes": new_episodes}, NEW_EPISODE_URLS_PATH)
+    logger.info(f"Found {len(new_episodes)} new episodes, stored in {NEW_EPISODE_URLS_PATH}")
+
+    if args.merge and new_episodes:
+        known = load_json(EPISODE_URLS_PATH) if os.path.exists(EPISODE_URLS_PATH) else {"raw_episodes": []}
+        known["raw_episodes"].extend(new_episodes)
+        store_json(known, EPISODE_URLS_PATH)
+        logger.info(f"Merged new episodes into {EPISODE_URLS_PATH}")
@@ -7,13 +7,6 @@ from yourcast.tools.helpers import store_json
 # Path to your HTML file
 html_path = "yourcast/assets/podcasts_from_2025.html"
 
-# Read the HTML file
-with open(html_path, "r", encoding="utf-8") as f:
-    html_content = f.read()
-
-# Convert HTML to Markdown
-markdown_content = md(html_content)
-
 
 def extract_episode_info(markdown: str) -> list:
     # Regex to match the multiline markdown structure
@@ -33,10 +26,21 @@ def extract_episode_info(markdown: str) -> list:
     return result
 
 
-episode_info = extract_episode_info(markdown_content)
+def extract_episode_info_from_html(path: str = html_path) -> list:
+    # Read the HTML file
+    with open(path, "r", encoding="utf-8") as f:
+        html_content = f.read()
+
+    # Convert HTML to Markdown
+    markdown_content = md(html_content)
+    return extract_episode_info(markdown_content)
+
+
+if __name__ == "__main__":
+    episode_info = extract_episode_info_from_html(html_path)
 
-store_json({"raw_episodes": episode_info}, "yourcast/assets/episode_urls.json")
+    store_json({"raw_episodes": episode_info}, "yourcast/assets/episode_urls.json")
 
-# Optionally, save to a .md file
-# with open("output.md", "w", encoding="utf-8") as f:
-#     f.write(markdown_content)
+    # Optionally, save to a .md file
+    # with open("output.md", "w", encoding="utf-8") as f:
+    #     f.write(markdown_content)
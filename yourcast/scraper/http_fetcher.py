@@ -0,0 +1,150 @@
+import logging
+from html.parser import HTMLParser
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from yourcast.scraper.crawler import USER_AGENT, Crawler, sentences_from_rows
+from yourcast.scraper.transcript import Transcript
+from yourcast.tools.keywords import StaticNames
+from yourcast.tools.metrics import metrics
+
+logger = logging.getLogger(StaticNames.scraper_logger_name)
+
+# Elements without a closing tag, they must not change the nesting depth
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class TranscriptHTMLParser(HTMLParser):
+    """Collects the same (id, text, speaker index) caption rows as EXTRACT_TRANSCRIPT_JS from server-rendered HTML.
+
+    The parser is incremental, so the page can be fed chunk by chunk while it is downloaded.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: list = []
+        self.has_article = False
+        self._depth = 0
+        self._article_depth: Optional[int] = None
+        self._speaker_depth: Optional[int] = None
+        self._speaker_idx = -1
+        self._caption_depth: Optional[int] = None
+        self._caption_id: Optional[str] = None
+        self._caption_text: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            return
+        self._depth += 1
+        attributes = dict(attrs)
+        class_attr = attributes.get("class") or ""
+
+        if tag == "article" and self._article_depth is None:
+            self.has_article = True
+            self._article_depth = self._depth
+        elif self._article_depth is not None and tag == "div" and self._speaker_depth is None and "prose mb-6 border-l-8" in class_attr:
+            self._speaker_depth = self._depth
+            self._speaker_idx += 1
+        elif self._speaker_depth is not None and tag == "p" and self._caption_depth is None and "caption" in class_attr:
+            self._caption_depth = self._depth
+            self._caption_id = attributes.get("id")
+            self._caption_text = []
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        if self._caption_depth == self._depth:
+            self.rows.append([self._caption_id, "".join(self._caption_text), self._speaker_idx])
+            self._caption_depth = None
+        elif self._speaker_depth == self._depth:
+            self._speaker_depth = None
+        elif self._article_depth == self._depth:
+            self._article_depth = None
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if self._caption_depth is not None:
+            self._caption_text.append(data)
+
+
+def parse_transcript_html(html: str) -> Transcript:
+    parser = TranscriptHTMLParser()
+    parser.feed(html)
+    parser.close()
+    return sentences_from_rows(parser.rows if parser.has_article else None)
+
+
+class HttpTranscriptFetcher:
+    """Fetches transcripts over plain pooled HTTP and only falls back to a headless browser when the captions are missing.
+
+    `crawl` has the same interface as `Crawler.crawl`. The browser is only started on the first fallback.
+    """
+
+    def __init__(
+        self,
+        crawler_factory: Optional[Callable[[], Crawler]] = None,
+        pool_maxsize: int = 10,
+        timeout: int = 30,
+    ):
+        self.crawler_factory = crawler_factory or Crawler
+        self.timeout = timeout
+        self.crawler: Optional[Crawler] = None
+        self.stats = {"http": 0, "browser": 0}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "User-Agent": USER_AGENT,
+                "Referer": "https://google.com",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.9",
+                "Connection": "keep-alive",
+            }
+        )
+
+    def fetch(self, url: str) -> Optional[Transcript]:
+        """Return the transcript of a server-rendered page, or None when the page needs a browser."""
+        try:
+            with metrics.span("crawl_navigation", crawler="http"):
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"HTTP fetch of {url} failed: {e}")
+            return None
+
+        with metrics.span("crawl_extraction", crawler="http"):
+            parser = TranscriptHTMLParser()
+            parser.feed(response.text)
+            parser.close()
+        if not parser.rows:
+            logger.debug(f"No transcript markup in the HTML of {url}, probably rendered client-side")
+            return None
+
+        self.stats["http"] += 1
+        return sentences_from_rows(parser.rows)
+
+    def crawl(self, url: str) -> Transcript:
+        sentences = self.fetch(url)
+        if sentences is not None:
+            return sentences
+
+        if self.crawler is None:
+            self.crawler = self.crawler_factory()
+        self.record_browser_fallback()
+        return self.crawler.crawl(url)
+
+    def record_browser_fallback(self):
+        self.stats["browser"] += 1
+
+    def report(self) -> str:
+        return f"{self.stats['http']} pages fetched over HTTP, {self.stats['browser']} pages rendered in the browser"
+
+    def stop(self):
+        self.session.close()
+        if self.crawler is not None:
+            self.crawler.stop_playwright()
@@ -1,13 +1,25 @@
+import argparse
+import asyncio
+import os
+import time
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel
 from slugify import slugify
 
-from yourcast.scraper.crawler import Crawler, Sentence
-from yourcast.tools.helpers import load_json, setup_logger, store_json
+from yourcast.scraper.async_crawler import AsyncCrawler, AsyncCrawlerWorker
+from yourcast.scraper.crawler import Crawler
+from yourcast.scraper.http_fetcher import HttpTranscriptFetcher
+from yourcast.scraper.transcript import Transcript
+from yourcast.tools.helpers import load_json, setup_logger, store_json_atomic
+from yourcast.tools.metrics import metrics
 
 logger = setup_logger(__name__, f"yourcast/assets/logs/scraper_logs_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log")
 
+SCRAPE_RESULTS_DIR = "yourcast/assets/scrape_results"
+MANIFEST_PATH = f"{SCRAPE_RESULTS_DIR}/_manifest.json"
+
 
 class EpisodeScrapeInput(BaseModel):
     episode_name: str
@@ -21,12 +33,60 @@ class EpisodeScrapeResult(BaseModel):
     podcast_name: str
     publication_date: str
     url: str
-    sentences: list[Sentence]
+    # Validated from and serialized to the list of sentence dicts of the JSON files
+    sentences: Transcript
+
+
+def scrape_result_path(episode_name: str) -> str:
+    return f"{SCRAPE_RESULTS_DIR}/{slugify(episode_name)}.json"
+
+
+class ScrapeManifest:
+    """Checkpoint of a scrape run, so an interrupted run can resume where it stopped.
+
+    An episode counts as done when its result file exists, the manifest additionally keeps
+    the failures of previous runs and when each episode was scraped.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        data = load_json(path) if os.path.exists(path) else {}
+        self.completed: dict = data.get("completed", {})
+        self.failed: dict = data.get("failed", {})
+
+    def is_done(self, episode_name: str) -> bool:
+        return os.path.exists(scrape_result_path(episode_name))
 
+    def mark_completed(self, episode_name: str, n_sentences: int):
+        slug = slugify(episode_name)
+        self.failed.pop(slug, None)
+        self.completed[slug] = {"n_sentences": n_sentences, "scraped_at": datetime.now().isoformat()}
 
-def run_scraper():
+    def mark_failed(self, episode_name: str, error: str):
+        self.failed[slugify(episode_name)] = {"error": error, "failed_at": datetime.now().isoformat()}
+
+    def save(self):
+        store_json_atomic({"completed": self.completed, "failed": self.failed}, self.path)
+
+
+def store_scrape_result(episode_scrape_input: EpisodeScrapeInput, sentences: Transcript):
+    episode_scrape_result = EpisodeScrapeResult(
+        episode_name=episode_scrape_input.episode_name,
+        podcast_name=episode_scrape_input.podcast_name,
+        publication_date=episode_scrape_input.publication_date,
+        url=episode_scrape_input.url,
+        sentences=sentences,
+    )
+    # Resume skips every episode whose result file exists, an interrupted write must not leave a truncated one behind
+    store_json_atomic(episode_scrape_result.model_dump(), scrape_result_path(episode_scrape_input.episode_name))
+
+
+def run_scraper(http_first: bool = False):
     raw_episode_inputs = load_json("yourcast/assets/episode_urls.json")
-    crawler = Crawler(is_headless=False, is_stealth=True)
+    if http_first:
+        crawler = HttpTranscriptFetcher(crawler_factory=lambda: Crawler(is_headless=False, is_stealth=True))
+    else:
+        crawler = Crawler(is_headless=False, is_stealth=True)
     for idx, raw_episode_input in enumerate(raw_episode_inputs["raw_episodes"]):
         try:
             episode_scrape_input = EpisodeScrapeInput(**raw_episode_input)
@@ -37,18 +97,137 @@ def run_scraper():
                 f"\n Podcast Name: {episode_scrape_input.podcast_name}"
             )
             sentences = crawler.crawl(episode_scrape_input.url)
-            episode_scrape_result = EpisodeScrapeResult(
-                episode_name=episode_scrape_input.episode_name,
-                podcast_name=episode_scrape_input.podcast_name,
-                publication_date=episode_scrape_input.publication_date,
-                url=episode_scrape_input.url,
-                sentences=sentences,
-            )
-            store_json(episode_scrape_result.model_dump(), f"yourcast/assets/scrape_results/{slugify(episode_scrape_input.episode_name)}.json")
+            store_scrape_result(episode_scrape_input, sentences)
         except Exception as e:
             logger.error(f"Error scraping episode {idx} of {len(raw_episode_inputs['raw_episodes'])}: {e}")
             continue
 
+    if http_first:
+        logger.info(crawler.report())
+
+
+async def _scrape_worker(
+    worker: AsyncCrawlerWorker,
+    queue: asyncio.Queue,
+    manifest: ScrapeManifest,
+    n_total: int,
+    stats: dict,
+    http_fetcher: Optional[HttpTranscriptFetcher] = None,
+):
+    while True:
+        item = await queue.get()
+        if item is None:
+            queue.task_done()
+            return
+        idx, episode_scrape_input = item
+        try:
+            logger.info(f"[worker {worker.worker_id}] Scraping episode {idx} of {n_total}: {episode_scrape_input.url}")
+            sentences = None
+            if http_fetcher is not None:
+                sentences = await asyncio.to_thread(http_fetcher.fetch, episode_scrape_input.url)
+            if sentences is None:
+                if http_fetcher is not None:
+                    http_fetcher.record_browser_fallback()
+                sentences = await worker.crawl(episode_scrape_input.url)
+            # Writing a few hundred KB of JSON would otherwise stall the other workers
+            await asyncio.to_thread(store_scrape_result, episode_scrape_input, sentences)
+            manifest.mark_completed(episode_scrape_input.episode_name, len(sentences))
+            stats["scraped"] += 1
+        except Exception as e:
+            logger.error(f"Error scraping episode {idx} of {n_total}: {e}")
+            manifest.mark_failed(episode_scrape_input.episode_name, str(e))
+            stats["failed"] += 1
+        finally:
+            queue.task_done()
+            if (stats["scraped"] + stats["failed"]) % 10 == 0:
+                # The result files are what resume relies on, a failed checkpoint is retried with the next one
+                try:
+                    manifest.save()
+                except Exception as e:
+                    logger.error(f"Error saving the scrape manifest: {e}")
+
+
+async def run_async_scraper(
+    concurrency: int = 4,
+    max_urls_before_recycle: int = 50,
+    is_headless: bool = False,
+    is_stealth: bool = True,
+    block_resources: bool = False,
+    wait_for_article: bool = False,
+    http_first: bool = False,
+):
+    """Scrape all episodes with `concurrency` browser contexts, skipping episodes that were already scraped.
+
+    With `http_first` pages are fetched over plain HTTP and a browser context is only used when the transcript markup is missing.
+    """
+    raw_episodes = load_json("yourcast/assets/episode_urls.json")["raw_episodes"]
+    os.makedirs(SCRAPE_RESULTS_DIR, exist_ok=True)
+    manifest = ScrapeManifest()
+    stats = {"scraped": 0, "failed": 0, "skipped": 0}
+
+    # A bounded queue keeps the producer at most a couple of episodes ahead of the workers
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    http_fetcher = HttpTranscriptFetcher(pool_maxsize=concurrency) if http_first else None
+    start = time.perf_counter()
+    async with AsyncCrawler(
+        is_headless=is_headless,
+        is_stealth=is_stealth,
+        max_urls_before_recycle=max_urls_before_recycle,
+        block_resources=block_resources,
+        wait_for_article=wait_for_article,
+    ) as crawler:
+        workers = [await crawler.new_worker(open_context=not http_first) for _ in range(concurrency)]
+        tasks = [asyncio.create_task(_scrape_worker(worker, queue, manifest, len(raw_episodes), stats, http_fetcher)) for worker in workers]
+
+        try:
+            for idx, raw_episode_input in enumerate(raw_episodes):
+                episode_scrape_input = EpisodeScrapeInput(**raw_episode_input)
+                if manifest.is_done(episode_scrape_input.episode_name):
+                    stats["skipped"] += 1
+                    continue
+                await queue.put((idx, episode_scrape_input))
+
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+        finally:
+            manifest.save()
+            if http_fetcher is not None:
+                http_fetcher.session.close()
+
+    elapsed = time.perf_counter() - start
+    pages_per_minute = stats["scraped"] / elapsed * 60 if elapsed > 0 else 0.0
+    logger.info(
+        f"Scraped {stats['scraped']} episodes ({stats['failed']} failed, {stats['skipped']} already done) "
+        f"in {elapsed:.1f}s with {concurrency} workers: {pages_per_minute:.1f} pages/minute"
+    )
+    if http_fetcher is not None:
+        logger.info(http_fetcher.report())
+    return stats
+
 
 if __name__ == "__main__":
-    run_scraper()
+    arg_parser = argparse.ArgumentParser(description="Scrape episode transcripts listed in episode_urls.json")
+    arg_parser.add_argument("--concurrency", type=int, default=4, help="Number of browser contexts scraping in parallel")
+    arg_parser.add_argument("--max-urls-before-recycle", type=int, default=50, help="Pages a browser context serves before it is recycled")
+    arg_parser.add_argument("--headless", action="store_true", help="Run Chromium headless")
+    arg_parser.add_argument("--block-resources", action="store_true", help="Abort image, font, stylesheet and media requests")
+    arg_parser.add_argument("--wait-for-article", action="store_true", help="Stop waiting for the page once the article element is present")
+    arg_parser.add_argument("--http-first", action="store_true", help="Fetch pages over plain HTTP and only use the browser as a fallback")
+    arg_parser.add_argument("--sync", action="store_true", help="Use the sequential single-page scraper")
+    args = arg_parser.parse_args()
+
+    metrics.report_at_exit("scrape", log=logger)
+    if args.sync:
+        run_scraper(http_first=args.http_first)
+    else:
+        asyncio.run(
+            run_async_scraper(
+                args.concurrency,
+                args.max_urls_before_recycle,
+                is_headless=args.headless,
+                block_resources=args.block_resources,
+                wait_for_article=args.wait_for_article,
+                http_first=args.http_first,
+            )
+        )
@@ -0,0 +1,173 @@
+import bisect
+from array import array
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional, Union
+
+if TYPE_CHECKING:
+    from yourcast.scraper.crawler import Sentence
+
+
+class SentenceView:
+    """One sentence of a Transcript, read from its columns on access instead of holding copies."""
+
+    __slots__ = ("_transcript", "_idx")
+
+    def __init__(self, transcript: "Transcript", idx: int):
+        self._transcript = transcript
+        self._idx = idx
+
+    @property
+    def text(self) -> str:
+        return self._transcript.text_at(self._idx)
+
+    @property
+    def start_time(self) -> float:
+        return self._transcript.start_times[self._idx]
+
+    @property
+    def speaker_id(self) -> int:
+        return self._transcript.speaker_ids[self._idx]
+
+    def model_dump(self) -> dict:
+        return {"text": self.text, "start_time": self.start_time, "speaker_id": self.speaker_id}
+
+    def to_sentence(self) -> "Sentence":
+        from yourcast.scraper.crawler import Sentence
+
+        return Sentence(text=self.text, start_time=self.start_time, speaker_id=self.speaker_id)
+
+    def __repr__(self) -> str:
+        return f"SentenceView(text={self.text!r}, start_time={self.start_time}, speaker_id={self.speaker_id})"
+
+
+class Transcript:
+    """Sentences of an episode stored as columns: start times as float64, speaker ids as int16 and all texts in one
+    string with the character offset of every sentence.
+
+    Takes a fraction of the memory of one Sentence model per caption line and is built without validating every line.
+    Iterating yields SentenceViews with the attributes of a Sentence, slicing by index or by time range returns a new
+    Transcript. Start times are expected in ascending order, as the scraper produces them.
+    """
+
+    __slots__ = ("start_times", "speaker_ids", "offsets", "_text", "_pending")
+
+    def __init__(self, start_times: Optional[array] = None, speaker_ids: Optional[array] = None, text: str = "", offsets: Optional[array] = None):
+        self.start_times = start_times if start_times is not None else array("d")
+        self.speaker_ids = speaker_ids if speaker_ids is not None else array("h")
+        # len(self) + 1 offsets, the text of sentence i is text[offsets[i]:offsets[i + 1]]
+        self.offsets = offsets if offsets is not None else array("I", [0])
+        self._text = text
+        # Texts appended since the text was last joined, so appending stays linear
+        self._pending: list[str] = []
+
+    @classmethod
+    def from_sentences(cls, sentences: Iterable[Union["Sentence", SentenceView, dict]]) -> "Transcript":
+        """Raises ValueError for a sentence with a missing or invalid field, a ValidationError of the enclosing model."""
+        transcript = cls()
+        for idx, sentence in enumerate(sentences):
+            try:
+                if isinstance(sentence, dict):
+                    transcript.append(sentence["text"], sentence["start_time"], sentence["speaker_id"])
+                else:
+                    transcript.append(sentence.text, sentence.start_time, sentence.speaker_id)
+            except KeyError as e:
+                raise ValueError(f"Sentence {idx} has no field {e}") from e
+            except AttributeError as e:
+                raise ValueError(f"Sentence {idx} is a {type(sentence).__name__}, expected a dict or a Sentence") from e
+            except (TypeError, ValueError, OverflowError) as e:
+                raise ValueError(f"Sentence {idx} is invalid: {e}") from e
+        return transcript
+
+    def append(self, text: str, start_time: float, speaker_id: int):
+        # Converted and checked before any column changes, a bad sentence leaves the transcript as it was
+        if not isinstance(text, str):
+            raise TypeError(f"text must be a string, got {type(text).__name__}")
+        start_time = float(start_time)
+        # The int16 column raises OverflowError for an out of range id before anything is appended
+        self.speaker_ids.append(int(speaker_id))
+        self.start_times.append(start_time)
+        self.offsets.append(self.offsets[-1] + len(text))
+        self._pending.append(text)
+
+    @property
+    def text(self) -> str:
+        """All sentence texts concatenated without separator."""
+        if self._pending:
+            self._text += "".join(self._pending)
+            self._pending = []
+        return self._text
+
+    def text_at(self, idx: int) -> str:
+        return self.text[self.offsets[idx] : self.offsets[idx + 1]]
+
+    def texts(self) -> list[str]:
+        text = self.text
+        offsets = self.offsets.tolist()
+        return [text[offsets[i] : offsets[i + 1]] for i in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.start_times)
+
+    def __iter__(self) -> Iterator[SentenceView]:
+        return (SentenceView(self, idx) for idx in range(len(self)))
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[SentenceView, "Transcript"]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("Transcripts can only be sliced with step 1")
+            stop = max(start, stop)
+            first, last = self.offsets[start], self.offsets[stop]
+            return Transcript(
+                self.start_times[start:stop],
+                self.speaker_ids[start:stop],
+                self.text[first:last],
+                array("I", (offset - first for offset in self.offsets[start : stop + 1])),
+            )
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("Transcript index out of range")
+        return SentenceView(self, key)
+
+    def between(self, start_time: float, end_time: float) -> "Transcript":
+        """Sentences starting at or after `start_time` and before `end_time`."""
+        return self[bisect.bisect_left(self.start_times, start_time) : bisect.bisect_left(self.start_times, end_time)]
+
+    def to_prompt(self) -> str:
+        """The transcript as the parser prompts show it, every sentence followed by its start time."""
+        return "".join([f"{text} ({start_time} sec) " for text, start_time in zip(self.texts(), self.start_times)])
+
+    def to_sentences(self) -> list["Sentence"]:
+        return [view.to_sentence() for view in self]
+
+    def to_dicts(self) -> list[dict]:
+        """The sentences as the dicts of Sentence.model_dump, which is how scrape results are stored."""
+        return [
+            {"text": text, "start_time": start_time, "speaker_id": speaker_id}
+            for text, start_time, speaker_id in zip(self.texts(), self.start_times.tolist(), self.speaker_ids.tolist())
+        ]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Transcript):
+            return NotImplemented
+        return self.start_times == other.start_times and self.speaker_ids == other.speaker_ids and self.offsets == other.offsets and self.text == other.text
+
+    def __repr__(self) -> str:
+        return f"Transcript({len(self)} sentences, {len(self.text)} characters)"
+
+    @classmethod
+    def validate(cls, value: Any) -> "Transcript":
+        if isinstance(value, Transcript):
+            return value
+        if isinstance(value, (list, tuple)):
+            return cls.from_sentences(value)
+        raise ValueError(f"Expected a Transcript or a list of sentences, got {type(value).__name__}")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        # Models with a Transcript field accept and serialize the list of sentence dicts the scrape results store
+        from pydantic_core import core_schema
+
+        return core_schema.no_info_plain_validator_function(
+            cls.validate, serialization=core_schema.plain_serializer_function_ser_schema(lambda transcript: transcript.to_dicts())
+        )
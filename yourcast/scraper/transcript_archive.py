@@ -0,0 +1,246 @@
+import argparse
+import codecs
+import itertools
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import zlib
+from array import array
+from typing import Iterable, Iterator
+
+from yourcast.scraper.crawler import Sentence
+from yourcast.scraper.run_scrape import SCRAPE_RESULTS_DIR, EpisodeScrapeResult
+from yourcast.scraper.transcript import Transcript
+from yourcast.tools.helpers import load_json
+
+TRANSCRIPT_ARCHIVE_PATH = "yourcast/assets/transcripts.archive"
+
+MAGIC = b"YCTA"
+FORMAT_VERSION = 1
+# Magic and format version at the start, offset and length of the index plus the magic again at the end
+HEADER = struct.Struct("<4sH2x")
+TRAILER = struct.Struct("<QQ4s")
+
+
+def _le_array(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class TranscriptArchive:
+    """Read-only, memory-mapped view of a transcript archive written by `write_archive`.
+
+    An archive holds many episodes in one file. Every episode is a block of the three columns of its Transcript,
+    uncompressed (start times as float64, speaker ids as int16 and the character offsets of every sentence in the text
+    as uint32), followed by the sentence texts concatenated, UTF-8 encoded and zlib-compressed. An index at the end of
+    the file maps episode names to their metadata and block, so loading an episode only reads the pages of its own
+    block.
+    """
+
+    def __init__(self, path: str = TRANSCRIPT_ARCHIVE_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a transcript archive")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {version}, only {FORMAT_VERSION} is supported")
+        index_offset, index_length, magic = TRAILER.unpack_from(self._mmap, len(self._mmap) - TRAILER.size)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is truncated, its index is missing")
+        entries = json.loads(zlib.decompress(self._mmap[index_offset : index_offset + index_length]))
+        self._index: dict[str, dict] = {entry["episode_name"]: entry for entry in entries}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, episode_name: str) -> bool:
+        return episode_name in self._index
+
+    def episode_names(self) -> list[str]:
+        return list(self._index)
+
+    def _columns(self, entry: dict) -> tuple[array, array, array]:
+        n = entry["n_sentences"]
+        offset = entry["offset"]
+        start_times = _le_array("d", self._mmap[offset : offset + 8 * n])
+        offset += 8 * n
+        speaker_ids = _le_array("h", self._mmap[offset : offset + 2 * n])
+        offset += 2 * n
+        text_offsets = _le_array("I", self._mmap[offset : offset + 4 * (n + 1)])
+        return start_times, speaker_ids, text_offsets
+
+    def _text_span(self, entry: dict) -> tuple[int, int]:
+        start = entry["offset"] + 14 * entry["n_sentences"] + 4
+        return start, start + entry["text_length"]
+
+    def load(self, episode_name: str) -> EpisodeScrapeResult:
+        """One episode with all of its sentences, raises KeyError for an unknown episode."""
+        entry = self._index[episode_name]
+        start_times, speaker_ids, text_offsets = self._columns(entry)
+        start, end = self._text_span(entry)
+        # The columns are the ones of a Transcript, no sentence is built one by one
+        transcript = Transcript(start_times, speaker_ids, zlib.decompress(self._mmap[start:end]).decode(), text_offsets)
+        return EpisodeScrapeResult(**self._metadata(entry), sentences=transcript)
+
+    def iter_sentences(self, episode_name: str, chunk_size: int = 64 * 1024) -> Iterator[Sentence]:
+        """Sentences of one episode in order. The text is decompressed `chunk_size` bytes at a time, so memory stays
+        bounded however long the transcript is."""
+        entry = self._index[episode_name]
+        start_times, speaker_ids, text_offsets = self._columns(entry)
+        start, end = self._text_span(entry)
+        decompressor = zlib.decompressobj()
+        # A chunk may end within a multi-byte character, the decoder keeps its first bytes until the next chunk
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        # Offset of the first character of `buffer` in the decompressed text
+        consumed = 0
+        i = 0
+        chunks = (decompressor.decompress(self._mmap[position : min(position + chunk_size, end)]) for position in range(start, end, chunk_size))
+        for chunk in itertools.chain(chunks, [decompressor.flush()]):
+            buffer += decoder.decode(chunk)
+            while i < entry["n_sentences"] and text_offsets[i + 1] - consumed <= len(buffer):
+                yield Sentence(
+                    text=buffer[text_offsets[i] - consumed : text_offsets[i + 1] - consumed],
+                    start_time=start_times[i],
+                    speaker_id=speaker_ids[i],
+                )
+                i += 1
+            buffer = buffer[text_offsets[i] - consumed :]
+            consumed = text_offsets[i]
+
+    def iter_episodes(self) -> Iterator[EpisodeScrapeResult]:
+        """All episodes in the order they were written, one at a time."""
+        for episode_name in self._index:
+            yield self.load(episode_name)
+
+    @staticmethod
+    def _metadata(entry: dict) -> dict:
+        return {key: entry[key] for key in ("episode_name", "podcast_name", "publication_date", "url")}
+
+
+def _read_index(path: str) -> tuple[list[dict], int]:
+    """Index entries of an existing archive and the offset its index starts at, where new blocks are appended."""
+    with open(path, "rb") as f:
+        f.seek(-TRAILER.size, os.SEEK_END)
+        index_offset, index_length, magic = TRAILER.unpack(f.read(TRAILER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is truncated, its index is missing")
+        f.seek(index_offset)
+        return json.loads(zlib.decompress(f.read(index_length))), index_offset
+
+
+def _write_block(f, episode: EpisodeScrapeResult) -> dict:
+    transcript = episode.sentences
+    compressed_text = zlib.compress(transcript.text.encode(), 6)
+
+    entry = {
+        "episode_name": episode.episode_name,
+        "podcast_name": episode.podcast_name,
+        "publication_date": episode.publication_date,
+        "url": episode.url,
+        "n_sentences": len(episode.sentences),
+        "offset": f.tell(),
+        "text_length": len(compressed_text),
+    }
+    f.write(_le_bytes(transcript.start_times))
+    f.write(_le_bytes(transcript.speaker_ids))
+    f.write(_le_bytes(transcript.offsets))
+    f.write(compressed_text)
+    return entry
+
+
+def _write_index(f, entries: list[dict]):
+    index_offset = f.tell()
+    index = zlib.compress(json.dumps(entries).encode())
+    f.write(index)
+    f.write(TRAILER.pack(index_offset, len(index), MAGIC))
+    f.truncate()
+
+
+def write_archive(path: str, episodes: Iterable[EpisodeScrapeResult], append: bool = False) -> int:
+    """Write `episodes` to an archive, one at a time, and return how many were written.
+
+    The archive is written to a temporary file that replaces `path` at the end, so readers never see a partial archive
+    and a crash leaves the previous one intact. With `append`, the temporary file starts as a copy of the existing
+    archive, the new blocks overwrite the old index of the copy, which is written again after them. An episode that is
+    already in the archive is replaced, its old block stays in the file until the archive is rewritten.
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    by_name: dict[str, dict] = {}
+    index_offset = None
+    if append and os.path.exists(path):
+        entries, index_offset = _read_index(path)
+        by_name = {entry["episode_name"]: entry for entry in entries}
+        # A file system copy, much faster than writing the episodes again
+        shutil.copyfile(path, tmp_path)
+    n_written = 0
+    with open(tmp_path, "wb" if index_offset is None else "r+b") as f:
+        if index_offset is None:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        else:
+            f.seek(index_offset)
+        for episode in episodes:
+            by_name[episode.episode_name] = _write_block(f, episode)
+            n_written += 1
+        _write_index(f, list(by_name.values()))
+    os.replace(tmp_path, path)
+    return n_written
+
+
+def convert_scrape_results(scrape_results_dir: str = SCRAPE_RESULTS_DIR, path: str = TRANSCRIPT_ARCHIVE_PATH, update: bool = False) -> int:
+    """Write the JSON scrape results of `scrape_results_dir` to an archive, reading one file at a time.
+
+    :param update: Only append the episodes that are not in the archive yet
+    """
+    names = sorted(name for name in os.listdir(scrape_results_dir) if name.endswith(".json") and not name.startswith("_"))
+    existing: set[str] = set()
+    if update and os.path.exists(path):
+        with TranscriptArchive(path) as archive:
+            existing = set(archive.episode_names())
+
+    def episodes() -> Iterator[EpisodeScrapeResult]:
+        for name in names:
+            episode = EpisodeScrapeResult(**load_json(os.path.join(scrape_results_dir, name)))
+            if episode.episode_name not in existing:
+                yield episode
+
+    return write_archive(path, episodes(), append=update)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Convert the JSON scrape results into a transcript archive")
+    arg_parser.add_argument("--scrape-results", default=SCRAPE_RESULTS_DIR)
+    arg_parser.add_argument("--archive", default=TRANSCRIPT_ARCHIVE_PATH)
+    arg_parser.add_argument("--update", action="store_true", help="Append only the episodes missing from an existing archive")
+    args = arg_parser.parse_args()
+
+    n_written = convert_scrape_results(args.scrape_results, args.archive, update=args.update)
+    with TranscriptArchive(args.archive) as archive:
+        print(f"Wrote {n_written} episodes, {args.archive} holds {len(archive)} episodes in {os.path.getsize(args.archive) / 1024 / 1024:.1f} MB")
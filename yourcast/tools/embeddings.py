@@ -0,0 +1,190 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from yourcast.tools.llm_helpers import get_async_client, get_sync_client
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider:
+    """Turns texts into vectors. Documents and queries of one index must be embedded by the same provider."""
+
+    model_name: str
+    dimension: int
+    # Index used when PINECONE_INDEX_NAME is not set, every model needs its own index
+    default_index_name: str
+    # Most texts sent in one embed call
+    max_batch_size: int = 256
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed([text])[0]
+
+    async def embed_query_async(self, text: str) -> list[float]:
+        # Local models are CPU bound, they run in a thread so the event loop keeps serving other requests
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    model_name = "text-embedding-3-small"
+    dimension = 1536
+    default_index_name = "yourpod"
+    # Input limit of the embeddings endpoint
+    max_batch_size = 2048
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return get_sync_client().embeddings(texts, self.model_name)
+
+    async def embed_query_async(self, text: str) -> list[float]:
+        return (await get_async_client().embeddings([text], self.model_name))[0]
+
+
+class FastEmbedProvider(EmbeddingProvider):
+    """Local CPU embeddings with fastembed, no network round trip per query."""
+
+    model_name = "BAAI/bge-small-en-v1.5"
+    dimension = 384
+    default_index_name = "yourpod-bge-small"
+
+    def __init__(self):
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        # Loading the ONNX model takes a few seconds, only do it when the first text is embedded
+        with self._lock:
+            if self._model is None:
+                from fastembed import TextEmbedding
+
+                self._model = TextEmbedding(model_name=self.model_name)
+        return self._model
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [vector.tolist() for vector in self.model.embed(texts)]
+
+    def embed_query(self, text: str) -> list[float]:
+        return next(iter(self.model.query_embed(text))).tolist()
+
+
+class CachedEmbeddingProvider(EmbeddingProvider):
+    """LRU cache of normalized query -> vector in front of another provider.
+
+    With `persist_path` the cache is loaded at startup and written back at exit, so it survives restarts.
+    Only queries are cached, documents are embedded once per ingestion anyway.
+    """
+
+    def __init__(self, provider: EmbeddingProvider, max_size: int = 1024, persist_path: Optional[str] = None):
+        self.provider = provider
+        self.model_name = provider.model_name
+        self.dimension = provider.dimension
+        self.default_index_name = provider.default_index_name
+        self.max_batch_size = provider.max_batch_size
+        self.max_size = max_size
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        if persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return self.provider.embed(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        # Queries differing only in case and whitespace share an entry, the vector is of the text the user typed first
+        key = self.normalize(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._store(key, self.provider.embed_query(text))
+        return vector
+
+    async def embed_query_async(self, text: str) -> list[float]:
+        key = self.normalize(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._store(key, await self.provider.embed_query_async(text))
+        return vector
+
+    def _lookup(self, key: str) -> Optional[list[float]]:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+            return None
+
+    def _store(self, key: str, vector: list[float]) -> list[float]:
+        with self._lock:
+            self._cache[key] = vector
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def load(self):
+        if not os.path.exists(self.persist_path):
+            return
+        with open(self.persist_path, "r") as f:
+            data = json.load(f)
+        # A cache written by another model would silently return wrong vectors
+        if data.get("model_name") != self.model_name:
+            logger.warning(f"Ignoring query embedding cache of model {data.get('model_name')}, current model is {self.model_name}")
+            return
+        for key, vector in data["vectors"][-self.max_size :]:
+            self._cache[key] = vector
+
+    def save(self):
+        with self._lock:
+            data = {"model_name": self.model_name, "vectors": list(self._cache.items())}
+        if os.path.dirname(self.persist_path):
+            os.makedirs(os.path.dirname(self.persist_path), exist_ok=True)
+        tmp_path = f"{self.persist_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.persist_path)
+
+
+EMBEDDING_BACKENDS = {
+    "openai": OpenAIEmbeddingProvider,
+    "fastembed": FastEmbedProvider,
+}
+
+_embedding_provider: Optional[EmbeddingProvider] = None
+
+
+def get_embedding_provider(backend: Optional[str] = None) -> EmbeddingProvider:
+    """Provider selected by YOURCAST_EMBEDDING_BACKEND (openai or fastembed), wrapped in the query cache.
+
+    The query cache holds YOURCAST_QUERY_CACHE_SIZE entries and is persisted to YOURCAST_QUERY_CACHE_PATH if set.
+    Passing a backend explicitly returns a new provider instead of the shared one.
+    """
+    global _embedding_provider
+    if backend is not None:
+        return EMBEDDING_BACKENDS[backend]()
+
+    if _embedding_provider is None:
+        backend = os.getenv("YOURCAST_EMBEDDING_BACKEND", "openai")
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend {backend}, expected one of {list(EMBEDDING_BACKENDS)}")
+        _embedding_provider = CachedEmbeddingProvider(
+            EMBEDDING_BACKENDS[backend](),
+            max_size=int(os.getenv("YOURCAST_QUERY_CACHE_SIZE", "1024")),
+            persist_path=os.getenv("YOURCAST_QUERY_CACHE_PATH"),
+        )
+    return _embedding_provider
@@ -1,6 +1,7 @@
 import hashlib
 import json
 import logging
+import os
 from logging.handlers import RotatingFileHandler
 
 import coloredlogs
@@ -45,6 +46,17 @@ def store_json(data: dict, filename: str) -> None:
         json.dump(data, f, indent=4)
 
 
+def store_json_atomic(data: dict, filename: str) -> None:
+    # Write to a temp file first so an interrupted write never leaves a truncated file behind
+    if filename[-5:] != ".json":
+        filename += ".json"
+
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_filename, filename)
+
+
 def load_json(filename: str) -> dict:
     if filename[-5:] != ".json":
         filename += ".json"
@@ -1,15 +1,23 @@
+import asyncio
 import base64
+import hashlib
+import json
 import os
+import sqlite3
+import threading
+import time
 from enum import Enum
 from io import BytesIO
 from textwrap import dedent
-from typing import Optional, Union
+from typing import AsyncIterator, Optional, Union
 
-import requests
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
 from PIL import Image
 from pydantic import BaseModel
+from tenacity import AsyncRetrying, Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+from yourcast.tools.metrics import metrics
 
 
 class OpenaiModelNames(Enum):
@@ -18,102 +26,479 @@ class OpenaiModelNames(Enum):
 
 FoundationModelNames = Union[OpenaiModelNames]
 
+# Dollars per input token of the embedding models
+EMBEDDING_PRICES = {"text-embedding-3-small": 0.02 / 1e6, "text-embedding-3-large": 0.13 / 1e6}
+
 load_dotenv()
 
 
-# TODO: Make two classes SyncClient and AsyncClient like OAI
 class LLMResponse(BaseModel):
     content: str
     llm_costs: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hit: bool = False
+    cost_saved: float = 0.0
+
+
+class LLMCache:
+    """Disk-backed cache of LLM responses keyed by a hash of everything that determines the response.
+
+    Entries live in a SQLite database in WAL mode, so several threads and processes (e.g. parallel ingestion workers)
+    can read and write it at the same time. The total size is bounded, least recently used entries are evicted first.
+    It is kept in a meta row updated in the transaction of every write, so a write does not scan the table.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.cost_saved = 0.0
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    llm_costs REAL NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS llm_responses_last_access ON llm_responses (last_access)")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            # Counted once for caches written before the total was kept
+            connection.execute("INSERT OR IGNORE INTO meta SELECT 'total_size', COALESCE(SUM(size), 0) FROM llm_responses")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads, every thread gets its own
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def make_key(model: FoundationModelNames, system_prompt: str, user_prompt: str, schema: Optional[type[BaseModel]] = None, image_url=None) -> str:
+        schema_json = json.dumps(schema.model_json_schema(), sort_keys=True) if schema is not None else None
+        return hashlib.sha256(json.dumps([model.value, system_prompt, user_prompt, schema_json, image_digest(image_url)]).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        connection = self._connection()
+        row = connection.execute("SELECT content, llm_costs FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            with self._counter_lock:
+                self.misses += 1
+            return None
+
+        with connection:
+            connection.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        content, llm_costs = row
+        with self._counter_lock:
+            self.hits += 1
+            self.cost_saved += llm_costs
+        # Nothing was paid for this response, the costs of the original call were saved
+        return LLMResponse(content=content, llm_costs=0.0, cache_hit=True, cost_saved=llm_costs)
+
+    def put(self, key: str, model: FoundationModelNames, response: LLMResponse):
+        size = len(response.content.encode())
+        connection = self._connection()
+        with connection:
+            # The first statement takes the write lock, the size of a replaced entry can't change before it is subtracted
+            connection.execute("UPDATE meta SET value = value - COALESCE((SELECT size FROM llm_responses WHERE key = ?), 0) WHERE key = 'total_size'", (key,))
+            connection.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model.value, response.content, response.llm_costs, response.prompt_tokens, response.completion_tokens, size, time.time()),
+            )
+            total_size = connection.execute("UPDATE meta SET value = value + ? WHERE key = 'total_size' RETURNING value", (size,)).fetchone()[0]
+            if total_size > self.max_bytes:
+                self._evict(connection, total_size)
+
+    def _evict(self, connection: sqlite3.Connection, total_size: int):
+        # Evict down to 90% of the limit, so not every following insert has to evict again
+        to_free = total_size - int(self.max_bytes * 0.9)
+        evicted = []
+        freed = 0
+        cursor = connection.execute("SELECT key, size FROM llm_responses ORDER BY last_access")
+        for key, size in cursor:
+            if freed >= to_free:
+                break
+            evicted.append((key,))
+            freed += size
+        cursor.close()
+        connection.executemany("DELETE FROM llm_responses WHERE key = ?", evicted)
+        connection.execute("UPDATE meta SET value = value - ? WHERE key = 'total_size'", (freed,))
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "cost_saved": self.cost_saved}
+
+
+LLM_CACHE_PATH = os.getenv("YOURCAST_LLM_CACHE_PATH", "yourcast/assets/cache/llm_cache.sqlite")
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Shared LLM cache of this process, None when disabled with YOURCAST_LLM_CACHE=0."""
+    global _llm_cache
+    if os.getenv("YOURCAST_LLM_CACHE", "1") == "0":
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache(LLM_CACHE_PATH, max_bytes=int(os.getenv("YOURCAST_LLM_CACHE_MAX_MB", "512")) * 1024 * 1024)
+    return _llm_cache
+
+
+def image_digest(image_url: Optional[str]) -> Optional[str]:
+    # Local images are hashed by content, remote images by URL so the cache lookup never downloads anything
+    if not image_url:
+        return None
+    if os.path.isfile(image_url):
+        with open(image_url, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    return hashlib.sha256(image_url.encode()).hexdigest()
+
+
+def _cached(key: str, model: FoundationModelNames, refresh_cache: bool, call) -> LLMResponse:
+    cache = get_llm_cache()
+    refresh_cache = refresh_cache or os.getenv("YOURCAST_LLM_CACHE_REFRESH", "0") == "1"
+    if cache is not None and not refresh_cache:
+        cached_response = cache.get(key)
+        if cached_response is not None:
+            record_cache_hit(model, cached_response)
+            return cached_response
+
+    response = call()
+    if cache is not None:
+        cache.put(key, model, response)
+    return response
+
+
+def transient_errors() -> tuple[type[Exception], ...]:
+    # Errors worth another attempt: connection problems and timeouts, rate limits and 5xx responses
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+
+    return (APIConnectionError, RateLimitError, InternalServerError)
+
+
+class _ClientBase:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: float = 60,
+        connect_timeout: float = 10,
+        max_retries: int = 3,
+        max_connections: int = 100,
+    ):
+        """
+        :param timeout: Default timeout of a request in seconds, every call can override it
+        :param max_retries: Retries of transient errors, with exponential backoff and jitter between attempts
+        :param max_connections: Size of the HTTP connection pool, idle connections are kept alive for the next call
+        """
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+    def _retry_options(self) -> dict:
+        return dict(
+            retry=retry_if_exception_type(transient_errors()),
+            wait=wait_exponential_jitter(initial=1, max=30),
+            stop=stop_after_attempt(self.max_retries + 1),
+            reraise=True,
+        )
+
+    @staticmethod
+    def _messages(system_prompt: str, user_prompt: str, base_64_image: Optional[str]) -> list[dict]:
+        if not base_64_image:
+            return [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ]
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": system_prompt + user_prompt},
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base_64_image}"}},
+                ],
+            }
+        ]
+
+    @staticmethod
+    def _to_llm_response(response, model: OpenaiModelNames, endpoint: str) -> LLMResponse:
+        llm_response = LLMResponse(
+            content=response.choices[0].message.content,
+            llm_costs=compute_llm_cost(response, model),
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+        )
+        record_usage(model.value, endpoint, llm_response.prompt_tokens, llm_response.completion_tokens, llm_response.llm_costs)
+        return llm_response
+
+    @staticmethod
+    def _embeddings(response, model: str) -> list[list[float]]:
+        prompt_tokens = response.usage.prompt_tokens if response.usage else 0
+        record_usage(model, "embeddings", prompt_tokens, 0, EMBEDDING_PRICES.get(model, 0.0) * prompt_tokens)
+        return [d.embedding for d in response.data]
+
+
+class SyncClient(_ClientBase):
+    """OpenAI client meant to live as long as the process, so calls reuse its pooled keep-alive connections."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Imported here, openai takes most of a second to import and processes like the API only need it once called
+        from openai import OpenAI
+
+        # Retries are done by tenacity, the OpenAI client would otherwise retry on its own as well
+        self.client = OpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=0, http_client=httpx.Client(limits=self.limits, timeout=self.timeout))
+
+    def _call(self, fn, **kwargs):
+        return Retrying(**self._retry_options())(fn, **kwargs)
+
+    def completion(self, system_prompt: str, user_prompt: str, model: OpenaiModelNames, image_url=None, timeout=None) -> LLMResponse:
+        messages = self._messages(system_prompt, user_prompt, prepare_image(image_url))
+        with metrics.span("openai", endpoint="completion", model=model.value):
+            response = self._call(self.client.chat.completions.create, model=model.value, messages=messages, timeout=timeout or self.timeout)
+        return self._to_llm_response(response, model, "completion")
+
+    def structured_response(
+        self, system_prompt: str, user_prompt: str, schema: type[BaseModel], model: OpenaiModelNames, image_url=None, timeout=None
+    ) -> LLMResponse:
+        messages = self._messages(system_prompt, user_prompt, prepare_image(image_url))
+        with metrics.span("openai", endpoint="structured_response", model=model.value):
+            response = self._call(
+                self.client.beta.chat.completions.parse,
+                model=model.value,
+                messages=messages,
+                response_format=schema,
+                timeout=timeout or self.timeout,
+            )
+        return self._to_llm_response(response, model, "structured_response")
+
+    def embeddings(self, texts: list[str], model: str) -> list[list[float]]:
+        with metrics.span("openai", endpoint="embeddings", model=model):
+            response = self._call(self.client.embeddings.create, input=texts, model=model)
+        return self._embeddings(response, model)
+
+
+class AsyncClient(_ClientBase):
+    """Async counterpart of SyncClient.
+
+    Its connections belong to the event loop that opened them, so one instance must only be used from one loop.
+    """
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        from openai import AsyncOpenAI
 
-def get_llm_completion(system_prompt: str, user_prompt: str, model: FoundationModelNames, image_url=None, timeout=60):
+        self.client = AsyncOpenAI(
+            api_key=self.api_key, timeout=self.timeout, max_retries=0, http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        )
+
+    async def _call(self, fn, **kwargs):
+        # The OpenAI methods return coroutines without being coroutine functions, so they are awaited per attempt here
+        async for attempt in AsyncRetrying(**self._retry_options()):
+            with attempt:
+                return await fn(**kwargs)
+
+    async def completion(self, system_prompt: str, user_prompt: str, model: OpenaiModelNames, image_url=None, timeout=None) -> LLMResponse:
+        # Loading and resizing an image blocks, it runs in a thread
+        base_64_image = await asyncio.to_thread(prepare_image, image_url) if image_url else None
+        with metrics.span("openai", endpoint="completion", model=model.value):
+            response = await self._call(
+                self.client.chat.completions.create,
+                model=model.value,
+                messages=self._messages(system_prompt, user_prompt, base_64_image),
+                timeout=timeout or self.timeout,
+            )
+        return self._to_llm_response(response, model, "completion")
+
+    async def structured_response(
+        self, system_prompt: str, user_prompt: str, schema: type[BaseModel], model: OpenaiModelNames, image_url=None, timeout=None
+    ) -> LLMResponse:
+        base_64_image = await asyncio.to_thread(prepare_image, image_url) if image_url else None
+        with metrics.span("openai", endpoint="structured_response", model=model.value):
+            response = await self._call(
+                self.client.beta.chat.completions.parse,
+                model=model.value,
+                messages=self._messages(system_prompt, user_prompt, base_64_image),
+                response_format=schema,
+                timeout=timeout or self.timeout,
+            )
+        return self._to_llm_response(response, model, "structured_response")
+
+    async def embeddings(self, texts: list[str], model: str) -> list[list[float]]:
+        with metrics.span("openai", endpoint="embeddings", model=model):
+            response = await self._call(self.client.embeddings.create, input=texts, model=model)
+        return self._embeddings(response, model)
+
+    async def completion_stream(self, system_prompt: str, user_prompt: str, model: OpenaiModelNames, timeout=None) -> AsyncIterator:
+        """Yields the chunks of the completion as it is generated, the last chunk carries the token usage.
+
+        Only opening the stream is retried, chunks that were yielded already can't be taken back. The span covers the
+        time until the response started, the time of the whole stream depends on how fast the caller reads it.
+        """
+        with metrics.span("openai", endpoint="completion_stream", model=model.value):
+            stream = await self._call(
+                self.client.chat.completions.create,
+                model=model.value,
+                messages=self._messages(system_prompt, user_prompt, None),
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=timeout or self.timeout,
+            )
+        async with stream:
+            async for chunk in stream:
+                yield chunk
+
+
+_sync_client: Optional[SyncClient] = None
+_async_client: Optional[AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_lock = threading.Lock()
+
+
+def _client_options() -> dict:
+    return dict(timeout=float(os.getenv("YOURCAST_OPENAI_TIMEOUT", "60")), max_retries=int(os.getenv("YOURCAST_OPENAI_MAX_RETRIES", "3")))
+
+
+def get_sync_client() -> SyncClient:
+    """Shared SyncClient of this process, YOURCAST_OPENAI_TIMEOUT and YOURCAST_OPENAI_MAX_RETRIES configure it."""
+    global _sync_client
+    with _client_lock:
+        if _sync_client is None:
+            _sync_client = SyncClient(**_client_options())
+    return _sync_client
+
+
+def get_async_client() -> AsyncClient:
+    """Shared AsyncClient of the running event loop.
+
+    The API server runs one event loop for its whole life, a new loop (e.g. after the app was restarted in the same
+    process) gets a new client since the connections of the old one belong to the old loop.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        if _async_client is None or _async_client_loop is not loop:
+            _async_client = AsyncClient(**_client_options())
+            _async_client_loop = loop
+    return _async_client
+
+
+def get_llm_completion(system_prompt: str, user_prompt: str, model: FoundationModelNames, image_url=None, timeout=None, refresh_cache: bool = False):
+    """
+    :param timeout: Timeout of this call in seconds, defaults to YOURCAST_OPENAI_TIMEOUT of the shared client
+    :param refresh_cache: Skip the cache lookup and regenerate the response, the new response replaces the cached one
+    """
     system_prompt = dedent(system_prompt)
     user_prompt = dedent(user_prompt)
     if isinstance(model, OpenaiModelNames):
-        return _get_openai_completion(system_prompt, user_prompt, model, image_url, timeout)
+        key = LLMCache.make_key(model, system_prompt, user_prompt, image_url=image_url)
+        return _cached(key, model, refresh_cache, lambda: get_sync_client().completion(system_prompt, user_prompt, model, image_url, timeout))
     else:
         raise NotImplementedError(f"Model {model} not supported")
 
 
-def get_llm_structured_response(system_prompt, user_prompt, schema: BaseModel, model: FoundationModelNames, image_url=None, timeout=60):
-    if isinstance(model, OpenaiModelNames):
-        return _get_openai_structured_response(system_prompt, user_prompt, schema, model, image_url, timeout)
-    else:
+async def get_llm_completion_async(
+    system_prompt: str, user_prompt: str, model: FoundationModelNames, image_url=None, timeout=None, refresh_cache: bool = False
+) -> LLMResponse:
+    """Like get_llm_completion, but awaits the shared AsyncClient instead of blocking the calling thread."""
+    system_prompt = dedent(system_prompt)
+    user_prompt = dedent(user_prompt)
+    if not isinstance(model, OpenaiModelNames):
         raise NotImplementedError(f"Model {model} not supported")
 
+    key = LLMCache.make_key(model, system_prompt, user_prompt, image_url=image_url)
+    cache = get_llm_cache()
+    refresh_cache = refresh_cache or os.getenv("YOURCAST_LLM_CACHE_REFRESH", "0") == "1"
+    if cache is not None and not refresh_cache:
+        cached_response = await asyncio.to_thread(cache.get, key)
+        if cached_response is not None:
+            record_cache_hit(model, cached_response)
+            return cached_response
 
-def _get_openai_completion(system_prompt, user_prompt, model: OpenaiModelNames, image_url: Optional[str] = None, timeout: int = 60) -> LLMResponse:
-    # Only expected to be invoked by get_llm_completion
-    assert isinstance(model, OpenaiModelNames), f"Model {model} not supported"
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    if image_url:
-        if os.path.isfile(image_url):
-            image = Image.open(image_url)
-        else:
-            image = download_image(image_url)
-
-        base_64_image = resize_and_encode_image(image, 512, 512)
-        response = client.chat.completions.create(
-            model=model.value,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": system_prompt + user_prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base_64_image}"}},
-                    ],
-                }
-            ],
-            timeout=timeout,
-        )
-    else:
-        response = client.chat.completions.create(
-            model=model.value,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            timeout=timeout,
-        )
+    response = await get_async_client().completion(system_prompt, user_prompt, model, image_url, timeout)
+    if cache is not None:
+        await asyncio.to_thread(cache.put, key, model, response)
+    return response
+
+
+async def stream_llm_completion_async(system_prompt: str, user_prompt: str, model: FoundationModelNames, timeout=None) -> AsyncIterator[str]:
+    """Streaming get_llm_completion_async, yields the completion text as it is generated.
 
-    llm_costs = compute_llm_cost(response, model)
-    return LLMResponse(content=response.choices[0].message.content, llm_costs=llm_costs)
-
-
-def _get_openai_structured_response(system_prompt, user_prompt, schema: BaseModel, model: OpenaiModelNames, image_url, timeout) -> LLMResponse:
-    # Only expected to be invoked by get_llm_completion
-    assert isinstance(model, OpenaiModelNames), f"Model {model} not supported"
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    if image_url:
-        base_64_image = resize_and_encode_image(image_url, 512, 512)  # Resize image to 512x512 for cheaper input tokens
-        response = client.beta.chat.completions.parse(
-            model=model.value,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": system_prompt + user_prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base_64_image}"}},
-                    ],
-                }
-            ],
-            response_format=schema,
-            timeout=timeout,
+    Shares the cache with the non-streaming calls: a cached completion is yielded at once, a streamed one is cached when
+    the stream was read to the end.
+    """
+    system_prompt = dedent(system_prompt)
+    user_prompt = dedent(user_prompt)
+    if not isinstance(model, OpenaiModelNames):
+        raise NotImplementedError(f"Model {model} not supported")
+
+    key = LLMCache.make_key(model, system_prompt, user_prompt)
+    cache = get_llm_cache()
+    if cache is not None and os.getenv("YOURCAST_LLM_CACHE_REFRESH", "0") != "1":
+        cached_response = await asyncio.to_thread(cache.get, key)
+        if cached_response is not None:
+            record_cache_hit(model, cached_response)
+            yield cached_response.content
+            return
+
+    parts = []
+    usage_chunk = None
+    async for chunk in get_async_client().completion_stream(system_prompt, user_prompt, model, timeout):
+        if chunk.usage is not None:
+            usage_chunk = chunk
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+
+    if usage_chunk is not None:
+        response = LLMResponse(
+            content="".join(parts),
+            llm_costs=compute_llm_cost(usage_chunk, model),
+            prompt_tokens=usage_chunk.usage.prompt_tokens,
+            completion_tokens=usage_chunk.usage.completion_tokens,
         )
+        record_usage(model.value, "completion_stream", response.prompt_tokens, response.completion_tokens, response.llm_costs)
+        if cache is not None:
+            await asyncio.to_thread(cache.put, key, model, response)
+
+
+def get_llm_structured_response(
+    system_prompt, user_prompt, schema: BaseModel, model: FoundationModelNames, image_url=None, timeout=None, refresh_cache: bool = False
+):
+    if isinstance(model, OpenaiModelNames):
+        key = LLMCache.make_key(model, system_prompt, user_prompt, schema=schema, image_url=image_url)
+        return _cached(key, model, refresh_cache, lambda: get_sync_client().structured_response(system_prompt, user_prompt, schema, model, image_url, timeout))
     else:
-        response = client.beta.chat.completions.parse(
-            model=model.value,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format=schema,
-            timeout=timeout,
-        )
+        raise NotImplementedError(f"Model {model} not supported")
 
-    llm_costs = compute_llm_cost(response, model)
-    return LLMResponse(content=response.choices[0].message.content, llm_costs=llm_costs)
+
+def record_usage(model: str, endpoint: str, prompt_tokens: int, completion_tokens: int, cost: float):
+    """Count the tokens and dollars of an upstream call, labelled by model and endpoint."""
+    metrics.inc("yourcast_llm_requests_total", model=model, endpoint=endpoint)
+    metrics.inc("yourcast_llm_tokens_total", prompt_tokens, model=model, endpoint=endpoint, kind="prompt")
+    metrics.inc("yourcast_llm_tokens_total", completion_tokens, model=model, endpoint=endpoint, kind="completion")
+    metrics.inc("yourcast_llm_cost_dollars_total", cost, model=model, endpoint=endpoint)
+
+
+def record_cache_hit(model: FoundationModelNames, response: LLMResponse):
+    metrics.inc("yourcast_llm_cache_hits_total", model=model.value)
+    metrics.inc("yourcast_llm_cost_saved_dollars_total", response.cost_saved, model=model.value)
 
 
 def compute_llm_cost(response, model: FoundationModelNames):
@@ -136,6 +521,9 @@ def download_image(image_url: str) -> str:
     :param height: Desired height of the resized image
     :return: Base64-encoded string of the processed image
     """
+    # Only needed for images, not imported with the module
+    import requests
+
     try:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
@@ -157,6 +545,14 @@ def download_image(image_url: str) -> str:
         raise RuntimeError(f"Failed to process image from URL {image_url}: {e}")
 
 
+def prepare_image(image_url: Optional[str]) -> Optional[str]:
+    """Local path or URL of an image -> base64 encoded 512x512 PNG, resized for cheaper input tokens."""
+    if not image_url:
+        return None
+    image = Image.open(image_url) if os.path.isfile(image_url) else download_image(image_url)
+    return resize_and_encode_image(image, 512, 512)
+
+
 def resize_and_encode_image(image: Image, width: int, height: int):
     try:
         # Resize the image
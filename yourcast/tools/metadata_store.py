@@ -0,0 +1,195 @@
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+from yourcast.tools.helpers import load_json, store_json
+
+logger = logging.getLogger(__name__)
+
+METADATA_STORE_PATH = "yourcast/assets/metadata.sqlite"
+EPISODE_SUMMARIES_PATH = "yourcast/assets/episode_summaries.json"
+PODCAST_IMAGES_PATH = "yourcast/assets/podcast_images.json"
+EPISODE_URLS_PATH = "yourcast/assets/episode_urls.json"
+
+
+class MetadataStore:
+    """Episode summaries, episode metadata and podcast images in a SQLite database in WAL mode.
+
+    Episodes and podcasts are looked up by name through their primary keys, so the API reads only the rows a request
+    needs while ingestion workers in other threads and processes write new episodes. Every write increments a version
+    counter in the same transaction, readers compare `version()` with the last one they saw to notice new data.
+    """
+
+    def __init__(self, path: str = METADATA_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS episodes (
+                    episode_name TEXT PRIMARY KEY,
+                    podcast_name TEXT,
+                    published_date TEXT,
+                    url TEXT,
+                    summary TEXT,
+                    version INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            connection.execute("CREATE TABLE IF NOT EXISTS podcasts (podcast_name TEXT PRIMARY KEY, image TEXT NOT NULL, updated_at REAL NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO meta VALUES ('version', 0)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads, every thread gets its own
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _bump_version(connection: sqlite3.Connection) -> int:
+        # The first statement of the write transaction, it takes the write lock and serializes concurrent writers
+        connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        return connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def version(self) -> int:
+        """Incremented by every write, cheap enough to call on every request."""
+        return self._connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def get_summaries(self, episode_names: Iterable[str]) -> dict[str, str]:
+        """Summaries of the given episodes that have one, by episode name."""
+        episode_names = list(set(episode_names))
+        summaries = {}
+        # SQLite limits the number of bound parameters of a statement
+        for start in range(0, len(episode_names), 500):
+            batch = episode_names[start : start + 500]
+            rows = self._connection().execute(
+                f"SELECT episode_name, summary FROM episodes WHERE summary IS NOT NULL AND episode_name IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+            summaries.update(rows)
+        return summaries
+
+    def get_podcast_image(self, podcast_name: str) -> Optional[str]:
+        row = self._connection().execute("SELECT image FROM podcasts WHERE podcast_name = ?", (podcast_name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def put_episode(
+        self,
+        episode_name: str,
+        podcast_name: Optional[str] = None,
+        published_date: Optional[str] = None,
+        url: Optional[str] = None,
+        summary: Optional[str] = None,
+    ) -> int:
+        """Insert or update an episode, fields left at None keep their stored value. Returns the new version."""
+        connection = self._connection()
+        with connection:
+            version = self._bump_version(connection)
+            connection.execute(
+                """
+                INSERT INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (episode_name) DO UPDATE SET
+                    podcast_name = COALESCE(excluded.podcast_name, podcast_name),
+                    published_date = COALESCE(excluded.published_date, published_date),
+                    url = COALESCE(excluded.url, url),
+                    summary = COALESCE(excluded.summary, summary),
+                    version = excluded.version,
+                    updated_at = excluded.updated_at
+                """,
+                (episode_name, podcast_name, published_date, url, summary, version, time.time()),
+            )
+        return version
+
+    def migrate_from_json(
+        self,
+        episode_summaries_path: str = EPISODE_SUMMARIES_PATH,
+        podcast_images_path: str = PODCAST_IMAGES_PATH,
+        episode_urls_path: str = EPISODE_URLS_PATH,
+    ):
+        """Import the JSON assets in one transaction. Rows already in the store are kept, only missing fields are
+        filled in, so running it again or after an ingestion never overwrites newer data."""
+        summaries = load_json(episode_summaries_path) if os.path.exists(episode_summaries_path) else {}
+        images = load_json(podcast_images_path) if os.path.exists(podcast_images_path) else {}
+        episodes = load_json(episode_urls_path)["raw_episodes"] if os.path.exists(episode_urls_path) else []
+
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            version = self._bump_version(connection)
+            connection.executemany(
+                """
+                INSERT INTO episodes (episode_name, summary, version, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (episode_name) DO UPDATE SET summary = COALESCE(summary, excluded.summary)
+                """,
+                [(episode_name, summary, version, now) for episode_name, summary in summaries.items()],
+            )
+            connection.executemany(
+                """
+                INSERT INTO episodes (episode_name, podcast_name, published_date, url, version, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (episode_name) DO UPDATE SET
+                    podcast_name = COALESCE(podcast_name, excluded.podcast_name),
+                    published_date = COALESCE(published_date, excluded.published_date),
+                    url = COALESCE(url, excluded.url)
+                """,
+                [(e["episode_name"], e["podcast_name"], e["publication_date"], e["url"], version, now) for e in episodes],
+            )
+            connection.executemany("INSERT OR IGNORE INTO podcasts VALUES (?, ?, ?)", [(name, image, now) for name, image in images.items()])
+            connection.execute("INSERT OR REPLACE INTO meta VALUES ('migrated_at', ?)", (int(now),))
+        logger.info(f"Migrated {len(summaries)} episode summaries, {len(episodes)} episodes and {len(images)} podcast images to {self.path}")
+
+    def is_migrated(self) -> bool:
+        return self._connection().execute("SELECT 1 FROM meta WHERE key = 'migrated_at'").fetchone() is not None
+
+    def export_json(self, episode_summaries_path: str = EPISODE_SUMMARIES_PATH, podcast_images_path: str = PODCAST_IMAGES_PATH):
+        """Write the summaries and podcast images back to the JSON assets, e.g. to commit them after an ingestion."""
+        connection = self._connection()
+        summaries = dict(connection.execute("SELECT episode_name, summary FROM episodes WHERE summary IS NOT NULL ORDER BY rowid"))
+        store_json(summaries, episode_summaries_path)
+        store_json(dict(connection.execute("SELECT podcast_name, image FROM podcasts ORDER BY rowid")), podcast_images_path)
+
+
+_metadata_store: Optional[MetadataStore] = None
+_metadata_store_lock = threading.Lock()
+
+
+def get_metadata_store() -> MetadataStore:
+    """Shared metadata store of this process at YOURCAST_METADATA_STORE. A new database is filled from the JSON assets
+    once, on first use."""
+    global _metadata_store
+    with _metadata_store_lock:
+        if _metadata_store is None:
+            store = MetadataStore(os.getenv("YOURCAST_METADATA_STORE", METADATA_STORE_PATH))
+            if not store.is_migrated():
+                store.migrate_from_json()
+            _metadata_store = store
+    return _metadata_store
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    arg_parser = argparse.ArgumentParser(description="Migrate the JSON assets into the metadata store or export them from it")
+    arg_parser.add_argument("--path", default=os.getenv("YOURCAST_METADATA_STORE", METADATA_STORE_PATH))
+    arg_parser.add_argument("--migrate", action="store_true", help="Import episode_summaries.json, podcast_images.json and episode_urls.json")
+    arg_parser.add_argument("--export", action="store_true", help="Write episode_summaries.json and podcast_images.json from the store")
+    args = arg_parser.parse_args()
+
+    metadata_store = MetadataStore(args.path)
+    if args.migrate:
+        metadata_store.migrate_from_json()
+    if args.export:
+        metadata_store.export_json()
+    print(f"{args.path}: version {metadata_store.version()}")
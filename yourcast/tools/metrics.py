@@ -0,0 +1,225 @@
+import atexit
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+METRICS_REPORT_DIR = os.getenv("YOURCAST_METRICS_REPORT_DIR", "yourcast/assets/cache/metrics")
+# Histogram of every span, labelled by its stage
+STAGE_SECONDS = "yourcast_stage_duration_seconds"
+STAGE_ERRORS = "yourcast_stage_errors_total"
+_REPORT_FIELDS = {"count", "errors", "total_seconds", "mean_ms", "p50_ms", "p95_ms", "max_ms"}
+# Upper bounds in seconds, from a local lookup to a long LLM call
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Histogram:
+    """Counts of observations per bucket, with their sum and maximum. Not thread safe, the registry locks around it."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "max")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf bucket, not cumulative
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimated by interpolating linearly within the bucket the quantile falls into."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[idx - 1] if idx > 0 else 0.0
+                upper = self.buckets[idx] if idx < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+class Span:
+    """Times the `with` block and records it in the stage histogram, blocks that raise are counted as errors too."""
+
+    __slots__ = ("registry", "key", "start", "seconds")
+
+    def __init__(self, registry: "MetricsRegistry", key: tuple):
+        self.registry = registry
+        self.key = key
+        self.seconds = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        self.registry._observe(STAGE_SECONDS, self.key, self.seconds)
+        if exc_type is not None:
+            self.registry._inc(STAGE_ERRORS, self.key, 1.0)
+
+
+class MetricsRegistry:
+    """Histograms and counters of this process, keyed by metric name and label values.
+
+    Recording takes a lock and a few dict lookups, cheap enough for every request. Counters and histograms are created
+    on first use, `render_prometheus` writes them in the Prometheus text format and `stage_report` summarizes the spans.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, tuple], Histogram] = {}
+        self._counters: dict[tuple[str, tuple], float] = {}
+        # Callables returning gauge values by name, read when the metrics are rendered, e.g. the stats of a cache
+        self._collectors: dict[str, Callable[[], dict]] = {}
+
+    @staticmethod
+    def _labels(labels: dict) -> tuple:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def span(self, stage: str, **labels) -> Span:
+        return Span(self, self._labels({"stage": stage, **labels}) if labels else (("stage", stage),))
+
+    def observe(self, name: str, value: float, **labels):
+        self._observe(name, self._labels(labels), value)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        self._inc(name, self._labels(labels), value)
+
+    def _observe(self, name: str, labels: tuple, value: float):
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram()
+            histogram.observe(value)
+
+    def _inc(self, name: str, labels: tuple, value: float):
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0.0) + value
+
+    def register_collector(self, prefix: str, collect: Callable[[], dict]):
+        """Expose the numeric values `collect` returns as gauges named `yourcast_<prefix>_<key>`."""
+        self._collectors[prefix] = collect
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, self._labels(labels)), 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+            buckets = {key: h.buckets for key, h in self._histograms.items()}
+
+        lines = []
+        typed = set()
+
+        def type_line(name: str, kind: str):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            type_line(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            type_line(name, "histogram")
+            cumulative = 0
+            for upper, bucket_count in zip(buckets[(name, labels)] + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(upper)),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for prefix, collect in list(self._collectors.items()):
+            try:
+                values = collect()
+            except Exception as e:
+                logger.warning(f"Collecting {prefix} metrics failed: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = f"yourcast_{prefix}_{key}"
+                    type_line(name, "gauge")
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def stage_report(self) -> dict:
+        """Timings of every stage and label set, plus all counters, as a JSON serializable dict."""
+        with self._lock:
+            stages = []
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name != STAGE_SECONDS:
+                    continue
+                stages.append(
+                    {
+                        **dict(labels),
+                        "count": histogram.count,
+                        "errors": int(self._counters.get((STAGE_ERRORS, labels), 0)),
+                        "total_seconds": round(histogram.sum, 4),
+                        "mean_ms": round(histogram.sum / histogram.count * 1000, 3),
+                        "p50_ms": round(histogram.quantile(0.5) * 1000, 3),
+                        "p95_ms": round(histogram.quantile(0.95) * 1000, 3),
+                        "max_ms": round(histogram.max * 1000, 3),
+                    }
+                )
+            counters = [{"name": name, **dict(labels), "value": value} for (name, labels), value in sorted(self._counters.items()) if name != STAGE_ERRORS]
+        return {"stages": stages, "counters": counters}
+
+    def write_report(self, run_name: str, report_dir: str = METRICS_REPORT_DIR, log: logging.Logger = logger) -> str:
+        """Write the stage report to `report_dir`, log a table of the stages to `log` and return the path of the report."""
+        report = {"run": run_name, "finished_at": datetime.now().isoformat(), **self.stage_report()}
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"{run_name}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+
+        lines = [f"{'stage':<44}{'count':>8}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}{'errors':>8}"]
+        for stage in sorted(report["stages"], key=lambda stage: -stage["total_seconds"]):
+            labels = ",".join(f"{key}={value}" for key, value in stage.items() if key not in _REPORT_FIELDS and key != "stage")
+            name = f"{stage['stage']}[{labels}]" if labels else stage["stage"]
+            lines.append(f"{name:<44}{stage['count']:>8}{stage['total_seconds']:>10.1f}{stage['mean_ms']:>10.1f}{stage['p95_ms']:>10.1f}{stage['errors']:>8}")
+        log.info(f"Stage timings of {run_name}, written to {path}:\n" + "\n".join(lines))
+        return path
+
+    def report_at_exit(self, run_name: str, report_dir: str = METRICS_REPORT_DIR, log: logging.Logger = logger):
+        """Write the stage report when the process exits, also after an exception or Ctrl+C."""
+        atexit.register(self.write_report, run_name, report_dir, log)
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# Shared registry of the process, every module records into it
+metrics = MetricsRegistry()
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly 4 characters per token for English text, good enough to schedule requests
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most `capacity` units, refilled at `capacity` units per minute."""
+
+    def __init__(self, capacity_per_minute: float):
+        self.capacity = capacity_per_minute
+        self.rate = capacity_per_minute / 60
+        self.level = capacity_per_minute
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def seconds_until_available(self, amount: float) -> float:
+        self.refill()
+        # A single request larger than the whole bucket would never fit, it only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class RateLimitScheduler:
+    """Admits LLM requests so they stay below the requests-per-minute and tokens-per-minute limits of the API.
+
+    Callers `await acquire(estimated_tokens)` before a request and report the real usage with `settle` afterwards,
+    so estimation errors are paid back by the following requests.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    async def acquire(self, estimated_tokens: int):
+        # The lock keeps requests in FIFO order, a large request is not starved by a stream of small ones
+        async with self._lock:
+            while True:
+                wait = max(self.requests.seconds_until_available(1), self.tokens.seconds_until_available(estimated_tokens))
+                if wait <= 0:
+                    break
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+            self.requests.level -= 1
+            self.tokens.level -= estimated_tokens
+
+    def settle(self, estimated_tokens: int, used_tokens: int):
+        self.tokens.refill()
+        self.tokens.level -= used_tokens - estimated_tokens
@@ -0,0 +1,452 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+from pinecone import Pinecone, ServerlessSpec
+from pydantic import BaseModel
+
+from yourcast.tools.metrics import metrics
+
+
+class VectorMatch(BaseModel):
+    id: str
+    score: float
+    metadata: Optional[dict] = None
+
+
+class QueryResult(BaseModel):
+    matches: list[VectorMatch]
+
+
+class VectorRecord(BaseModel):
+    id: str
+    values: list[float]
+    metadata: Optional[dict] = None
+
+
+class FetchResult(BaseModel):
+    vectors: dict[str, VectorRecord]
+
+
+class VectorStore:
+    """The subset of the Pinecone Index API used by this repo, so the Pinecone index and local stores are interchangeable.
+
+    Vectors are upserted as dicts with id, values and metadata, query results have `.matches` with id, score and metadata.
+    """
+
+    def upsert(self, vectors: list[dict]):
+        raise NotImplementedError
+
+    def query(self, vector: list[float], top_k: int = 10, filter: Optional[dict] = None, include_metadata: bool = False):
+        raise NotImplementedError
+
+    def delete(self, ids: list[str]):
+        raise NotImplementedError
+
+    def fetch(self, ids: list[str]):
+        raise NotImplementedError
+
+    def list(self, limit: int = 100) -> Iterator[list[str]]:
+        raise NotImplementedError
+
+    def connect(self):
+        """Opens the store ahead of its first use, raises if it can't be reached."""
+
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index=None, connect: Optional[Callable] = None):
+        """
+        :param connect: Returns the index, called on first use instead of passing `index` so that runs which
+            never touch the index, like an ingestion run that skips every episode, make no Pinecone call at all
+        """
+        self._index = index
+        self._connect = connect
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                self._index = self._connect()
+        return self._index
+
+    def upsert(self, vectors: list[dict]):
+        with metrics.span("pinecone", operation="upsert"):
+            return self.index.upsert(vectors)
+
+    def query(self, vector: list[float], top_k: int = 10, filter: Optional[dict] = None, include_metadata: bool = False):
+        with metrics.span("pinecone", operation="query"):
+            return self.index.query(vector=vector, top_k=top_k, filter=filter, include_metadata=include_metadata)
+
+    def delete(self, ids: list[str]):
+        with metrics.span("pinecone", operation="delete"):
+            return self.index.delete(ids=ids)
+
+    def fetch(self, ids: list[str]):
+        with metrics.span("pinecone", operation="fetch"):
+            return self.index.fetch(ids=ids)
+
+    def list(self, limit: int = 100) -> Iterator[list[str]]:
+        return self.index.list(limit=limit)
+
+    def connect(self):
+        self.index
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store for corpora that fit on one machine, no network hop per query.
+
+    Embeddings are normalized and kept in a memory-mapped matrix (`vectors.bin`), so only the pages touched by queries
+    are resident. Ids and metadata live in an append-only JSON lines sidecar (`metadata.jsonl`) that is replayed on open.
+    Queries are a single matrix-vector product plus `argpartition` for the top k. Equality and `$in` filters on metadata
+    fields are answered from an inverted index before scoring.
+
+    float32 queries run on the memory map directly, float16 halves memory and disk but converts the scored rows per query.
+
+    One process may write while others read, e.g. ingestion and the API. Readers replay the entries appended to the
+    sidecar when its size or mtime changed, before every query, fetch and list, so the ids of reused rows stay in step
+    with their vectors.
+    """
+
+    def __init__(self, path: str, dimension: int, dtype: str = "float32"):
+        self.path = path
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.vectors_path = os.path.join(path, "vectors.bin")
+        self.metadata_path = os.path.join(path, "metadata.jsonl")
+        self.info_path = os.path.join(path, "info.json")
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+
+        if os.path.exists(self.info_path):
+            with open(self.info_path, "r") as f:
+                info = json.load(f)
+            if info["dimension"] != dimension or info["dtype"] != self.dtype.name:
+                raise ValueError(f"Vector store at {path} has dimension {info['dimension']} and dtype {info['dtype']}, not {dimension} and {self.dtype.name}")
+        else:
+            with open(self.info_path, "w") as f:
+                json.dump({"dimension": dimension, "dtype": self.dtype.name}, f)
+
+        self.ids: list[Optional[str]] = []
+        self.metadata: list[Optional[dict]] = []
+        self.rows: dict[str, int] = {}
+        self._free_rows: list[int] = []
+        self._inverted_index: dict[str, dict] = {}
+        # Bytes of the sidecar replayed so far, and its inode, size and mtime at that point
+        self._metadata_offset = 0
+        self._metadata_stat: Optional[tuple] = None
+        self.capacity = 0
+        self.matrix: Optional[np.memmap] = None
+        self._load_metadata()
+        self._ensure_capacity(max(len(self.ids), 1024))
+
+    def _load_metadata(self):
+        """Replay the sidecar entries appended since the last call, all of them if it was compacted in the meantime."""
+        try:
+            stat = os.stat(self.metadata_path)
+        except FileNotFoundError:
+            return
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if key == self._metadata_stat:
+            return
+        if self._metadata_stat is not None and (stat.st_ino != self._metadata_stat[0] or stat.st_size < self._metadata_offset):
+            self.ids, self.metadata, self.rows, self._inverted_index = [], [], {}, {}
+            self._metadata_offset = 0
+        with open(self.metadata_path, "rb") as f:
+            f.seek(self._metadata_offset)
+            data = f.read()
+        # A line the writer is still appending is replayed on a later call
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            row = entry["row"]
+            while len(self.ids) <= row:
+                self.ids.append(None)
+                self.metadata.append(None)
+            if entry.get("deleted"):
+                self._clear_row(row)
+            else:
+                self._set_row(row, entry["id"], entry.get("metadata") or {})
+        self._metadata_offset += end
+        self._metadata_stat = key
+        self._free_rows = [row for row, id in enumerate(self.ids) if id is None]
+        if self.matrix is not None:
+            # Rows the writer added beyond the mapped capacity
+            self._ensure_capacity(len(self.ids))
+
+    def _append_metadata(self, lines: list[str]):
+        with open(self.metadata_path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+            self._metadata_offset = f.tell()
+        stat = os.stat(self.metadata_path)
+        self._metadata_stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _ensure_capacity(self, n_rows: int):
+        if n_rows <= self.capacity:
+            return
+        capacity = max(n_rows, self.capacity * 2)
+        n_bytes = capacity * self.dimension * self.dtype.itemsize
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() < n_bytes:
+                f.truncate(n_bytes)
+        if self.matrix is not None:
+            self.matrix.flush()
+        self.matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dimension))
+        self.capacity = capacity
+
+    def _set_row(self, row: int, id: str, metadata: dict):
+        if self.ids[row] is not None:
+            self._clear_row(row)
+        self.ids[row] = id
+        self.metadata[row] = metadata
+        self.rows[id] = row
+        for key, value in metadata.items():
+            if isinstance(value, (str, int, float, bool)):
+                self._inverted_index.setdefault(key, {}).setdefault(value, set()).add(row)
+
+    def _clear_row(self, row: int):
+        id, metadata = self.ids[row], self.metadata[row]
+        if id is not None:
+            self.rows.pop(id, None)
+            for key, value in (metadata or {}).items():
+                if isinstance(value, (str, int, float, bool)):
+                    self._inverted_index.get(key, {}).get(value, set()).discard(row)
+        self.ids[row] = None
+        self.metadata[row] = None
+
+    def upsert(self, vectors: list[dict]):
+        if not vectors:
+            return {"upserted_count": 0}
+        # An id repeated within the batch would get a row per occurrence, the last one wins like in Pinecone
+        vectors = list({vector["id"]: vector for vector in vectors}.values())
+        values = np.asarray([vector["values"] for vector in vectors], dtype=np.float32)
+        if values.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got {values.shape[1]}")
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values = values / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self._load_metadata()
+            rows = []
+            for vector in vectors:
+                if vector["id"] in self.rows:
+                    rows.append(self.rows[vector["id"]])
+                elif self._free_rows:
+                    rows.append(self._free_rows.pop())
+                else:
+                    rows.append(len(self.ids))
+                    self.ids.append(None)
+                    self.metadata.append(None)
+            self._ensure_capacity(len(self.ids))
+            self.matrix[rows] = values.astype(self.dtype)
+            self.matrix.flush()
+
+            lines = []
+            for row, vector in zip(rows, vectors):
+                metadata = vector.get("metadata") or {}
+                self._set_row(row, vector["id"], metadata)
+                lines.append(json.dumps({"row": row, "id": vector["id"], "metadata": metadata}))
+            self._append_metadata(lines)
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            self._load_metadata()
+            lines = []
+            for id in ids:
+                row = self.rows.get(id)
+                if row is None:
+                    continue
+                self._clear_row(row)
+                self._free_rows.append(row)
+                lines.append(json.dumps({"row": row, "deleted": True}))
+            if lines:
+                self._append_metadata(lines)
+
+    def _filter_rows(self, filter: dict) -> set:
+        rows = None
+        for key, condition in filter.items():
+            if isinstance(condition, dict):
+                if set(condition) - {"$eq", "$in"}:
+                    raise ValueError(f"Only $eq and $in filters are supported, got {condition}")
+                values = [condition["$eq"]] if "$eq" in condition else condition["$in"]
+            else:
+                values = [condition]
+            matching = set().union(*(self._inverted_index.get(key, {}).get(value, set()) for value in values))
+            rows = matching if rows is None else rows & matching
+        return rows or set()
+
+    def query(self, vector: list[float], top_k: int = 10, filter: Optional[dict] = None, include_metadata: bool = False) -> QueryResult:
+        query_vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm > 0:
+            query_vector = query_vector / norm
+
+        # Scoring and the lookup of the ids share the lock, an upsert can't give a scored row another id in between
+        with self._lock:
+            self._load_metadata()
+            n_rows = len(self.ids)
+            if filter:
+                candidate_rows = np.fromiter(self._filter_rows(filter), dtype=np.int64)
+                if candidate_rows.size == 0:
+                    return QueryResult(matches=[])
+                scores = self.matrix[candidate_rows].astype(np.float32, copy=False) @ query_vector
+            else:
+                if n_rows == 0:
+                    return QueryResult(matches=[])
+                scores = self._score_rows(self.matrix, n_rows, query_vector)
+                if self._free_rows:
+                    scores[np.fromiter(self._free_rows, dtype=np.int64)] = -np.inf
+                candidate_rows = np.arange(n_rows)
+
+            k = min(top_k, scores.shape[0])
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            matches = []
+            for idx in top:
+                if not np.isfinite(scores[idx]):
+                    continue
+                row = int(candidate_rows[idx])
+                id = self.ids[row]
+                if id is None:
+                    continue
+                matches.append(VectorMatch(id=id, score=float(scores[idx]), metadata=self.metadata[row] if include_metadata else None))
+        return QueryResult(matches=matches)
+
+    def _score_rows(self, matrix: np.ndarray, n_rows: int, query_vector: np.ndarray, chunk_rows: int = 2048) -> np.ndarray:
+        if self.dtype == np.float32:
+            return matrix[:n_rows] @ query_vector
+        # Convert through one reused buffer instead of materializing a float32 copy of the whole matrix per query
+        scores = np.empty(n_rows, dtype=np.float32)
+        buffer = np.empty((min(chunk_rows, n_rows), self.dimension), dtype=np.float32)
+        for start in range(0, n_rows, chunk_rows):
+            end = min(start + chunk_rows, n_rows)
+            buffer[: end - start] = matrix[start:end]
+            np.matmul(buffer[: end - start], query_vector, out=scores[start:end])
+        return scores
+
+    def fetch(self, ids: list[str]) -> FetchResult:
+        vectors = {}
+        with self._lock:
+            self._load_metadata()
+            for id in ids:
+                row = self.rows.get(id)
+                if row is not None:
+                    vectors[id] = VectorRecord(id=id, values=self.matrix[row].astype(np.float32).tolist(), metadata=self.metadata[row])
+        return FetchResult(vectors=vectors)
+
+    def list(self, limit: int = 100) -> Iterator[list[str]]:
+        with self._lock:
+            self._load_metadata()
+            ids = [id for id in self.ids if id is not None]
+        for i in range(0, len(ids), limit):
+            yield ids[i : i + limit]
+
+    def compact(self):
+        """Rewrite the metadata sidecar without overwritten and deleted entries."""
+        with self._lock:
+            tmp_path = f"{self.metadata_path}.tmp"
+            with open(tmp_path, "w") as f:
+                for row, (id, metadata) in enumerate(zip(self.ids, self.metadata)):
+                    if id is not None:
+                        f.write(json.dumps({"row": row, "id": id, "metadata": metadata}) + "\n")
+                offset = f.tell()
+            os.replace(tmp_path, self.metadata_path)
+            stat = os.stat(self.metadata_path)
+            self._metadata_offset = offset
+            self._metadata_stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def initialise_pinecone_index(index_name, dimension: int = 1536, create: bool = True):
+    """
+    :param create: Create the index if it doesn't exist, otherwise a missing index raises a ValueError
+    """
+    # configure client
+    pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
+    cloud = os.environ.get("PINECONE_CLOUD") or "aws"
+    region = os.environ.get("PINECONE_REGION") or "us-east-1"
+
+    spec = ServerlessSpec(cloud=cloud, region=region)
+
+    # check if index already exists (it shouldn't if this is first time)
+    if index_name not in pc.list_indexes().names():
+        if not create:
+            raise ValueError(f"Pinecone index {index_name} does not exist")
+        # if does not exist, create index
+        pc.create_index(index_name, dimension=dimension, metric="cosine", spec=spec)
+        # wait for index to be initialized
+        while not pc.describe_index(index_name).status["ready"]:
+            time.sleep(1)
+
+    # connect to index
+    index = pc.Index(index_name)
+    return index
+
+
+LOCAL_VECTOR_STORE_DIR = "yourcast/assets/vector_store"
+INDEX_VERSION_DIR = "yourcast/assets/index_versions"
+
+
+class IndexVersion:
+    """Counter of the writes to an index, kept in a small file so other processes like the API notice new ingestions.
+
+    `get` only re-reads the file when its mtime changed, so it is cheap enough to call on every request.
+    """
+
+    def __init__(self, index_name: str, directory: str = INDEX_VERSION_DIR):
+        self.path = os.path.join(directory, f"{index_name}.json")
+        self._lock = threading.Lock()
+        self._mtime_ns: Optional[int] = None
+        self._version = 0
+
+    def get(self) -> int:
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+        with self._lock:
+            if mtime_ns != self._mtime_ns:
+                with open(self.path, "r") as f:
+                    self._version = json.load(f)["version"]
+                self._mtime_ns = mtime_ns
+            return self._version
+
+    def bump(self) -> int:
+        with self._lock:
+            version = self._read() + 1
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": version, "updated_at": datetime.now().isoformat()}, f)
+            os.replace(tmp_path, self.path)
+            return version
+
+    def _read(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r") as f:
+            return json.load(f)["version"]
+
+
+def get_vector_store(index_name: str, dimension: int, create: bool = True) -> VectorStore:
+    """Vector store selected by YOURCAST_VECTOR_STORE: `pinecone` (default) or `local`.
+
+    The local store of an index lives in YOURCAST_LOCAL_VECTOR_STORE_DIR/<index_name>, its dtype is set by
+    YOURCAST_LOCAL_VECTOR_STORE_DTYPE (float32 or float16).
+
+    :param create: Create a missing Pinecone index, readers like the API only connect to an existing one
+    """
+    backend = os.getenv("YOURCAST_VECTOR_STORE", "pinecone")
+    if backend == "local":
+        directory = os.getenv("YOURCAST_LOCAL_VECTOR_STORE_DIR", LOCAL_VECTOR_STORE_DIR)
+        return LocalVectorStore(os.path.join(directory, index_name), dimension, dtype=os.getenv("YOURCAST_LOCAL_VECTOR_STORE_DTYPE", "float32"))
+    if backend == "pinecone":
+        return PineconeVectorStore(connect=lambda: initialise_pinecone_index(index_name, dimension, create=create))
+    raise ValueError(f"Unknown vector store {backend}, expected pinecone or local")